@@ -0,0 +1,171 @@
+"""Transports carrying events from producers to every process's bus.
+
+``emit_sync`` hands each event to the active backend. The local backend
+delivers it in-process only. The SQLite backend also appends it to the
+``bus_events`` log; every API process tails that log and feeds events from
+other processes into its own WebSocket bus, so job workers and several
+uvicorn workers share one event stream and status model.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from . import db
+from .config import EVENT_BUS
+from .serialize import dumps
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process's rows so it does not deliver its own events twice.
+ORIGIN = f"{os.getpid()}-{uuid4().hex[:6]}"
+
+
+class LocalBackend:
+    """Deliver events to this process only."""
+
+    name = "local"
+
+    def publish(self, evt: Dict[str, Any], deliver: Callable[[Dict[str, Any]], None]) -> None:
+        deliver(evt)
+
+    async def run(self, deliver: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        return None
+
+    def flush(self) -> None:
+        return None
+
+
+class SQLiteBackend:
+    """Relay events between processes through the ``bus_events`` table.
+
+    Publishing delivers locally straight away and queues the row; a writer
+    thread inserts queued rows in one transaction every ``FLUSH_SECONDS``.
+    Subscribers poll for rows from other origins every ``POLL_SECONDS`` and
+    rows older than ``RETAIN_SECONDS`` are pruned.
+    """
+
+    name = "sqlite"
+    FLUSH_SECONDS = 0.05
+    POLL_SECONDS = 0.2
+    RETAIN_SECONDS = 600.0
+
+    def __init__(self) -> None:
+        self.origin = ORIGIN
+        self._rows: list[tuple[str, float, str]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, evt: Dict[str, Any], deliver: Callable[[Dict[str, Any]], None]) -> None:
+        deliver(evt)
+        with self._lock:
+            self._rows.append((self.origin, time.time(), dumps(evt)))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._write_loop, name="bus-writer", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def flush(self) -> None:
+        """Write queued rows now."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if not rows:
+            return
+        con = db.connect()
+        try:
+            con.executemany(
+                "INSERT INTO bus_events(origin, ts, payload) VALUES (?,?,?)", rows
+            )
+            con.commit()
+        except sqlite3.Error:
+            logger.exception("bus event write failed; %s events dropped", len(rows))
+        finally:
+            con.close()
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            # let a burst accumulate into one transaction
+            time.sleep(self.FLUSH_SECONDS)
+            self.flush()
+
+    def _latest_id(self) -> int:
+        con = db.connect()
+        try:
+            return con.execute("SELECT COALESCE(MAX(id), 0) FROM bus_events").fetchone()[0]
+        finally:
+            con.close()
+
+    def _fetch(self, after: int) -> tuple[int, list[str]]:
+        con = db.connect()
+        try:
+            rows = con.execute(
+                "SELECT id, origin, payload FROM bus_events WHERE id > ? ORDER BY id",
+                (after,),
+            ).fetchall()
+        finally:
+            con.close()
+        if rows:
+            after = rows[-1][0]
+        return after, [payload for _, origin, payload in rows if origin != self.origin]
+
+    def _prune(self) -> None:
+        con = db.connect()
+        try:
+            con.execute(
+                "DELETE FROM bus_events WHERE ts < ?", (time.time() - self.RETAIN_SECONDS,)
+            )
+            con.commit()
+        finally:
+            con.close()
+
+    async def run(self, deliver: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+        """Deliver events published by other processes until cancelled."""
+        last = await asyncio.to_thread(self._latest_id)
+        pruned = time.monotonic()
+        while True:
+            try:
+                last, payloads = await asyncio.to_thread(self._fetch, last)
+                for payload in payloads:
+                    await deliver(json.loads(payload))
+                if time.monotonic() - pruned > self.RETAIN_SECONDS / 10:
+                    await asyncio.to_thread(self._prune)
+                    pruned = time.monotonic()
+            except sqlite3.Error:
+                logger.exception("bus event poll failed")
+            await asyncio.sleep(self.POLL_SECONDS)
+
+
+BACKENDS = {"local": LocalBackend, "sqlite": SQLiteBackend}
+
+_backend: Optional[LocalBackend | SQLiteBackend] = None
+
+
+def get_backend() -> LocalBackend | SQLiteBackend:
+    """Return the configured backend, creating it on first use."""
+    global _backend
+    if _backend is None:
+        cls = BACKENDS.get(EVENT_BUS)
+        if cls is None:
+            logger.warning("Unknown EVENT_BUS %r; using local", EVENT_BUS)
+            cls = LocalBackend
+        _backend = cls()
+    return _backend
+
+
+def set_backend(backend: LocalBackend | SQLiteBackend | None) -> None:
+    """Replace the active backend (``None`` re-reads the configuration)."""
+    global _backend
+    _backend = backend
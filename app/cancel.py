@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+"""Cooperative cancellation for queued jobs.
+
+Every job run by :mod:`app.jobs` carries a :class:`CancelToken` which is made
+current for the executing thread. Long loops call :func:`check_cancelled`
+between units of work, and :mod:`app.esi` bounds request timeouts by the
+token's deadline so a hung call cannot outlive the job that issued it.
+"""
+
+from contextlib import contextmanager
+import threading
+import time
+from typing import Iterator, Optional
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once its token was cancelled or timed out.
+
+    ``items`` lets the job report how much work it committed before stopping.
+    """
+
+    def __init__(self, reason: str = "cancelled", items: int = 0) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.items = items
+
+
+class CancelToken:
+    """Thread-safe cancellation flag with an optional deadline."""
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+        self.reason = ""
+        self.deadline: Optional[float] = None
+
+    def arm(self, timeout: Optional[float]) -> None:
+        """Start the timeout clock; ``None`` or ``0`` disables the deadline."""
+        self.deadline = time.monotonic() + timeout if timeout else None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if (
+            not self._event.is_set()
+            and self.deadline is not None
+            and time.monotonic() >= self.deadline
+        ):
+            self.cancel("timeout")
+        return self._event.is_set()
+
+    def remaining(self) -> Optional[float]:
+        """Return seconds left before the deadline, if one is set."""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise JobCancelled(self.reason)
+
+
+_local = threading.local()
+
+
+def current_token() -> Optional[CancelToken]:
+    """Return the token bound to the calling thread, if any."""
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def use_token(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """Bind ``token`` to the calling thread for the duration of the block."""
+    prev = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = prev
+
+
+def cancelled(token: Optional[CancelToken] = None) -> bool:
+    token = token or current_token()
+    return token is not None and token.cancelled
+
+
+def check_cancelled(token: Optional[CancelToken] = None) -> None:
+    """Raise :class:`JobCancelled` if the (current) token was cancelled."""
+    token = token or current_token()
+    if token is not None:
+        token.check()
+
+
+def request_timeout(default: float = 30.0) -> float:
+    """Return an HTTP timeout bounded by the current token's deadline.
+
+    Raises :class:`JobCancelled` first if the token was already cancelled so
+    no new ESI call is issued on behalf of a stopped job.
+    """
+    token = current_token()
+    if token is None:
+        return default
+    token.check()
+    remaining = token.remaining()
+    if remaining is None:
+        return default
+    return max(1.0, min(default, remaining))
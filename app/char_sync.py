@@ -3,6 +3,8 @@ from .esi import BASE, get, paged
 from .db import connect
 from .config import DATASOURCE
 from .util import utcnow
+from .jobs import checkpoint, get_checkpoint
+from .cancel import check_cancelled
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +28,10 @@ def sync_wallet_balance(con, char_id, token):
 def sync_wallet_journal(con, char_id, token, from_id=None):
     url = f"{BASE}/characters/{char_id}/wallet/journal/"
     params = {"datasource": DATASOURCE}
+    # resume a walk interrupted by a crash or failure of the sync job
+    from_id = from_id or get_checkpoint("journal_from_id")
     while True:
+        check_cancelled()
         if from_id:
             params["from_id"] = from_id
         logger.info("Fetching wallet journal from_id=%s", from_id)
@@ -56,12 +61,15 @@ def sync_wallet_journal(con, char_id, token, from_id=None):
             )
         con.commit()
         from_id = data[-1]["id"]
+        checkpoint(journal_from_id=from_id)
 
 
 def sync_wallet_transactions(con, char_id, token, from_id=None):
     url = f"{BASE}/characters/{char_id}/wallet/transactions/"
     params = {"datasource": DATASOURCE}
+    from_id = from_id or get_checkpoint("transactions_from_id")
     while True:
+        check_cancelled()
         if from_id:
             params["from_id"] = from_id
         logger.info("Fetching wallet transactions from_id=%s", from_id)
@@ -90,6 +98,7 @@ def sync_wallet_transactions(con, char_id, token, from_id=None):
             )
         con.commit()
         from_id = data[-1]["transaction_id"]
+        checkpoint(transactions_from_id=from_id)
 
 
 def sync_open_orders(con, char_id, token):
@@ -133,6 +142,7 @@ def sync_order_history(con, char_id, token, page_limit=10):
     url = f"{BASE}/characters/{char_id}/orders/history/"
     page = 1
     while page <= page_limit:
+        check_cancelled()
         logger.info("Fetching order history page %s", page)
         data, hdrs, _ = get(url, params={"datasource": DATASOURCE, "page": page}, token=token)
         if not data:
@@ -0,0 +1,141 @@
+"""Response compression: brotli when available, gzip otherwise.
+
+Built on Starlette's gzip middleware so streaming bodies are flushed per
+chunk and Server-Sent Events are left alone. Brotli needs the optional
+``brotli`` (or ``brotlicffi``) package and is preferred when the client
+accepts ``br``.
+
+Each encoding is a different byte stream, so a compressed response's
+``ETag`` gets a ``-gzip`` / ``-br`` suffix. The suffix is stripped from
+``If-None-Match`` before the request reaches the response cache, which
+validates the uncompressed body, and restored on its ``304``.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict
+
+import anyio.to_thread
+from starlette.middleware.gzip import GZipMiddleware, IdentityResponder
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is used without it
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+# favour speed: list pages are compressed per request
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+# larger chunks are compressed in a worker thread, as Starlette does for gzip
+THREAD_MIN_BYTES = 128 * 1024
+ENCODINGS = (b"gzip", b"br")
+
+
+def _accepts(scope: Dict[str, Any], coding: bytes) -> bool:
+    for key, value in scope["headers"]:
+        if key == b"accept-encoding":
+            codings = {part.split(b";")[0].strip() for part in value.lower().split(b",")}
+            return coding in codings
+    return False
+
+
+def _tagged(etag: bytes, coding: bytes) -> bytes:
+    """Return ``etag`` with ``-<coding>`` added inside its quotes."""
+    return etag[:-1] + b"-" + coding + b'"' if etag.endswith(b'"') else etag
+
+
+def _untagged(header: bytes) -> tuple[bytes, Dict[bytes, bytes]]:
+    """Strip encoding suffixes from an ``If-None-Match`` value.
+
+    Returns the rewritten header and a map from each stripped tag back to
+    the tag the client sent.
+    """
+    sent: Dict[bytes, bytes] = {}
+    tags = []
+    for tag in header.split(b","):
+        tag = tag.strip()
+        for coding in ENCODINGS:
+            suffix = b"-" + coding + b'"'
+            if tag.endswith(suffix):
+                base = tag[: -len(suffix)] + b'"'
+                sent[base.removeprefix(b"W/")] = tag
+                tag = base
+                break
+        tags.append(tag)
+    return b", ".join(tags), sent
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: Any, minimum_size: int, **kwargs: Any) -> None:
+        super().__init__(app, minimum_size, **kwargs)
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= THREAD_MIN_BYTES:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        out = self._compressor.process(body)
+        return out + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Compress responses of at least ``minimum_size`` bytes."""
+
+    def __init__(self, app: Any, minimum_size: int = 1024) -> None:
+        super().__init__(
+            app,
+            minimum_size=minimum_size,
+            compresslevel=GZIP_LEVEL,
+            thread_minimum_size=THREAD_MIN_BYTES,
+        )
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        sent: Dict[bytes, bytes] = {}
+        headers = []
+        for key, value in scope["headers"]:
+            if key == b"if-none-match":
+                value, sent = _untagged(value)
+            headers.append((key, value))
+        scope = {**scope, "headers": headers}
+
+        async def send_tagged(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = _retag(message["status"], message.get("headers", []), sent)
+            await send(message)
+
+        if brotli is not None and _accepts(scope, b"br"):
+            responder = BrotliResponder(
+                self.app, self.minimum_size, exclude_content_types=self.exclude_content_types
+            )
+            await responder(scope, receive, send_tagged)
+            return
+        await super().__call__(scope, receive, send_tagged)
+
+
+def _retag(status: int, headers: list, sent: Dict[bytes, bytes]) -> list:
+    """Give the ``ETag`` of ``headers`` the suffix of their content coding.
+
+    Bodyless ``304`` replies get back the tag the client validated with.
+    """
+    coding = next((v for k, v in headers if k.lower() == b"content-encoding"), None)
+    out = []
+    for key, value in headers:
+        if key.lower() == b"etag":
+            if coding in ENCODINGS:
+                value = _tagged(value, coding)
+            elif status == 304 and value.removeprefix(b"W/") in sent:
+                value = sent[value.removeprefix(b"W/")]
+        out.append((key, value))
+    return out
@@ -25,3 +25,18 @@ SNIPE_DELTA = 0.10
 # for recommendations. Can be overridden via the ``REC_FRESH_MS``
 # environment variable.
 REC_FRESH_MS = int(os.getenv("REC_FRESH_MS", 30 * 60 * 1000))
+
+# Window (in milliseconds) in which progress events of one run are coalesced
+# into a single frame on the bus; ``0`` sends every event. Can be overridden
+# via the ``BUS_COALESCE_MS`` environment variable.
+BUS_COALESCE_MS = int(os.getenv("BUS_COALESCE_MS", 250))
+
+# Event transport between processes: ``local`` keeps events in-process,
+# ``sqlite`` also relays them through the ``bus_events`` table so API workers
+# see events published by a separate job process.
+EVENT_BUS = os.getenv("EVENT_BUS", "local")
+
+# Responses smaller than this many bytes are sent uncompressed; larger ones
+# are brotli (when installed) or gzip encoded for clients that accept it.
+# Override via the ``COMPRESS_MIN_BYTES`` environment variable.
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))
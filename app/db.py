@@ -44,6 +44,7 @@ CREATE TABLE IF NOT EXISTS wallet_transactions (
 );
 
 CREATE INDEX IF NOT EXISTS idx_tx_type_ts ON wallet_transactions(type_id, ts_utc);
+CREATE INDEX IF NOT EXISTS idx_tx_ts ON wallet_transactions(ts_utc);
 
 CREATE TABLE IF NOT EXISTS char_orders (
   order_id INTEGER PRIMARY KEY,
@@ -149,6 +150,39 @@ JOIN (
   GROUP BY type_id, station_id
 ) m ON m.type_id = s.type_id AND m.station_id = s.station_id AND m.max_ts = s.ts_utc;
 
+-- Latest snapshot per type with profit columns precomputed in Python by
+-- latest_prices.refresh_profits(); the trigger keeps prices current and
+-- marks changed rows for repricing (priced_key NULL).
+CREATE TABLE IF NOT EXISTS latest_prices (
+  type_id INTEGER NOT NULL,
+  station_id INTEGER NOT NULL,
+  best_bid REAL,
+  best_ask REAL,
+  last_updated TEXT NOT NULL,
+  profit_isk REAL,
+  profit_pct REAL,
+  deal TEXT,
+  priced_key TEXT,
+  PRIMARY KEY (type_id, station_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_latest_prices_profit ON latest_prices(station_id, profit_pct);
+CREATE INDEX IF NOT EXISTS idx_latest_prices_deal ON latest_prices(station_id, deal, profit_pct);
+CREATE INDEX IF NOT EXISTS idx_latest_prices_updated ON latest_prices(station_id, last_updated);
+CREATE INDEX IF NOT EXISTS idx_latest_prices_stale ON latest_prices(station_id) WHERE priced_key IS NULL;
+
+CREATE TRIGGER IF NOT EXISTS market_snapshots_latest AFTER INSERT ON market_snapshots
+BEGIN
+  INSERT INTO latest_prices(type_id, station_id, best_bid, best_ask, last_updated)
+  VALUES (NEW.type_id, NEW.station_id, NEW.best_bid, NEW.best_ask, NEW.ts_utc)
+  ON CONFLICT(type_id, station_id) DO UPDATE SET
+    best_bid = excluded.best_bid,
+    best_ask = excluded.best_ask,
+    last_updated = excluded.last_updated,
+    priced_key = NULL
+  WHERE excluded.last_updated >= latest_prices.last_updated;
+END;
+
 CREATE TABLE IF NOT EXISTS type_trends (
   type_id INTEGER PRIMARY KEY,
   last_history_ts TEXT,
@@ -168,6 +202,7 @@ CREATE TABLE IF NOT EXISTS realized_trades (
   broker_fee REAL NOT NULL,
   pnl REAL NOT NULL
 );
+CREATE INDEX IF NOT EXISTS idx_realized_trades_ts ON realized_trades(ts_utc);
 
 CREATE TABLE IF NOT EXISTS inventory_cost_basis (
   type_id INTEGER PRIMARY KEY,
@@ -214,23 +249,104 @@ CREATE TABLE IF NOT EXISTS jobs_history (
   PRIMARY KEY (name, ts_utc)
 );
 
+CREATE TABLE IF NOT EXISTS job_queue (
+  run_id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  priority TEXT NOT NULL,
+  state TEXT NOT NULL DEFAULT 'queued',
+  attempts INTEGER NOT NULL DEFAULT 0,
+  queued_at TEXT NOT NULL,
+  owner TEXT,
+  lease_until TEXT,
+  checkpoint_json TEXT,
+  updated TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_queue_lease ON job_queue(state, lease_until);
+
+-- cancellations requested from any process, picked up by the row's owner
+CREATE TABLE IF NOT EXISTS job_cancels (
+  run_id TEXT PRIMARY KEY,
+  reason TEXT NOT NULL,
+  requested TEXT NOT NULL
+);
+
+-- single-holder roles (e.g. the scheduler) leased like job_queue rows
+CREATE TABLE IF NOT EXISTS worker_roles (
+  role TEXT PRIMARY KEY,
+  owner TEXT NOT NULL,
+  lease_until TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS job_results (
+  run_id TEXT PRIMARY KEY,
+  name TEXT NOT NULL,
+  ok INTEGER NOT NULL,
+  result_json TEXT,
+  error TEXT,
+  finished TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_job_results_finished ON job_results(finished);
+
+CREATE TABLE IF NOT EXISTS pipeline_dirty (
+  job TEXT NOT NULL,
+  type_id INTEGER NOT NULL,
+  marked TEXT NOT NULL,
+  PRIMARY KEY (job, type_id)
+);
+
+CREATE TABLE IF NOT EXISTS bus_events (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  origin TEXT NOT NULL,
+  ts REAL NOT NULL,
+  payload TEXT NOT NULL
+);
+
 CREATE TABLE IF NOT EXISTS app_settings (
   key TEXT PRIMARY KEY,
   value TEXT
 );
 """
 
+# Fills latest_prices in databases created before it existed; init_db only
+# runs it while the table is empty, as it scans all snapshots
+LATEST_PRICES_BACKFILL = """
+INSERT OR IGNORE INTO latest_prices(type_id, station_id, best_bid, best_ask, last_updated)
+SELECT type_id, station_id, best_bid, best_ask, last_updated FROM latest_prices_v;
+"""
+
+# Trigram index over type names for substring and fuzzy search. It keeps its
+# own copy of the names (rowid = type_id) so ``INSERT OR REPLACE INTO types``,
+# which skips delete triggers, still leaves it consistent. Created separately
+# because SQLite builds without FTS5 or the trigram tokenizer reject it.
+TYPES_FTS_DDL = """
+CREATE VIRTUAL TABLE types_fts USING fts5(name, tokenize='trigram');
+INSERT INTO types_fts(rowid, name) SELECT type_id, name FROM types WHERE name IS NOT NULL;
+CREATE TRIGGER IF NOT EXISTS types_fts_insert AFTER INSERT ON types BEGIN
+  INSERT OR REPLACE INTO types_fts(rowid, name) VALUES (new.type_id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS types_fts_update AFTER UPDATE OF type_id, name ON types BEGIN
+  DELETE FROM types_fts WHERE rowid = old.type_id;
+  INSERT INTO types_fts(rowid, name) VALUES (new.type_id, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS types_fts_delete AFTER DELETE ON types BEGIN
+  DELETE FROM types_fts WHERE rowid = old.type_id;
+END;
+"""
+
 
-def connect(timeout: float = 30.0):
+def connect(timeout: float = 30.0, check_same_thread: bool = True):
     """Return a SQLite connection with a longer busy timeout.
 
     When multiple background jobs hit the database concurrently the default
     five second timeout is occasionally not enough and SQLite raises
     ``OperationalError: database is locked``.  By increasing the timeout we let
     connections wait a bit longer for the lock to clear instead of failing.
+    ``check_same_thread=False`` is for cursors resumed from other threads,
+    such as streamed responses; the caller must not share the connection.
     """
 
-    con = sqlite3.connect(DB_PATH, timeout=timeout)
+    con = sqlite3.connect(DB_PATH, timeout=timeout, check_same_thread=check_same_thread)
     con.execute("PRAGMA foreign_keys=ON;")
     return con
 
@@ -239,6 +355,18 @@ def init_db():
     con = connect()
     con.executescript(DDL)
     con.commit()
+    if con.execute("SELECT 1 FROM latest_prices LIMIT 1").fetchone() is None:
+        con.execute(LATEST_PRICES_BACKFILL)
+        con.commit()
+    exists = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE name='types_fts'"
+    ).fetchone()
+    if not exists:
+        try:
+            con.executescript(f"BEGIN;{TYPES_FTS_DDL}COMMIT;")
+        except sqlite3.OperationalError:
+            # no FTS5/trigram: type search falls back to LIKE
+            con.rollback()
     return con
 
 
@@ -1,10 +1,13 @@
 import asyncio
+from collections import deque
 import logging
-import time
+import threading
 from uuid import uuid4
-from typing import Optional
+from typing import Callable, Iterable, Optional
 
-from .ws_bus import broadcast
+from . import response_cache, run_logs
+from .bus_backend import get_backend
+from .ws_bus import batched, broadcast
 
 
 def run_id() -> str:
@@ -18,14 +21,160 @@ async def _send(evt: dict) -> None:
         logging.exception("broadcast failed: %s", evt)
 
 
+async def _relay(evt: dict) -> None:
+    # events from other processes: their writes invalidate our cache too
+    response_cache.observe(evt)
+    await _send(evt)
+
+
+# Event dispatcher -------------------------------------------------------------------
+
+# Events emitted from worker threads are appended to ``_pending`` and drained
+# in order by a single task on the server loop, so a burst of emits costs one
+# ``call_soon_threadsafe`` wake-up and the bus state is only touched from the
+# loop thread. Without a bound loop (scripts, tests) events are broadcast
+# synchronously on one long-lived private loop instead of a new loop each.
+#
+# Past ``DISPATCH_MAX`` queued events only ``SHEDDABLE`` ones (superseded by a
+# later event or kept in the run log) are dropped, counted in ``dropped`` and
+# logged; lifecycle events such as ``job_finished`` are always queued.
+DISPATCH_MAX = 10_000
+SHEDDABLE = {"job_progress", "job_checkpoint", "job_log", "build_progress", "esi", "queue"}
+
+_pending: deque = deque()
+_dispatch_lock = threading.Lock()
+_drain_scheduled = False
+_server_loop: Optional[asyncio.AbstractEventLoop] = None
+_fallback_loop: Optional[asyncio.AbstractEventLoop] = None
+_fallback_lock = threading.Lock()
+dropped = 0
+
+
+_relay_task: Optional[asyncio.Task] = None
+
+
+def start_dispatcher() -> None:
+    """Bind the dispatcher to the running (server) event loop.
+
+    Also starts relaying events published by other processes when the bus
+    backend supports it.
+    """
+    global _server_loop, _relay_task
+    _server_loop = asyncio.get_running_loop()
+    if _relay_task is None or _relay_task.done():
+        _relay_task = _server_loop.create_task(get_backend().run(_relay))
+
+
+def stop_dispatcher() -> None:
+    """Unbind the server loop; later emits fall back to synchronous sends."""
+    global _server_loop, _drain_scheduled, _relay_task
+    _server_loop = None
+    if _relay_task is not None:
+        _relay_task.cancel()
+        _relay_task = None
+    with _dispatch_lock:
+        _drain_scheduled = False
+
+
+# events per status delta while draining a backlog
+DRAIN_BATCH = 256
+
+
+async def _drain() -> None:
+    global _drain_scheduled
+    while True:
+        while _pending:
+            async with batched():
+                for _ in range(DRAIN_BATCH):
+                    if not _pending:
+                        break
+                    await _send(_pending.popleft())
+        with _dispatch_lock:
+            if not _pending:
+                _drain_scheduled = False
+                return
+
+
+def _schedule_drain(loop: asyncio.AbstractEventLoop, on_loop: bool) -> bool:
+    global _drain_scheduled
+    with _dispatch_lock:
+        if _drain_scheduled:
+            return True
+        _drain_scheduled = True
+    try:
+        if on_loop:
+            loop.create_task(_drain())
+        else:
+            loop.call_soon_threadsafe(lambda: loop.create_task(_drain()))
+    except RuntimeError:
+        # loop closed underneath us (shutdown)
+        with _dispatch_lock:
+            _drain_scheduled = False
+        return False
+    return True
+
+
+def _send_blocking(evt: dict) -> None:
+    global _fallback_loop
+    with _fallback_lock:
+        if _fallback_loop is None or _fallback_loop.is_closed():
+            _fallback_loop = asyncio.new_event_loop()
+        _fallback_loop.run_until_complete(_send(evt))
+
+
 def emit_sync(evt: dict) -> None:
-    """Best-effort helper to emit an event from sync code."""
+    """Best-effort helper to emit an event from sync code.
+
+    Safe to call from any thread and cheap enough for hot loops. The active
+    bus backend decides whether the event also reaches other processes.
+    """
+    response_cache.observe(evt)
+    get_backend().publish(evt, _dispatch)
+
+
+def _sheddable(evt: dict) -> bool:
+    return evt.get("type") in SHEDDABLE or evt.get("phase") == "progress"
+
+
+def _enqueue(evt: dict) -> bool:
+    """Queue ``evt`` for the drain task; ``False`` if it was shed."""
+    global dropped
+    if len(_pending) >= DISPATCH_MAX and _sheddable(evt):
+        with _dispatch_lock:
+            dropped += 1
+            count = dropped
+        if count == 1 or count % 1000 == 0:
+            logging.warning("event dispatcher backlog full; %d events dropped", count)
+        return False
+    _pending.append(evt)
+    return True
+
+
+def _dispatch(evt: dict) -> None:
+    """Deliver ``evt`` to this process's bus."""
+    loop = _server_loop
     try:
-        loop = asyncio.get_running_loop()
+        running = asyncio.get_running_loop()
     except RuntimeError:
-        asyncio.run(_send(evt))
+        running = None
+    if loop is not None and (running is None or running is loop):
+        if not _enqueue(evt) or _schedule_drain(loop, running is loop):
+            return
+        # the server loop is gone: deliver everything still queued here,
+        # in order, including events other threads queued before us
+        while True:
+            try:
+                queued = _pending.popleft()
+            except IndexError:
+                return
+            if running is not None:
+                running.create_task(_send(queued))
+            else:
+                _send_blocking(queued)
+    if running is not None:
+        running.create_task(_send(evt))
     else:
-        loop.create_task(_send(evt))
+        _send_blocking(evt)
 
 
 # Job event helpers ------------------------------------------------------------------
@@ -50,23 +199,14 @@ def job_progress(runId: str, progress: int, detail: str = "") -> None:
     emit_sync({"type": "job_progress", "runId": runId, "progress": progress, "detail": detail})
 
 
-_last_log_ts = 0.0
-_log_count = 0
+def job_checkpoint(runId: str, cursor: dict) -> None:
+    """Emit the latest persisted progress cursor of a running job."""
+    emit_sync({"type": "job_checkpoint", "runId": runId, "cursor": cursor})
 
 
 def job_log(runId: str, level: str, message: str) -> None:
-    """Emit log messages with simple backpressure to avoid floods."""
-    global _last_log_ts, _log_count
-    now = time.time()
-    if now - _last_log_ts > 1.0:
-        # new window
-        _last_log_ts = now
-        if _log_count > 5:
-            emit_sync({"type": "job_log", "runId": runId, "level": level, "message": f"{_log_count} messages"})
-        _log_count = 0
-    _log_count += 1
-    if _log_count <= 5:
-        emit_sync({"type": "job_log", "runId": runId, "level": level, "message": message})
+    """Log a message for a run: kept in full on disk, sampled on the bus."""
+    run_logs.log(runId, level, message, emit_sync)
 
 
 def job_finished(runId: str, ok: bool, items: int = 0, ms: int = 0, error: str | None = None) -> None:
@@ -78,6 +218,7 @@ def job_finished(runId: str, ok: bool, items: int = 0, ms: int = 0, error: str |
         "ms": ms,
         "error": error,
     }
+    run_logs.close(runId, emit_sync)
     emit_sync(evt)
 
 
@@ -121,15 +262,44 @@ def jobs_event(pending: list[dict]) -> None:
 
 # Pipeline update helpers ------------------------------------------------------------
 
+# In-process listeners for pipeline events, called with the event and the type
+# ids it covers. The ids are not broadcast to clients.
+_pipeline_listeners: dict[str, list[Callable[[dict, list[int]], None]]] = {}
 
-def pipeline_price_updated(count: int, as_of: str) -> None:
-    """Emit an event signalling fresh market price data."""
-    emit_sync({"type": "pipeline.price.updated", "count": count, "as_of": as_of})
 
+def subscribe_pipeline(event_type: str, fn: Callable[[dict, list[int]], None]) -> None:
+    """Register ``fn`` to run whenever a pipeline event of ``event_type`` fires."""
+    fns = _pipeline_listeners.setdefault(event_type, [])
+    if fn not in fns:
+        fns.append(fn)
 
-def pipeline_profit_updated(count: int, as_of: str) -> None:
-    """Emit an event signalling refreshed profit/valuation data."""
-    emit_sync({"type": "pipeline.profit.updated", "count": count, "as_of": as_of})
+
+def _pipeline_event(evt: dict, type_ids: Optional[Iterable[int]]) -> None:
+    ids = sorted(set(type_ids or ()))
+    for fn in _pipeline_listeners.get(evt["type"], []):
+        try:
+            fn(evt, ids)
+        except Exception:
+            logging.exception("pipeline listener failed: %s", evt["type"])
+    emit_sync(evt)
+
+
+def pipeline_price_updated(
+    count: int, as_of: str, type_ids: Optional[Iterable[int]] = None
+) -> None:
+    """Emit an event signalling fresh market price data for ``type_ids``."""
+    _pipeline_event(
+        {"type": "pipeline.price.updated", "count": count, "as_of": as_of}, type_ids
+    )
+
+
+def pipeline_profit_updated(
+    count: int, as_of: str, type_ids: Optional[Iterable[int]] = None
+) -> None:
+    """Emit an event signalling refreshed profit/valuation data for ``type_ids``."""
+    _pipeline_event(
+        {"type": "pipeline.profit.updated", "count": count, "as_of": as_of}, type_ids
+    )
 
 
 def build_finished(buildId: str, ok: bool, rows: int = 0, ms: int = 0, error: str | None = None) -> None:
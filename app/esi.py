@@ -5,6 +5,7 @@ import requests
 from .config import DATASOURCE
 from .status import STATUS
 from .emit import esi_status
+from .cancel import request_timeout
 
 BASE = "https://esi.evetech.net/latest"
 HEADERS = {"Accept": "application/json"}
@@ -22,8 +23,9 @@ def get(url, params=None, etag=None, token=None):
         headers["If-None-Match"] = etag
     if token:
         headers["Authorization"] = f"Bearer {token}"
+    timeout = request_timeout(30)
     logger.info("GET %s params=%s", url, params)
-    r = requests.get(url, params=params, headers=headers, timeout=30)
+    r = requests.get(url, params=params, headers=headers, timeout=timeout)
     global ERROR_LIMIT_REMAIN, ERROR_LIMIT_RESET
     ERROR_LIMIT_REMAIN = int(
         r.headers.get("X-ESI-Error-Limit-Remain", ERROR_LIMIT_REMAIN)
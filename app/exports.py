@@ -0,0 +1,234 @@
+"""Streaming bulk exports of history tables.
+
+``GET /export/{dataset}`` walks a read cursor in :data:`CHUNK_ROWS` blocks
+and writes each block straight to a chunked response as NDJSON, CSV or an
+Arrow IPC stream. Memory stays flat however many rows the time range
+covers. Rows come out in time order, which the table indexes serve without
+a sort. Arrow output needs the optional ``pyarrow`` package.
+"""
+
+from __future__ import annotations
+
+import csv
+from datetime import timezone
+import io
+from typing import Any, Dict, Iterator, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from . import db
+from .serialize import dumps_bytes
+from .util import parse_utc
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional, only needed for format=arrow
+    pa = None
+
+router = APIRouter()
+
+CHUNK_ROWS = 5000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+# dataset -> (time column, type column or None, order by, [(column, kind)])
+DATASETS: Dict[str, tuple[str, Optional[str], str, list[tuple[str, str]]]] = {
+    "market_snapshots": (
+        "ts_utc",
+        "type_id",
+        "ts_utc, type_id, station_id",
+        [
+            ("ts_utc", "str"),
+            ("type_id", "int"),
+            ("station_id", "int"),
+            ("best_bid", "float"),
+            ("best_ask", "float"),
+            ("bid_count", "int"),
+            ("ask_count", "int"),
+            ("jita_bid_units", "int"),
+            ("jita_ask_units", "int"),
+        ],
+    ),
+    "realized_trades": (
+        "ts_utc",
+        "type_id",
+        "ts_utc, trade_id",
+        [
+            ("trade_id", "str"),
+            ("ts_utc", "str"),
+            ("type_id", "int"),
+            ("qty", "int"),
+            ("sell_unit_price", "float"),
+            ("cost_total", "float"),
+            ("tax", "float"),
+            ("broker_fee", "float"),
+            ("pnl", "float"),
+        ],
+    ),
+    "wallet_transactions": (
+        "ts_utc",
+        "type_id",
+        "ts_utc, transaction_id",
+        [
+            ("transaction_id", "int"),
+            ("ts_utc", "str"),
+            ("client_id", "int"),
+            ("location_id", "int"),
+            ("type_id", "int"),
+            ("quantity", "int"),
+            ("unit_price", "float"),
+            ("is_buy", "int"),
+            ("journal_ref_id", "int"),
+        ],
+    ),
+    "portfolio_daily": (
+        "day",
+        None,
+        "day",
+        [
+            ("day", "str"),
+            ("wallet_balance", "float"),
+            ("buy_escrow", "float"),
+            ("sell_gross", "float"),
+            ("inventory_quicksell", "float"),
+            ("inventory_mark", "float"),
+            ("nav_quicksell", "float"),
+            ("nav_mark", "float"),
+        ],
+    ),
+}
+
+
+def _bound(name: str, value: Optional[str], time_col: str) -> Optional[str]:
+    """Normalise an ISO 8601 bound to the stored UTC text format.
+
+    Stored timestamps compare as text, so ``2024-01-01T00:00:00Z`` must be
+    rewritten before it is compared against ``2024-01-01 00:00:00``.
+    """
+    if not value:
+        return None
+    try:
+        dt = parse_utc(value).astimezone(timezone.utc)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"invalid {name}: {value}")
+    return dt.strftime("%Y-%m-%d" if time_col == "day" else "%Y-%m-%d %H:%M:%S")
+
+
+def _query(
+    dataset: str, since: Optional[str], until: Optional[str], type_ids: list[int]
+) -> tuple[str, list[Any]]:
+    time_col, type_col, order, columns = DATASETS[dataset]
+    where, params = [], []
+    if since:
+        where.append(f"{time_col} >= ?")
+        params.append(since)
+    if until:
+        where.append(f"{time_col} < ?")
+        params.append(until)
+    if type_ids:
+        where.append(f"{type_col} IN ({','.join('?' for _ in type_ids)})")
+        params.extend(type_ids)
+    sql = f"SELECT {', '.join(c for c, _ in columns)} FROM {dataset}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    return f"{sql} ORDER BY {order}", params
+
+
+def iter_chunks(sql: str, params: list[Any]) -> Iterator[list[tuple]]:
+    """Yield result rows of ``sql`` in blocks of :data:`CHUNK_ROWS`.
+
+    The connection is opened lazily and may be resumed from any thread, as
+    the response body is pulled from the thread pool one chunk at a time.
+    """
+    con = db.connect(check_same_thread=False)
+    try:
+        cur = con.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(CHUNK_ROWS)
+            if not rows:
+                return
+            yield rows
+    finally:
+        con.close()
+
+
+def _ndjson(names: list[str], chunks: Iterator[list[tuple]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield b"".join(dumps_bytes(dict(zip(names, row))) + b"\n" for row in rows)
+
+
+def _csv(names: list[str], chunks: Iterator[list[tuple]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(names)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue().encode()
+        buf.seek(0)
+        buf.truncate()
+    # header only when nothing matched
+    if buf.tell():
+        yield buf.getvalue().encode()
+
+
+def _arrow(columns: list[tuple[str, str]], chunks: Iterator[list[tuple]]) -> Iterator[bytes]:
+    kinds = {"int": pa.int64(), "float": pa.float64(), "str": pa.string()}
+    schema = pa.schema([(name, kinds[kind]) for name, kind in columns])
+    buf = io.BytesIO()
+    with pa.ipc.new_stream(buf, schema) as writer:
+        for rows in chunks:
+            arrays = [
+                pa.array(values, type=field.type)
+                for values, field in zip(zip(*rows), schema)
+            ]
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    # schema message when empty, end-of-stream marker otherwise
+    yield buf.getvalue()
+
+
+@router.get("/export/{dataset}")
+def export(
+    dataset: str,
+    format: Literal["ndjson", "csv", "arrow"] = "ndjson",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    type_id: list[int] = Query(default=[]),
+):
+    """Stream ``dataset`` rows with ``since <= time < until``.
+
+    Bounds are ISO 8601 dates or times (UTC unless they carry an offset).
+    ``type_id`` may repeat; it is rejected for datasets without a type.
+    """
+    if dataset not in DATASETS:
+        raise HTTPException(status_code=404, detail=f"unknown dataset {dataset}")
+    _, type_col, _, columns = DATASETS[dataset]
+    if type_id and type_col is None:
+        raise HTTPException(status_code=400, detail=f"{dataset} has no type_id")
+    if format == "arrow" and pa is None:
+        raise HTTPException(status_code=406, detail="arrow export requires pyarrow")
+    time_col = DATASETS[dataset][0]
+    since = _bound("since", since, time_col)
+    until = _bound("until", until, time_col)
+    sql, params = _query(dataset, since, until, type_id)
+    chunks = iter_chunks(sql, params)
+    names = [name for name, _ in columns]
+    if format == "csv":
+        body = _csv(names, chunks)
+    elif format == "arrow":
+        body = _arrow(columns, chunks)
+    else:
+        body = _ndjson(names, chunks)
+    ext = "arrows" if format == "arrow" else format
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{ext}"'},
+    )
@@ -1,18 +1,32 @@
 import os
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, Callable
-
-from .jobs import enqueue, worker, RateLimiter, record_job
+from typing import Any, Dict, Callable, Optional
+
+from .jobs import (
+    Job,
+    submit,
+    worker,
+    RateLimiter,
+    record_job,
+    renew_leases,
+    reclaim_expired,
+    pending_job_names,
+    poll_cancels,
+    hold_role,
+    release_role,
+    LEASE_SECONDS,
+)
 from .settings_service import get_scheduler_settings
 from .run_character_sync import main as sync_character_main
 from .trends import refresh_trends
 from .scheduler import run_tick
 from .recommender import build_recommendations
-from .valuation import refresh_type_valuations
+from .valuation import refresh_type_valuations, refresh_portfolio_snapshot
 from .db import session, connect
 from .util import utcnow_dt, parse_utc, utcnow
 from .emit import pipeline_profit_updated
+from . import latest_prices, pipeline
 
 # Mapping of job names to callable wrappers ----------------------------------
 
@@ -43,7 +57,7 @@ def _job_snapshot_orders() -> None:
         raise
 
 
-def _job_refresh_type_valuations() -> None:
+def _job_refresh_type_valuations() -> Dict[str, int]:
     try:
         with session() as con:
             cur = con.cursor()
@@ -55,9 +69,11 @@ def _job_refresh_type_valuations() -> None:
             ]
             if ids:
                 refresh_type_valuations(con, sorted(ids))
+            refresh_portfolio_snapshot(con)
             count = len(ids)
-        pipeline_profit_updated(count, utcnow())
+        pipeline_profit_updated(count, utcnow(), ids)
         record_job("refresh_type_valuations", True, {"count": count})
+        return {"count": count}
     except Exception as exc:  # pragma: no cover - propagated
         record_job("refresh_type_valuations", False, {"error": str(exc)})
         raise
@@ -72,7 +88,15 @@ def _job_recommender_scan() -> None:
         raise
 
 
-JOB_FUNCS: Dict[str, Callable[[], None]] = {
+def _job_recommendations_build(
+    dry_run: bool = False, verbose: bool = False, mode: str = "profit_only"
+) -> Dict[str, Any]:
+    """Build recommendations on request; dry runs return the gate counts."""
+    res = build_recommendations(verbose=verbose, dry_run=dry_run, mode=mode)
+    return res if dry_run else {"rows": len(res)}
+
+
+JOB_FUNCS: Dict[str, Callable[..., Any]] = {
     "sync_character": _job_sync_character,
     "refresh_trends": _job_refresh_trends,
     "snapshot_orders": _job_snapshot_orders,
@@ -80,23 +104,61 @@ JOB_FUNCS: Dict[str, Callable[[], None]] = {
     "recommender_scan": _job_recommender_scan,
     # allow old name used in tests/UI
     "recommendations": _job_recommender_scan,
+    # parameterised builds requested through POST /recommendations/build
+    "recommendations_build": _job_recommendations_build,
+    # event-driven consumers, enqueued by app.pipeline when upstream data changes
+    "pipeline_valuations": pipeline.run_valuations,
+    "pipeline_recommendations": pipeline.run_recommendations,
 }
 
 # Background worker and scheduler threads -------------------------------------
 
 _stop_scheduler = threading.Event()
+# ``worker_roles`` entry held by the one process that enqueues periodic jobs
+SCHEDULER_ROLE = "scheduler"
+
+
+def _job_timeouts() -> Dict[str, Optional[float]]:
+    """Return per-job time limits in seconds from the scheduler settings."""
+    timeouts: Dict[str, Optional[float]] = {
+        name: (meta.get("timeout") or 0) * 60 or None
+        for name, meta in get_scheduler_settings().items()
+    }
+    timeouts["recommendations"] = timeouts.get("recommender_scan")
+    timeouts["recommendations_build"] = timeouts.get("recommender_scan")
+    timeouts["pipeline_valuations"] = timeouts.get("refresh_type_valuations")
+    timeouts["pipeline_recommendations"] = timeouts.get("recommender_scan")
+    return timeouts
+
 
+def enqueue_job(name: str, **kwargs: Any) -> str:
+    """Enqueue a known job and return its run id.
 
-def enqueue_job(name: str) -> None:
+    Jobs without arguments are durable. ``job_queue`` does not store
+    arguments, so parameterised runs are kept in memory only.
+    """
     func = JOB_FUNCS.get(name)
     if not func:
         raise KeyError(name)
-    enqueue(name, func)
+    job = Job(name, func, kwargs=kwargs, durable=not kwargs, timeout=_job_timeouts().get(name))
+    return submit(job).run_id
 
 
-def _scheduler_loop() -> None:
-    # load last run timestamps from history
-    last_run: Dict[str, datetime] = {}
+def run_job_inline(name: str, **kwargs: Any) -> Any:
+    """Run a known job in the calling thread and return its result."""
+    func = JOB_FUNCS.get(name)
+    if not func:
+        raise KeyError(name)
+    return func(**kwargs)
+
+
+def resume_jobs() -> int:
+    """Requeue durable jobs abandoned by a previous (crashed) process."""
+    return len(reclaim_expired(JOB_FUNCS, _job_timeouts()))
+
+
+def _last_runs() -> Dict[str, datetime]:
+    """Return the last recorded run of each job from ``jobs_history``."""
     con = connect()
     try:
         rows = con.execute(
@@ -104,28 +166,58 @@ def _scheduler_loop() -> None:
         ).fetchall()
     finally:
         con.close()
-    for name, ts in rows:
-        if ts:
-            last_run[name] = parse_utc(ts)
-
-    while not _stop_scheduler.is_set():
-        cfg = get_scheduler_settings()
-        now = utcnow_dt()
-        for name, meta in cfg.items():
-            if not meta.get("enabled"):
-                continue
-            interval = timedelta(minutes=int(meta.get("interval", 0)))
-            lr = last_run.get(name)
-            if lr is None or now - lr >= interval:
-                if name in JOB_FUNCS:
+    return {name: parse_utc(ts) for name, ts in rows if ts}
+
+
+def _scheduler_loop() -> None:
+    # every process keeps its leases and applies remote cancellations; only
+    # the holder of the scheduler role enqueues periodic jobs
+    last_run: Dict[str, datetime] = {}
+    leader = False
+    lease_every = timedelta(seconds=LEASE_SECONDS // 3)
+    last_lease: datetime | None = None
+    try:
+        while not _stop_scheduler.is_set():
+            now = utcnow_dt()
+            if last_lease is None or now - last_lease >= lease_every:
+                renew_leases()
+                resume_jobs()
+                was_leader, leader = leader, hold_role(SCHEDULER_ROLE)
+                if leader and not was_leader:
+                    # continue from the runs recorded under the previous holder
+                    last_run = _last_runs()
+                last_lease = now
+            poll_cancels()
+            if leader:
+                _schedule_due(last_run, now)
+            _stop_scheduler.wait(1)
+    finally:
+        if leader:
+            release_role(SCHEDULER_ROLE)
+
+
+def _schedule_due(last_run: Dict[str, datetime], now: datetime) -> None:
+    """Enqueue enabled jobs whose interval elapsed since ``last_run``."""
+    cfg = get_scheduler_settings()
+    for name, meta in cfg.items():
+        if not meta.get("enabled"):
+            continue
+        interval = timedelta(minutes=int(meta.get("interval", 0)))
+        lr = last_run.get(name)
+        if lr is None or now - lr >= interval:
+            if name in JOB_FUNCS:
+                # a queued or interrupted run (possibly awaiting recovery)
+                # already covers this interval
+                if name not in pending_job_names():
                     enqueue_job(name)
-                    last_run[name] = now
-        _stop_scheduler.wait(1)
+                last_run[name] = now
 
 
 def start_background_jobs() -> None:
     if os.getenv("DISABLE_BACKGROUND_JOBS"):
         return
+    pipeline.install(enqueue_job)
+    latest_prices.install()
     threading.Thread(target=worker, args=(RateLimiter(),), daemon=True).start()
     threading.Thread(target=_scheduler_loop, daemon=True).start()
 
@@ -7,19 +7,52 @@ used by the ``/status`` API for observability. Jobs can be enqueued with a
 priority (``P0``..``P3``) and are executed in order by ``run_next_job`` or the
 ``worker`` loop. A lightweight rate limiter adapts to the ESI error limit
 headers exposed via :mod:`app.esi`.
+
+Jobs flagged as ``durable`` are mirrored into the ``job_queue`` table so they
+survive a restart. Each row is owned by the process that queued or claimed it
+and carries a lease which that process keeps renewing; rows whose lease has
+expired belong to a dead process and are reclaimed by :func:`reclaim_expired`
+together with their attempt count and last checkpoint.
+
+Long-running job functions record progress cursors with :func:`checkpoint`
+and read them back with :func:`get_checkpoint`, so a run that was interrupted
+or failed after checkpointing continues where it left off.
+
+Each job carries a :class:`~app.cancel.CancelToken`. ``Job.timeout`` arms its
+deadline when the job starts and :func:`cancel_job` either drops a queued job
+or asks a running one to stop at its next cancellation check; durable jobs
+of other processes are cancelled through the ``job_cancels`` table.
+
+Roles that must run in a single process at a time, such as the scheduler,
+are leased in ``worker_roles`` with :func:`hold_role`.
 """
 
 from dataclasses import dataclass, field
+from datetime import timedelta
 import heapq
 import json
 import logging
+import os
+import sqlite3
+import threading
 import time
-from typing import Any, Callable, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
 
 from . import db, esi
-from .status import STATUS
-from .emit import job_started, job_finished, queue_event, jobs_event, run_id
-from .util import utcnow
+from .cancel import CancelToken, JobCancelled, use_token
+from .status import STATUS, add_last_run
+from .emit import (
+    job_started,
+    job_finished,
+    job_checkpoint,
+    job_log,
+    queue_event,
+    jobs_event,
+    run_id,
+)
+from .serialize import dumps
+from .util import utcnow, utcnow_dt
 
 # Public state for status reporting -------------------------------------------------
 
@@ -31,6 +64,28 @@ JOB_QUEUE: List[str] = []
 _PRIORITY = {"P0": 0, "P1": 1, "P2": 2, "P3": 3}
 _queue: List[Tuple[int, int, "Job"]] = []
 _counter = 0
+# Guards every push, pop and removal on ``_queue`` (and the hand-over into
+# ``_running``): API threads, the scheduler and the worker share the heap.
+_queue_lock = threading.Lock()
+
+# Durable queue ownership ----------------------------------------------------------
+
+# Identifies this process as the owner of ``job_queue`` rows it holds leases on.
+WORKER_ID = f"{os.getpid()}-{uuid4().hex[:6]}"
+# Leases are renewed well before they lapse; an expired lease means the owning
+# process is gone and the job may be reclaimed.
+LEASE_SECONDS = 60
+# Jobs that took the process down (or failed) this many times are abandoned.
+MAX_ATTEMPTS = 3
+# Failed runs holding a checkpoint are retried after ``attempts`` times this.
+RETRY_SECONDS = 60
+# Minimum spacing between persisted checkpoints of a single run.
+CHECKPOINT_SECONDS = 5.0
+# Finished runs' return values stay fetchable through ``job_result`` this long.
+RESULT_RETAIN_SECONDS = 24 * 3600
+
+_local = threading.local()
+_running: Dict[str, "Job"] = {}
 
 logger = logging.getLogger(__name__)
 
@@ -46,36 +101,65 @@ class Job:
     priority: str = "P2"
     queued_at: str = field(default_factory=utcnow)
     run_id: str = field(default_factory=run_id)
+    durable: bool = False
+    attempts: int = 0
+    checkpoint: Optional[Dict[str, Any]] = None
+    checkpoint_ts: float = field(default=0.0, repr=False)
+    # seconds the job may run before its token times out (``None`` = no limit)
+    timeout: Optional[float] = None
+    token: CancelToken = field(default_factory=CancelToken, repr=False)
+
+
+def _queued() -> List[Tuple[int, int, "Job"]]:
+    """Return a consistent copy of the queue entries."""
+    with _queue_lock:
+        return list(_queue)
+
+
+def _local_run_ids() -> Set[str]:
+    with _queue_lock:
+        return {job.run_id for _, _, job in _queue} | set(_running)
 
 
 def _refresh_snapshot() -> None:
     """Update ``JOB_QUEUE`` snapshot from the internal priority queue."""
-    JOB_QUEUE[:] = [job.name for _, _, job in sorted(_queue)]
+    entries = _queued()
+    JOB_QUEUE[:] = [job.name for _, _, job in sorted(entries)]
     depth = queue_depth()
     STATUS["queue"] = depth
     queue_event(depth)
     pending = [
         {"job": job.name, "runId": job.run_id, "queued_at": job.queued_at}
-        for _, _, job in sorted(_queue, key=lambda t: -t[1])
+        for _, _, job in sorted(entries, key=lambda t: -t[1])
     ]
     jobs_event(pending)
 
 
-def enqueue(name: str, func: Callable[..., Any], priority: str = "P2", *args, **kwargs) -> None:
-    """Enqueue a job for later execution."""
+def submit(job: Job) -> Job:
+    """Push a prepared :class:`Job` onto the queue, persisting durable jobs."""
 
     global _counter
-    prio = _PRIORITY.get(priority, 3)
-    heapq.heappush(_queue, (prio, _counter, Job(name, func, args, kwargs, priority)))
-    _counter += 1
+    if job.durable:
+        _persist(job)
+    prio = _PRIORITY.get(job.priority, 3)
+    with _queue_lock:
+        heapq.heappush(_queue, (prio, _counter, job))
+        _counter += 1
     _refresh_snapshot()
+    return job
+
+
+def enqueue(name: str, func: Callable[..., Any], priority: str = "P2", *args, **kwargs) -> Job:
+    """Enqueue a job for later execution."""
+
+    return submit(Job(name, func, args, kwargs, priority))
 
 
 def queue_depth() -> Dict[str, int]:
     """Return current queued job counts by priority class."""
 
     counts = {p: 0 for p in _PRIORITY.keys()}
-    for _, _, job in _queue:
+    for _, _, job in _queued():
         counts[job.priority] += 1
     return counts
 
@@ -86,31 +170,492 @@ def run_next_job() -> bool:
     Returns ``True`` if a job was executed, ``False`` if the queue was empty.
     """
 
-    if not _queue:
-        return False
-    _, _, job = heapq.heappop(_queue)
+    with _queue_lock:
+        if not _queue:
+            return False
+        _, _, job = heapq.heappop(_queue)
+        # visible to cancel_job at all times: queued or running
+        _running[job.run_id] = job
     _refresh_snapshot()
-    run_id = job_started(job.name, runId=job.run_id)
+    meta = None
+    if job.durable:
+        job.attempts += 1
+        _lease(job)
+        meta = {
+            "attempt": job.attempts,
+            "resumed": job.checkpoint is not None,
+            "checkpoint": job.checkpoint,
+        }
+    run_id = job_started(job.name, meta, runId=job.run_id)
+    _local.job = job
+    job.token.arm(job.timeout)
     t0 = time.time()
     ok = True
+    stopped = False
+    items = 0
+    error: Optional[str] = None
+    result: Any = None
     try:
-        job.func(*job.args, **job.kwargs)
-    except Exception:  # pragma: no cover - propagated
+        with use_token(job.token):
+            result = job.func(*job.args, **job.kwargs)
+    except JobCancelled as exc:
+        # cooperative stop: partial work is already committed by the job
         ok = False
+        stopped = True
+        items = exc.items
+        error = exc.reason
+        logger.info("job %s (%s) stopped: %s", job.name, job.run_id, exc.reason)
+    except Exception as exc:  # pragma: no cover - propagated
+        ok = False
+        error = str(exc)
+        job_log(job.run_id, "error", f"{type(exc).__name__}: {exc}")
         raise
     finally:
+        _local.job = None
+        with _queue_lock:
+            _running.pop(job.run_id, None)
+        if job.durable:
+            if ok or stopped or not job.checkpoint or job.attempts >= MAX_ATTEMPTS:
+                _release(job.run_id)
+            else:
+                _retry_later(job)
         ms = int((time.time() - t0) * 1000)
-        job_finished(run_id, ok, ms=ms)
+        _store_result(job, ok, result, error)
+        job_finished(run_id, ok, items=items, ms=ms, error=error)
     return True
 
 
+def current_job() -> Optional[Job]:
+    """Return the job executing on the calling thread, if any."""
+
+    return getattr(_local, "job", None)
+
+
+def cancel_job(run_id: str, reason: str = "cancelled") -> bool:
+    """Cancel a queued or running job.
+
+    Queued jobs are removed immediately. Running jobs have their token
+    cancelled and stop at their next cancellation check, reporting partial
+    results in ``job_finished``. Durable jobs held by another process get a
+    ``job_cancels`` row which their owner applies in :func:`poll_cancels`.
+    Returns ``False`` for unknown run ids.
+    """
+
+    with _queue_lock:
+        queued = next((e for e in _queue if e[2].run_id == run_id), None)
+        if queued is not None:
+            _queue.remove(queued)
+            heapq.heapify(_queue)
+        job = queued[2] if queued is not None else _running.get(run_id)
+    if queued is not None:
+        if job.durable:
+            _release(run_id)
+        _refresh_snapshot()
+        return True
+    if job is None:
+        return _request_cancel(run_id, reason)
+    job.token.cancel(reason)
+    return True
+
+
+def _request_cancel(run_id: str, reason: str) -> bool:
+    try:
+        con = db.connect()
+        try:
+            added = con.execute(
+                """
+                INSERT OR REPLACE INTO job_cancels(run_id, reason, requested)
+                SELECT run_id, ?, ? FROM job_queue
+                WHERE run_id=? AND state IN ('queued', 'leased')
+                """,
+                (reason, utcnow(), run_id),
+            ).rowcount
+            con.commit()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        logger.exception("job_cancels write failed")
+        return False
+    return bool(added)
+
+
+def poll_cancels() -> int:
+    """Apply cancellations requested elsewhere for jobs held by this process.
+
+    Requests for runs that have already left ``job_queue`` are dropped.
+    Returns the number of jobs cancelled here. Called every second, so it
+    only reads unless there is a request to act on.
+    """
+
+    local = _local_run_ids()
+    try:
+        con = db.connect()
+        try:
+            rows = con.execute(
+                """
+                SELECT c.run_id, c.reason, q.run_id IS NULL
+                FROM job_cancels c LEFT JOIN job_queue q ON q.run_id = c.run_id
+                """
+            ).fetchall()
+            mine = [(rid, reason) for rid, reason, _ in rows if rid in local]
+            done = [(rid,) for rid, _, gone in rows if gone or rid in local]
+            if done:
+                con.executemany("DELETE FROM job_cancels WHERE run_id=?", done)
+                con.commit()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        logger.exception("job_cancels read failed")
+        return 0
+    return sum(cancel_job(rid, reason) for rid, reason in mine)
+
+
+def job_result(run_id: str) -> Optional[Dict[str, Any]]:
+    """Return the state of a run and, once finished, its result.
+
+    ``state`` is ``queued``, ``running``, ``done`` or ``failed``. Finished
+    runs are read from ``job_results`` so any process can answer; ``None``
+    means the run is unknown or its result has expired.
+    """
+
+    con = db.connect()
+    try:
+        row = con.execute(
+            "SELECT name, ok, result_json, error, finished FROM job_results WHERE run_id=?",
+            (run_id,),
+        ).fetchone()
+        queued = None
+        if row is None:
+            queued = con.execute(
+                "SELECT name, state FROM job_queue WHERE run_id=?", (run_id,)
+            ).fetchone()
+    finally:
+        con.close()
+    if row is not None:
+        name, ok, result_json, error, finished = row
+        return {
+            "runId": run_id,
+            "job": name,
+            "state": "done" if ok else "failed",
+            "result": json.loads(result_json) if result_json else None,
+            "error": error,
+            "finished": finished,
+        }
+    job = _running.get(run_id)
+    if job is not None:
+        return {"runId": run_id, "job": job.name, "state": "running"}
+    for _, _, job in _queued():
+        if job.run_id == run_id:
+            return {"runId": run_id, "job": job.name, "state": "queued"}
+    if queued is not None:
+        name, state = queued
+        return {"runId": run_id, "job": name, "state": "running" if state == "leased" else "queued"}
+    return None
+
+
 def clear_queue() -> None:
     """Helper to clear internal state (primarily for tests)."""
 
     global _counter
-    _queue.clear()
+    with _queue_lock:
+        _queue.clear()
+        _running.clear()
+        _counter = 0
     JOB_QUEUE.clear()
-    _counter = 0
+
+
+# Durable queue --------------------------------------------------------------------
+
+
+def _lease_deadline() -> str:
+    return (utcnow_dt() + timedelta(seconds=LEASE_SECONDS)).strftime(
+        "%Y-%m-%d %H:%M:%S"
+    )
+
+
+def _write(sql: str, params: tuple) -> None:
+    """Run a single ``job_queue`` statement, logging instead of raising.
+
+    Persistence is best-effort: a locked or uninitialised database must not
+    stop the in-memory queue from making progress.
+    """
+
+    try:
+        con = db.connect()
+        try:
+            con.execute(sql, params)
+            con.commit()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        logger.exception("job_queue write failed")
+
+
+def _persist(job: Job) -> None:
+    _write(
+        """
+        INSERT OR REPLACE INTO job_queue
+          (run_id, name, priority, state, attempts, queued_at, owner, lease_until, checkpoint_json, updated)
+        VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?, ?)
+        """,
+        (
+            job.run_id,
+            job.name,
+            job.priority,
+            job.attempts,
+            job.queued_at,
+            WORKER_ID,
+            _lease_deadline(),
+            json.dumps(job.checkpoint) if job.checkpoint is not None else None,
+            utcnow(),
+        ),
+    )
+
+
+def _lease(job: Job) -> None:
+    _write(
+        """
+        UPDATE job_queue SET state='leased', attempts=?, owner=?, lease_until=?, updated=?
+        WHERE run_id=?
+        """,
+        (job.attempts, WORKER_ID, _lease_deadline(), utcnow(), job.run_id),
+    )
+
+
+def _release(run_id: str) -> None:
+    _write("DELETE FROM job_queue WHERE run_id=?", (run_id,))
+
+
+def _store_result(job: Job, ok: bool, result: Any, error: Optional[str]) -> None:
+    try:
+        payload = dumps(result) if result is not None else None
+    except Exception:
+        logger.exception("unserialisable result of %s", job.name)
+        payload = None
+    try:
+        con = db.connect()
+        try:
+            con.execute(
+                """
+                INSERT OR REPLACE INTO job_results(run_id, name, ok, result_json, error, finished)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (job.run_id, job.name, 1 if ok else 0, payload, error, utcnow()),
+            )
+            cutoff = (utcnow_dt() - timedelta(seconds=RESULT_RETAIN_SECONDS)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            )
+            con.execute("DELETE FROM job_results WHERE finished < ?", (cutoff,))
+            con.commit()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        logger.exception("job_results write failed")
+
+
+def _retry_later(job: Job) -> None:
+    """Hand a failed, checkpointed run back to the durable queue.
+
+    The row is released by this process with a lease expiring after a backoff,
+    after which :func:`reclaim_expired` picks it up with its cursor intact.
+    """
+
+    delay = timedelta(seconds=RETRY_SECONDS * job.attempts)
+    _write(
+        """
+        UPDATE job_queue SET state='queued', owner=NULL, lease_until=?, checkpoint_json=?, updated=?
+        WHERE run_id=?
+        """,
+        (
+            (utcnow_dt() + delay).strftime("%Y-%m-%d %H:%M:%S"),
+            json.dumps(job.checkpoint),
+            utcnow(),
+            job.run_id,
+        ),
+    )
+
+
+def checkpoint(job: Optional[Job] = None, force: bool = False, **cursor: Any) -> None:
+    """Merge ``cursor`` into the checkpoint of a running job.
+
+    The cursor is updated in memory immediately but persisted to ``job_queue``
+    and broadcast (reaching ``STATUS['inflight']``) at most every
+    ``CHECKPOINT_SECONDS`` unless ``force`` is set. ``job`` defaults to the job
+    running on the calling thread; pass it explicitly from helper threads.
+    Outside of a queued job this is a no-op so job functions can still be
+    called directly (for example from scripts).
+    """
+
+    job = job or current_job()
+    if job is None:
+        return
+    job.checkpoint = {**(job.checkpoint or {}), **cursor}
+    now = time.time()
+    if not force and now - job.checkpoint_ts < CHECKPOINT_SECONDS:
+        return
+    job.checkpoint_ts = now
+    if job.durable:
+        _write(
+            "UPDATE job_queue SET checkpoint_json=?, lease_until=?, updated=? WHERE run_id=?",
+            (json.dumps(job.checkpoint), _lease_deadline(), utcnow(), job.run_id),
+        )
+    job_checkpoint(job.run_id, job.checkpoint)
+
+
+def get_checkpoint(key: str, default: Any = None, job: Optional[Job] = None) -> Any:
+    """Return ``key`` from the checkpoint of the running job, or ``default``."""
+
+    job = job or current_job()
+    if job is None or not job.checkpoint:
+        return default
+    return job.checkpoint.get(key, default)
+
+
+def renew_leases() -> None:
+    """Extend the lease on every ``job_queue`` row owned by this process."""
+
+    _write(
+        """
+        UPDATE job_queue SET lease_until=?
+        WHERE owner=? AND state IN ('queued', 'leased')
+        """,
+        (_lease_deadline(), WORKER_ID),
+    )
+
+
+def hold_role(role: str) -> bool:
+    """Take or renew the lease on ``role``; ``True`` while this process holds it.
+
+    A role is free once its holder's lease lapsed, so exactly one live
+    process holds it at a time.
+    """
+
+    now = utcnow()
+    try:
+        con = db.connect()
+        try:
+            held = con.execute(
+                """
+                INSERT INTO worker_roles(role, owner, lease_until) VALUES (?, ?, ?)
+                ON CONFLICT(role) DO UPDATE
+                SET owner=excluded.owner, lease_until=excluded.lease_until
+                WHERE worker_roles.owner=excluded.owner OR worker_roles.lease_until <= ?
+                """,
+                (role, WORKER_ID, _lease_deadline(), now),
+            ).rowcount
+            con.commit()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        logger.exception("worker_roles write failed")
+        return False
+    return bool(held)
+
+
+def release_role(role: str) -> None:
+    """Give up ``role`` so another process can take it without waiting."""
+
+    _write("DELETE FROM worker_roles WHERE role=? AND owner=?", (role, WORKER_ID))
+
+
+def pending_job_names() -> Set[str]:
+    """Return names of jobs queued or running here or in the durable queue."""
+
+    names = {job.name for _, _, job in _queued()}
+    try:
+        con = db.connect()
+        try:
+            names.update(
+                name
+                for (name,) in con.execute(
+                    "SELECT DISTINCT name FROM job_queue WHERE state IN ('queued', 'leased')"
+                )
+            )
+        finally:
+            con.close()
+    except sqlite3.Error:
+        logger.exception("job_queue read failed")
+    return names
+
+
+def reclaim_expired(
+    funcs: Dict[str, Callable[..., Any]],
+    timeouts: Optional[Dict[str, Optional[float]]] = None,
+) -> List[Job]:
+    """Claim durable jobs whose owner's lease lapsed and requeue them here.
+
+    ``funcs`` maps job names to callables (and ``timeouts`` to their time
+    limits) since neither is stored in the database. Rows naming unknown jobs, or jobs that already used up
+    ``MAX_ATTEMPTS``, are dropped and recorded as failed in ``jobs_history``.
+    """
+
+    now = utcnow()
+    local = _local_run_ids()
+    resumed: List[Job] = []
+    abandoned: List[Tuple[str, str, int]] = []
+    try:
+        con = db.connect()
+        try:
+            rows = con.execute(
+                """
+                SELECT run_id, name, priority, attempts, queued_at, checkpoint_json
+                FROM job_queue
+                WHERE state IN ('queued', 'leased') AND lease_until <= ?
+                ORDER BY queued_at
+                """,
+                (now,),
+            ).fetchall()
+            for rid, name, priority, attempts, queued_at, cp in rows:
+                if rid in local:
+                    continue
+                claimed = con.execute(
+                    """
+                    UPDATE job_queue SET owner=?, state='queued', lease_until=?, updated=?
+                    WHERE run_id=? AND lease_until <= ?
+                    """,
+                    (WORKER_ID, _lease_deadline(), now, rid, now),
+                ).rowcount
+                if not claimed:
+                    # another process got there first
+                    continue
+                func = funcs.get(name)
+                if func is None or attempts >= MAX_ATTEMPTS:
+                    con.execute("DELETE FROM job_queue WHERE run_id=?", (rid,))
+                    abandoned.append((name, rid, attempts))
+                    continue
+                resumed.append(
+                    Job(
+                        name,
+                        func,
+                        priority=priority,
+                        queued_at=queued_at,
+                        run_id=rid,
+                        durable=True,
+                        attempts=attempts,
+                        checkpoint=json.loads(cp) if cp else None,
+                        timeout=(timeouts or {}).get(name),
+                    )
+                )
+            con.commit()
+        finally:
+            con.close()
+    except sqlite3.Error:
+        logger.exception("job_queue recovery failed")
+        return []
+
+    for name, rid, attempts in abandoned:
+        logger.warning("abandoning job %s (%s) after %s attempts", name, rid, attempts)
+        record_job(name, False, {"error": "abandoned", "runId": rid, "attempts": attempts})
+
+    global _counter
+    for job in resumed:
+        logger.info("resuming job %s (%s) attempt %s", job.name, job.run_id, job.attempts + 1)
+        with _queue_lock:
+            heapq.heappush(_queue, (_PRIORITY.get(job.priority, 3), _counter, job))
+            _counter += 1
+    if resumed:
+        _refresh_snapshot()
+    return resumed
 
 
 # Rate limiter ---------------------------------------------------------------------
@@ -183,8 +728,7 @@ def record_job(name: str, ok: bool, details: Optional[Any] = None) -> None:
     rec: Dict[str, Any] = {"job": name, "ok": ok, "ts": ts}
     if isinstance(details, dict) and "ms" in details:
         rec["ms"] = details["ms"]
-    STATUS.setdefault("last_runs", [])
-    STATUS["last_runs"] = [rec] + STATUS["last_runs"][:19]
+    add_last_run(rec)
     STATUS.setdefault("counts", {})
     STATUS["counts"]["jobs_10m"] = count_10m
 
@@ -0,0 +1,93 @@
+"""Fee-adjusted profit columns on the ``latest_prices`` table.
+
+Listings filter and sort on ``profit_pct``/``deal`` through indexes instead
+of calling Python functions per row. Rows changed by new snapshots are
+marked stale by a trigger; a change of fees or deal thresholds alters the
+pricing key and reprices every row once. Repricing runs when the price
+pipeline reports new snapshots and when settings are written (see
+:func:`install`), so listings only ever read the table.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import astuple
+from typing import Any, Dict, Mapping, Optional
+
+from . import db
+from .emit import subscribe_pipeline
+from .pricing import compute_profit, deal_label, fees_from_settings
+from .settings_service import get_settings, subscribe
+from .ticks import tick
+
+# DB path -> pricing key every row was last repriced with in this process
+_priced: Dict[str, str] = {}
+
+
+def pricing_key(settings: Mapping[str, Any]) -> str:
+    """Return a key identifying the inputs of the profit columns."""
+    fees = fees_from_settings(settings)
+    return json.dumps([astuple(fees), settings["DEAL_THRESHOLDS"]], sort_keys=True)
+
+
+def refresh_profits(con: sqlite3.Connection, settings: Optional[Mapping[str, Any]] = None) -> int:
+    """Recompute stale profit columns and return how many rows changed.
+
+    ``profit_isk``/``profit_pct`` keep negative values; callers floor them
+    when needed. ``deal`` is labelled from the floored percentage.
+    """
+    settings = settings or get_settings()
+    key = pricing_key(settings)
+    fees = fees_from_settings(settings)
+    thresholds = settings["DEAL_THRESHOLDS"]
+    path = str(db.DB_PATH)
+    if _priced.get(path) != key:
+        rows = con.execute(
+            "SELECT type_id, station_id, best_bid, best_ask FROM latest_prices "
+            "WHERE priced_key IS NULL OR priced_key != ?",
+            (key,),
+        ).fetchall()
+    else:
+        rows = con.execute(
+            "SELECT type_id, station_id, best_bid, best_ask FROM latest_prices "
+            "WHERE priced_key IS NULL"
+        ).fetchall()
+    updates = []
+    for tid, sid, bid, ask in rows:
+        isk, pct = compute_profit(bid, ask, fees, tick, floor_negative=False)
+        updates.append((isk, pct, deal_label(max(0.0, pct), thresholds=thresholds), key, tid, sid))
+    if updates:
+        con.executemany(
+            "UPDATE latest_prices SET profit_isk=?, profit_pct=?, deal=?, priced_key=? "
+            "WHERE type_id=? AND station_id=?",
+            updates,
+        )
+        con.commit()
+    _priced[path] = key
+    return len(updates)
+
+
+# Refresh triggers --------------------------------------------------------------------
+
+
+def reprice() -> None:
+    """Reprice stale rows on a connection of its own."""
+    with db.session() as con:
+        refresh_profits(con)
+
+
+def _on_price_updated(evt: dict, type_ids: list[int]) -> None:
+    # runs before the event is published, so readers see repriced rows
+    reprice()
+
+
+def _on_settings(scope: str) -> None:
+    if scope == "settings":
+        reprice()
+
+
+def install() -> None:
+    """Reprice after price pipeline events and settings writes in this process."""
+    subscribe_pipeline("pipeline.price.updated", _on_price_updated)
+    subscribe(_on_settings)
@@ -0,0 +1,124 @@
+"""Keyset pagination and cached totals for list endpoints.
+
+Pages after the first are requested with an opaque ``cursor`` holding the
+sort value and tie-breaker of the last row seen, so SQLite seeks straight
+to the next page instead of skipping ``offset`` rows. Totals are cached per
+query and refreshed in the background once older than
+``TOTAL_TTL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import base64
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Sequence
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+TOTAL_TTL_SECONDS = 30.0
+TOTALS_MAX = 512
+
+
+def direction(dir: str) -> str:
+    """Normalise a user supplied sort direction."""
+    return "ASC" if dir.lower() == "asc" else "DESC"
+
+
+def sort_expr(expr: str, nullable: bool = False, numeric: bool = False) -> str:
+    """Return an ORDER BY expression usable in a keyset comparison.
+
+    Row-value comparisons never match NULL, so nullable columns are mapped
+    to a sentinel below every real value; this keeps SQLite's NULLs-first
+    ordering.
+    """
+    if not nullable:
+        return expr
+    sentinel = "-1e308" if numeric else "''"
+    return f"COALESCE({expr}, {sentinel})"
+
+
+def encode_cursor(sort: str, dir: str, values: Sequence[Any]) -> str:
+    raw = json.dumps({"s": sort, "d": dir, "k": list(values)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str, dir: str) -> list[Any]:
+    """Return the key values of ``token``; 400 if invalid or for another sort."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        values = data["k"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if data.get("s") != sort or data.get("d") != dir or not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Cursor does not match sort")
+    return values
+
+
+def after(exprs: Sequence[str], dir: str, values: Sequence[Any]) -> tuple[str, list[Any]]:
+    """Return a WHERE fragment selecting rows after ``values`` in sort order."""
+    op = ">" if dir == "ASC" else "<"
+    cols = ", ".join(exprs)
+    marks = ", ".join("?" for _ in exprs)
+    return f"({cols}) {op} ({marks})", list(values)
+
+
+def next_cursor(sort: str, dir: str, rows: Sequence[Any], limit: int, key: Callable[[Any], Sequence[Any]]) -> str | None:
+    """Cursor for the page after ``rows`` or ``None`` on the last page."""
+    if limit <= 0 or len(rows) < limit:
+        return None
+    return encode_cursor(sort, dir, key(rows[-1]))
+
+
+_totals: Dict[Hashable, tuple[int, float]] = {}
+_refreshing: set = set()
+_lock = threading.Lock()
+
+
+def _store(key: Hashable, value: int) -> None:
+    with _lock:
+        _totals.pop(key, None)
+        _totals[key] = (value, time.monotonic())
+        while len(_totals) > TOTALS_MAX:
+            _totals.pop(next(iter(_totals)))
+
+
+def _refresh(key: Hashable, compute: Callable[[], int]) -> None:
+    try:
+        value = compute()
+    except Exception:
+        logger.exception("total refresh failed")
+    else:
+        _store(key, value)
+    finally:
+        with _lock:
+            _refreshing.discard(key)
+
+
+def cached_total(key: Hashable, compute: Callable[[], int]) -> int:
+    """Return the total for ``key``.
+
+    Only the first request for a query counts synchronously; later ones,
+    first pages included, get the cached value, refreshed in a background
+    thread when older than ``TOTAL_TTL_SECONDS``. ``compute`` must open its
+    own connection since it may run on another thread.
+    """
+    with _lock:
+        hit = _totals.get(key)
+    if hit is None:
+        value = compute()
+        _store(key, value)
+        return value
+    value, ts = hit
+    if time.monotonic() - ts > TOTAL_TTL_SECONDS:
+        with _lock:
+            start = key not in _refreshing
+            _refreshing.add(key)
+        if start:
+            threading.Thread(target=_refresh, args=(key, compute), daemon=True).start()
+    return value
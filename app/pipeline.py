@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+"""Event-driven pipeline: snapshots → valuations → recommendations.
+
+``GRAPH`` maps pipeline events to the jobs consuming them. When a producer
+emits ``pipeline.price.updated`` (or ``pipeline.profit.updated``) with the
+type ids it touched, the ids are added to each consumer's dirty set in the
+``pipeline_dirty`` table and the consumer is enqueued unless a run is already
+pending. Consumers drain only their dirty ids, so a burst of upstream updates
+coalesces into a single run over the union of the changed types, and nothing
+runs when nothing changed.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .db import connect
+from .emit import subscribe_pipeline, pipeline_profit_updated
+from .jobs import pending_job_names, record_job
+from .recommender import build_recommendations
+from .valuation import valuations_from_snapshots, refresh_portfolio_snapshot
+from .util import utcnow
+
+logger = logging.getLogger(__name__)
+
+# event type -> consumer jobs. Valuations and recommendations both read the
+# snapshot tables, so both hang off price updates; the timer-driven
+# ``refresh_type_valuations`` and ``recommender_scan`` jobs remain as periodic
+# full sweeps.
+GRAPH: Dict[str, List[str]] = {
+    "pipeline.price.updated": ["pipeline_valuations", "pipeline_recommendations"],
+}
+
+_enqueue: Optional[Callable[[str], Any]] = None
+
+
+def mark_dirty(job: str, type_ids: List[int]) -> None:
+    """Add ``type_ids`` to the dirty set of ``job``."""
+    if not type_ids:
+        return
+    now = utcnow()
+    con = connect()
+    try:
+        con.executemany(
+            "INSERT OR REPLACE INTO pipeline_dirty(job, type_id, marked) VALUES (?,?,?)",
+            [(job, tid, now) for tid in type_ids],
+        )
+        con.commit()
+    finally:
+        con.close()
+
+
+def take_dirty(job: str) -> Tuple[List[int], int]:
+    """Return the dirty type ids of ``job`` and a cursor for :func:`clear_dirty`.
+
+    ``INSERT OR REPLACE`` gives a re-marked row a new, larger ``rowid``, so the
+    highest ``rowid`` seen here separates ids taken now from ids marked later.
+    """
+    con = connect()
+    try:
+        rows = con.execute(
+            "SELECT rowid, type_id FROM pipeline_dirty WHERE job=? ORDER BY type_id",
+            (job,),
+        ).fetchall()
+    finally:
+        con.close()
+    return [tid for _, tid in rows], max((rid for rid, _ in rows), default=0)
+
+
+def clear_dirty(job: str, cursor: int) -> None:
+    """Drop the ids taken up to ``cursor``; enqueue a follow-up run for the rest."""
+    con = connect()
+    try:
+        con.execute(
+            "DELETE FROM pipeline_dirty WHERE job=? AND rowid <= ?", (job, cursor)
+        )
+        con.commit()
+        remaining = con.execute(
+            "SELECT COUNT(*) FROM pipeline_dirty WHERE job=?", (job,)
+        ).fetchone()[0]
+    finally:
+        con.close()
+    if remaining and _enqueue is not None:
+        _enqueue(job)
+
+
+def _on_event(evt: dict, type_ids: List[int]) -> None:
+    consumers = GRAPH.get(evt["type"], [])
+    if not type_ids or not consumers:
+        return
+    for job in consumers:
+        mark_dirty(job, type_ids)
+    if _enqueue is None:
+        return
+    pending = pending_job_names()
+    for job in consumers:
+        if job not in pending:
+            _enqueue(job)
+
+
+def install(enqueue: Callable[[str], Any]) -> None:
+    """Subscribe the graph to pipeline events, enqueueing jobs via ``enqueue``."""
+    global _enqueue
+    _enqueue = enqueue
+    for event_type in GRAPH:
+        subscribe_pipeline(event_type, _on_event)
+
+
+# Consumer jobs -------------------------------------------------------------------
+
+
+def run_valuations() -> None:
+    """Revalue held types whose snapshots changed, straight from the snapshots."""
+    name = "pipeline_valuations"
+    ids, cursor = take_dirty(name)
+    try:
+        con = connect()
+        try:
+            held = {
+                tid
+                for (tid,) in con.execute(
+                    "SELECT DISTINCT type_id FROM assets UNION SELECT DISTINCT type_id FROM char_orders"
+                )
+            }
+            valued = valuations_from_snapshots(con, [t for t in ids if t in held])
+            if valued:
+                refresh_portfolio_snapshot(con)
+        finally:
+            con.close()
+        clear_dirty(name, cursor)
+        if valued:
+            pipeline_profit_updated(len(valued), utcnow(), valued)
+        record_job(name, True, {"changed": len(ids), "count": len(valued)})
+    except Exception as exc:  # pragma: no cover - propagated
+        record_job(name, False, {"error": str(exc)})
+        raise
+
+
+def run_recommendations() -> None:
+    """Rescore recommendation candidates whose snapshots changed."""
+    name = "pipeline_recommendations"
+    ids, cursor = take_dirty(name)
+    try:
+        recs = build_recommendations(mode="profit_only", type_ids=ids) if ids else []
+        clear_dirty(name, cursor)
+        record_job(name, True, {"changed": len(ids), "count": len(recs)})
+    except Exception as exc:  # pragma: no cover - propagated
+        record_job(name, False, {"error": str(exc)})
+        raise
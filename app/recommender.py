@@ -16,7 +16,8 @@ from .emit import (
     pipeline_profit_updated,
 )
 from .util import utcnow
-from typing import Literal
+from .cancel import JobCancelled, check_cancelled
+from typing import Iterable, Literal, Optional
 
 
 def build_recommendations(
@@ -24,12 +25,17 @@ def build_recommendations(
     verbose: bool = False,
     dry_run: bool = False,
     mode: Literal["profit_only", "legacy"] = "profit_only",
+    type_ids: Optional[Iterable[int]] = None,
 ):
     """Populate the recommendations table with top candidates.
 
     When ``dry_run`` is ``True`` the database is left untouched and a summary
     of pipeline counts is returned instead of inserted rows.
 
+    ``type_ids`` restricts scoring to those of the top ``limit`` candidates
+    whose data changed, which is how the event-driven pipeline rebuilds only
+    what a snapshot tick touched.
+
     Emits ``build_*`` events so the UI can surface progress for the
     recommendations build. When ``verbose`` is ``True`` extra progress
     updates are sent to help manual QA.
@@ -43,6 +49,10 @@ def build_recommendations(
             (MIN_DAILY_VOL, limit),
         ).fetchall()
 
+        if type_ids is not None:
+            changed = set(type_ids)
+            rows = [r for r in rows if r[0] in changed]
+
         candidates = len(rows)
         bid = build_started(
             "recommendations", {"fresh_ms": REC_FRESH_MS, "candidates": candidates}
@@ -102,6 +112,7 @@ def build_recommendations(
 
         results = []
         for i, (type_id, _) in enumerate(rows, start=1):
+            check_cancelled()
             rec = evaluate_type(type_id)
             if not rec:
                 continue
@@ -152,8 +163,21 @@ def build_recommendations(
         con.commit()
         record_job("recommendations", True, {"count": scored})
         build_finished(bid, True, rows=scored, ms=ms)
-        pipeline_profit_updated(scored, utcnow())
+        pipeline_profit_updated(scored, utcnow(), [r["type_id"] for r in results])
         return results
+    except JobCancelled as e:
+        # keep the candidates scored before the stop
+        ms = int((time.time() - t0) * 1000)
+        e.items = len(results)
+        if not dry_run:
+            con.commit()
+            record_job("recommendations", False, {"error": e.reason, "count": e.items})
+            if e.items:
+                pipeline_profit_updated(
+                    e.items, utcnow(), [r["type_id"] for r in results]
+                )
+        build_finished(bid, False, rows=e.items, ms=ms, error=e.reason)
+        raise
     except Exception as e:
         ms = int((time.time() - t0) * 1000)
         if not dry_run:
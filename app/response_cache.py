@@ -0,0 +1,188 @@
+"""In-process cache for read endpoints whose data changes with the pipeline.
+
+Responses are cached per database, path and normalised query string. Each
+route lists the data tags it depends on. An entry is reused while those
+tags' version counters are unchanged. :func:`observe` bumps the counters for
+every event emitted in this process or relayed from another one. Routes
+that render wall-clock derived fields (``fresh_ms``, ages) also set a
+``max_age``.
+
+Cached and fresh responses carry a strong ``ETag`` over the body; a
+matching ``If-None-Match`` gets ``304 Not Modified``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import parse_qsl
+
+from . import db
+
+MAX_ENTRIES = 256
+
+# event type -> data tags it invalidates
+EVENT_TAGS: Dict[str, tuple[str, ...]] = {
+    "pipeline.price.updated": ("price",),
+    "pipeline.profit.updated": ("profit",),
+    "settings.updated": ("settings",),
+    # jobs such as trends and character sync write without a pipeline event
+    "job_finished": ("jobs",),
+}
+
+# path -> (tags, max_age seconds or None)
+ROUTES: Dict[str, tuple[tuple[str, ...], Optional[float]]] = {
+    "/db/items": (("price", "profit", "settings", "jobs"), 15.0),
+    "/recommendations": (("price", "profit", "settings", "jobs"), 15.0),
+    "/coverage": (("price",), 5.0),
+    "/inventory/coverage": (("price",), 5.0),
+    "/portfolio/inventory": (("profit", "jobs"), None),
+    # realized PnL windows slide with the clock
+    "/portfolio/summary": (("profit", "settings", "jobs"), 60.0),
+    "/portfolio/nav": (("profit", "settings", "jobs"), None),
+}
+
+_versions: Dict[str, int] = {}
+_entries: Dict[tuple, "_Entry"] = {}
+_lock = threading.Lock()
+
+
+class _Entry:
+    __slots__ = ("versions", "stored", "etag", "headers", "body")
+
+    def __init__(self, versions: tuple, etag: bytes, headers: list, body: bytes) -> None:
+        self.versions = versions
+        self.stored = time.monotonic()
+        self.etag = etag
+        self.headers = headers
+        self.body = body
+
+
+def bump(*tags: str) -> None:
+    """Invalidate cached responses depending on any of ``tags``."""
+    with _lock:
+        for tag in tags:
+            _versions[tag] = _versions.get(tag, 0) + 1
+
+
+def observe(evt: Dict[str, Any]) -> None:
+    """Bump the tags affected by ``evt``; cheap for unrelated events."""
+    tags = EVENT_TAGS.get(evt.get("type"))
+    if tags:
+        bump(*tags)
+
+
+def clear() -> None:
+    """Drop every cached response."""
+    with _lock:
+        _entries.clear()
+
+
+def _current(tags: Iterable[str]) -> tuple:
+    with _lock:
+        return tuple(_versions.get(t, 0) for t in tags)
+
+
+def _etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def _matches(header: Optional[bytes], etag: bytes) -> bool:
+    if not header:
+        return False
+    if header.strip() == b"*":
+        return True
+    tags = {t.strip().removeprefix(b"W/") for t in header.split(b",")}
+    return etag in tags
+
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[bytes]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value
+    return None
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving :data:`ROUTES` from the cache."""
+
+    def __init__(self, app: Any, routes: Optional[Dict[str, tuple]] = None) -> None:
+        self.app = app
+        self.routes = ROUTES if routes is None else routes
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        route = self.routes.get(scope.get("path")) if scope["type"] == "http" else None
+        if route is None or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        tags, max_age = route
+        query = tuple(sorted(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)))
+        key = (str(db.DB_PATH), scope["path"], query)
+        versions = _current(tags)
+        if_none_match = _header(scope, b"if-none-match")
+
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                fresh = entry.versions == versions and (
+                    max_age is None or time.monotonic() - entry.stored < max_age
+                )
+                if fresh:
+                    # keep recently used entries at the end for eviction
+                    _entries[key] = _entries.pop(key)
+                else:
+                    del _entries[key]
+                    entry = None
+        if entry is not None:
+            await self._reply(send, entry.etag, entry.headers, entry.body, if_none_match)
+            return
+
+        start: Dict[str, Any] = {}
+        chunks: list[bytes] = []
+
+        async def capture(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    await finish()
+
+        async def finish() -> None:
+            body = b"".join(chunks)
+            if start.get("status") != 200:
+                await send(start)
+                await send({"type": "http.response.body", "body": body})
+                return
+            etag = _etag(body)
+            headers = [
+                (k, v)
+                for k, v in start.get("headers", [])
+                if k.lower() not in (b"content-length", b"etag", b"cache-control")
+            ]
+            with _lock:
+                # a bump while computing would make this entry stale already
+                _entries[key] = _Entry(versions, etag, headers, body)
+                while len(_entries) > MAX_ENTRIES:
+                    _entries.pop(next(iter(_entries)))
+            await self._reply(send, etag, headers, body, if_none_match)
+
+        await self.app(scope, receive, capture)
+
+    @staticmethod
+    async def _reply(send: Any, etag: bytes, headers: list, body: bytes, if_none_match: Optional[bytes]) -> None:
+        common = [(b"etag", etag), (b"cache-control", b"no-cache")]
+        if _matches(if_none_match, etag):
+            await send({"type": "http.response.start", "status": 304, "headers": common})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": headers + common + [(b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
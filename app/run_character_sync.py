@@ -10,7 +10,7 @@ from .char_sync import (
     sync_order_history,
     sync_assets,
 )
-from .valuation import refresh_type_valuations, compute_portfolio_snapshot
+from .valuation import refresh_type_valuations, refresh_portfolio_snapshot
 from .pnl import pnl_fifo
 from .auth import get_token
 
@@ -40,7 +40,7 @@ def main():
     )
     if type_ids:
         refresh_type_valuations(con, sorted(type_ids))
-    snap = compute_portfolio_snapshot(con)
+    snap = refresh_portfolio_snapshot(con)
     print("Portfolio:", snap)
 
 
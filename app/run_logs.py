@@ -0,0 +1,244 @@
+"""Per-run job logs: full detail on disk, sampled live events.
+
+Every message logged for a run is appended to ``<runId>.jsonl`` under
+:func:`log_dir` with a per-run sequence number; files rotate at
+``MAX_BYTES`` keeping ``BACKUPS`` older generations. When a run's log is
+closed, logs of runs untouched for ``KEEP_DAYS`` and all but the newest
+``KEEP_RUNS`` runs are deleted. Live ``job_log``
+events are rate limited per run with a token bucket. Warnings and errors
+always go out; sampled-away messages are summarised in the next event.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from . import db
+from .util import utcnow
+
+RATE_PER_SECOND = 5.0
+BURST = 20
+MAX_BYTES = 1_000_000
+BACKUPS = 3
+# retention across runs
+KEEP_RUNS = 500
+KEEP_DAYS = 14
+ALWAYS_EMIT = {"warning", "error", "critical"}
+
+_SAFE_ID = re.compile(r"^[A-Za-z0-9_.-]+$")
+# <runId>.jsonl or a rotated <runId>.<n>.jsonl
+_LOG_NAME = re.compile(r"^(.+?)(?:\.\d+)?\.jsonl$")
+
+
+def log_dir() -> Path:
+    """Directory holding per-run logs (``RUN_LOG_DIR`` or next to the DB)."""
+    return Path(os.getenv("RUN_LOG_DIR") or Path(db.DB_PATH).parent / "run_logs")
+
+
+def _paths(run_id: str) -> list[Path]:
+    """Log files of ``run_id`` from oldest to newest."""
+    base = log_dir()
+    older = [base / f"{run_id}.{n}.jsonl" for n in range(BACKUPS, 0, -1)]
+    return older + [base / f"{run_id}.jsonl"]
+
+
+class _RunLog:
+    def __init__(self, run_id: str) -> None:
+        self.run_id = run_id
+        self.path = log_dir() / f"{run_id}.jsonl"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.seq = self._last_seq()
+        self.tokens = float(BURST)
+        self.refilled = time.monotonic()
+        self.suppressed = 0
+        self.fh = self.path.open("a", encoding="utf-8")
+
+    def _last_seq(self) -> int:
+        # resumed runs keep their runId; continue the sequence
+        for path in reversed(_paths(self.run_id)):
+            if path.exists():
+                lines = path.read_text(encoding="utf-8").splitlines()
+                if lines:
+                    return json.loads(lines[-1])["seq"]
+        return 0
+
+    def write(self, level: str, message: str) -> Dict[str, Any]:
+        self.seq += 1
+        rec = {"seq": self.seq, "ts": utcnow(), "level": level, "message": message}
+        self.fh.write(json.dumps(rec) + "\n")
+        self.fh.flush()
+        if self.fh.tell() >= MAX_BYTES:
+            self._rotate()
+        return rec
+
+    def _rotate(self) -> None:
+        self.fh.close()
+        paths = _paths(self.run_id)
+        paths[0].unlink(missing_ok=True)
+        for older, newer in zip(paths, paths[1:]):
+            if newer.exists():
+                newer.rename(older)
+        self.fh = self.path.open("a", encoding="utf-8")
+
+    def take_token(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(BURST, self.tokens + (now - self.refilled) * RATE_PER_SECOND)
+        self.refilled = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+_runs: Dict[str, _RunLog] = {}
+_lock = threading.Lock()
+
+
+def _summary(rl: _RunLog) -> Optional[Dict[str, Any]]:
+    if not rl.suppressed:
+        return None
+    evt = {
+        "type": "job_log",
+        "runId": rl.run_id,
+        "level": "info",
+        "message": f"{rl.suppressed} messages suppressed",
+        "suppressed": rl.suppressed,
+        "seq": rl.seq,
+    }
+    rl.suppressed = 0
+    return evt
+
+
+def log(run_id: str, level: str, message: str, emit: Callable[[dict], None]) -> None:
+    """Record a message for ``run_id`` and emit it if the sampler allows."""
+    level = level.lower()
+    with _lock:
+        rl = _runs.get(run_id)
+        if rl is None:
+            rl = _runs[run_id] = _RunLog(run_id)
+        rec = rl.write(level, message)
+        if level not in ALWAYS_EMIT and not rl.take_token():
+            rl.suppressed += 1
+            return
+        pending = [e for e in (_summary(rl),) if e]
+    # emit outside the lock; the bus may deliver synchronously
+    for evt in pending:
+        emit(evt)
+    emit({"type": "job_log", "runId": run_id, **rec})
+
+
+def close(run_id: str, emit: Callable[[dict], None]) -> None:
+    """Flush the suppressed-count summary and close the run's log file."""
+    with _lock:
+        rl = _runs.pop(run_id, None)
+        if rl is None:
+            return
+        evt = _summary(rl)
+        rl.fh.close()
+        active = frozenset(_runs)
+    prune(keep=active)
+    if evt:
+        emit(evt)
+
+
+def prune(keep: frozenset[str] = frozenset()) -> int:
+    """Delete logs beyond the retention limits; returns the runs removed.
+
+    Runs are ranked by their newest file. Runs in ``keep`` (still being
+    written) count towards ``KEEP_RUNS`` but are never removed.
+    """
+    files: Dict[str, list[Path]] = {}
+    newest: Dict[str, float] = {}
+    try:
+        entries = list(os.scandir(log_dir()))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        m = _LOG_NAME.match(entry.name)
+        if not m:
+            continue
+        try:
+            mtime = entry.stat().st_mtime
+        except FileNotFoundError:
+            continue
+        run_id = m.group(1)
+        files.setdefault(run_id, []).append(Path(entry.path))
+        newest[run_id] = max(newest.get(run_id, 0.0), mtime)
+    ranked = sorted(newest, key=newest.__getitem__, reverse=True)
+    cutoff = time.time() - KEEP_DAYS * 86400
+    doomed = [
+        run_id
+        for i, run_id in enumerate(ranked)
+        if run_id not in keep and (i >= KEEP_RUNS or newest[run_id] < cutoff)
+    ]
+    for run_id in doomed:
+        for path in files[run_id]:
+            path.unlink(missing_ok=True)
+    return len(doomed)
+
+
+def _last_seq_in(path: Path) -> int:
+    """Sequence number of the last complete record in ``path``."""
+    with path.open("rb") as fh:
+        end = fh.seek(0, os.SEEK_END)
+        size = 4096
+        while True:
+            start = max(0, end - size)
+            fh.seek(start)
+            lines = fh.read(end - start).splitlines()
+            # the first line may be cut unless we read from the start
+            if len(lines) > 1 or start == 0:
+                return json.loads(lines[-1])["seq"] if lines else 0
+            size *= 2
+
+
+def read(run_id: str, after: int = 0, limit: int = 200) -> Optional[Dict[str, Any]]:
+    """Return up to ``limit`` records with ``seq > after``.
+
+    ``None`` means the run has no log. ``cursor`` is the ``after`` value for
+    the next call; ``hasMore`` tells whether it would return records now.
+    Files are read without the writer lock: rotated generations that end at
+    or before ``after`` are skipped, a line still being written is ignored
+    and records seen twice across a concurrent rotation are dropped.
+    """
+    if not _SAFE_ID.match(run_id):
+        return None
+    paths = [p for p in _paths(run_id) if p.exists()]
+    if not paths:
+        return None
+    items: list[Dict[str, Any]] = []
+    more = False
+    last = after
+    for i, path in enumerate(paths):
+        try:
+            if i < len(paths) - 1 and _last_seq_in(path) <= after:
+                continue
+            with path.open(encoding="utf-8") as fh:
+                for line in fh:
+                    if not line.endswith("\n"):
+                        break
+                    rec = json.loads(line)
+                    if rec["seq"] <= last:
+                        continue
+                    if len(items) == limit:
+                        more = True
+                        break
+                    items.append(rec)
+                    last = rec["seq"]
+        except FileNotFoundError:
+            # rotated away between listing and opening
+            continue
+        if more:
+            break
+    return {
+        "runId": run_id,
+        "items": items,
+        "cursor": items[-1]["seq"] if items else after,
+        "hasMore": more,
+    }
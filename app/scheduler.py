@@ -4,11 +4,13 @@ from concurrent.futures import ThreadPoolExecutor
 from threading import Lock
 from .db import connect
 from .jita_snapshots import refresh_one
-from .jobs import record_job
+from .jobs import record_job, current_job, checkpoint, get_checkpoint
 from .status import STATUS
+from .cancel import JobCancelled, cancelled, current_token, use_token
 from .emit import (
     job_started,
     job_progress,
+    job_log,
     job_finished,
     emit_sync,
     pipeline_price_updated,
@@ -76,6 +78,13 @@ def run_tick(max_calls: int = 800, workers: int = 6) -> None:
     logger.info("Running scheduler tick")
     workers = _select_workers(workers)
 
+    # Refreshed types are committed one by one and drop out of the due list,
+    # so a resumed tick only needs to carry its running totals forward.
+    job = current_job()
+    token = current_token()
+    resumed = get_checkpoint("done", 0, job)
+    max_calls = max(0, max_calls - resumed)
+
     con = connect()
     try:
         due = con.execute(
@@ -108,6 +117,7 @@ def run_tick(max_calls: int = 800, workers: int = 6) -> None:
             "selected": count,
             "workers": workers,
             "expected_pages": count,
+            "resumed": resumed,
         }
     )
 
@@ -115,42 +125,63 @@ def run_tick(max_calls: int = 800, workers: int = 6) -> None:
     lock = Lock()
     completed = 0
     errors = 0
+    touched: list[int] = []
 
     def _run(tid: int) -> None:
         nonlocal completed, errors
+        if cancelled(token):
+            # drain remaining submissions without touching ESI
+            return
         try:
-            c = connect()
-            try:
-                refresh_one(c, tid)
-                c.commit()
-            finally:
-                c.close()
-        except Exception:
+            # pool threads do not inherit the job's token; bind it so ESI
+            # calls honour cancellation and the job deadline
+            with use_token(token):
+                c = connect()
+                try:
+                    refresh_one(c, tid)
+                    c.commit()
+                finally:
+                    c.close()
+        except JobCancelled:
+            return
+        except Exception as exc:
+            job_log(rid, "warning", f"type {tid} refresh failed: {exc}")
             errors += 1
-        finally:
+        else:
             with lock:
-                completed += 1
-                pct = int(completed / count * 100) if count else 100
-                job_progress(rid, pct, f"type {tid}")
-                emit_sync(
-                    {
-                        "job": "scheduler_tick",
-                        "runId": rid,
-                        "phase": "progress",
-                        "done": completed,
-                        "total": count,
-                        "detail": f"type {tid}",
-                    }
-                )
+                touched.append(tid)
+        with lock:
+            completed += 1
+            pct = int(completed / count * 100) if count else 100
+            job_progress(rid, pct, f"type {tid}")
+            checkpoint(
+                job,
+                done=resumed + completed,
+                total=resumed + count,
+                errors=errors,
+            )
+            emit_sync(
+                {
+                    "job": "scheduler_tick",
+                    "runId": rid,
+                    "phase": "progress",
+                    "done": completed,
+                    "total": count,
+                    "detail": f"type {tid}",
+                }
+            )
 
     try:
         with ThreadPoolExecutor(max_workers=workers) as pool:
             for tid, _ in due:
                 pool.submit(_run, tid)
             pool.shutdown(wait=True)
+        if cancelled(token):
+            raise JobCancelled(token.reason, items=completed)
         record_job("scheduler_tick", True, {"refreshed": count})
     except Exception as e:
-        record_job("scheduler_tick", False, {"error": str(e)})
+        stopped = isinstance(e, JobCancelled)
+        record_job("scheduler_tick", False, {"error": str(e), "refreshed": completed})
         emit_sync(
             {
                 "job": "scheduler_tick",
@@ -159,11 +190,14 @@ def run_tick(max_calls: int = 800, workers: int = 6) -> None:
                 "items_written": completed,
                 "unique_types_touched": completed,
                 "median_snapshot_age_ms": 0,
-                "errors": errors or 1,
+                "errors": errors if stopped else errors or 1,
                 "ms": int((time.time() - t0) * 1000),
             }
         )
-        job_finished(rid, ok=False, error=str(e))
+        job_finished(rid, ok=False, items=completed, error=str(e))
+        if completed:
+            # snapshots refreshed before the stop are committed and usable
+            pipeline_price_updated(resumed + completed, utcnow(), touched)
         raise
     else:
         ms = int((time.time() - t0) * 1000)
@@ -204,4 +238,4 @@ def run_tick(max_calls: int = 800, workers: int = 6) -> None:
             }
         )
         job_finished(rid, ok=True, items=count, ms=ms)
-        pipeline_price_updated(completed, utcnow())
+        pipeline_price_updated(resumed + completed, utcnow(), touched)
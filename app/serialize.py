@@ -0,0 +1,47 @@
+"""JSON encoding shared by the event bus and API responses.
+
+Uses ``orjson`` when it is installed and falls back to the standard library
+otherwise. Both paths coerce unknown objects (``datetime``, ``Decimal``, ...)
+with ``str`` so callers never fail on odd payloads.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+_ORJSON_OPTS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Serialize ``obj`` to compact UTF-8 JSON."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=_ORJSON_OPTS)
+        except TypeError:
+            # e.g. integers beyond 64 bits; the stdlib copes with those
+            pass
+    return json.dumps(obj, default=str, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def dumps(obj: Any) -> str:
+    """Serialize ``obj`` to a compact JSON string."""
+    return dumps_bytes(obj).decode()
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` rendered with :func:`dumps_bytes`."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return dumps_bytes(content)
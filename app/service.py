@@ -15,22 +15,47 @@ from .settings_service import (
     get_scheduler_settings,
     update_scheduler_settings,
 )
-from .recommender import build_recommendations
 from .db import session, init_db
-from .valuation import compute_portfolio_snapshot, refresh_type_valuations
+from .valuation import latest_portfolio_snapshot, realized_pnl
 from .auth import get_token, token_status
-from .type_cache import get_type_name, refresh_type_name_cache, ensure_type_names
+from .type_cache import (
+    ensure_type_names,
+    hydrate_names,
+    refresh_type_name_cache,
+    resolve_names,
+)
+from . import type_search
 from .snipes import find_snipes
-from .config import SNIPE_EPSILON, SNIPE_Z, SPREAD_BUFFER, STATION_ID, REC_FRESH_MS
+from .config import (
+    COMPRESS_MIN_BYTES,
+    REC_FRESH_MS,
+    SNIPE_EPSILON,
+    SNIPE_Z,
+    SPREAD_BUFFER,
+    STATION_ID,
+)
 from .market import margin_after_fees
+from . import latest_prices
+from . import db, paging
+from .paging import cached_total
 from .ticks import tick
 from .pricing import compute_profit, deal_label, fees_from_settings
-from .jobs import JOB_QUEUE
-from .status import status_router, STATUS
+from .jobs import JOB_QUEUE, cancel_job, job_result
+from . import run_logs
+from .status import status_router, inflight_jobs
+from .serialize import FastJSONResponse
+from .response_cache import ResponseCacheMiddleware
+from .compression import CompressionMiddleware
+from .exports import router as export_router
 from .ws_bus import router as ws_router, start_heartbeat, stop_heartbeat
 from .util import utcnow, utcnow_dt, parse_utc
-from .emit import pipeline_profit_updated
-from .job_runner import start_background_jobs, stop_background_jobs, enqueue_job
+from .emit import start_dispatcher, stop_dispatcher
+from .job_runner import (
+    start_background_jobs,
+    stop_background_jobs,
+    enqueue_job,
+    run_job_inline,
+)
 
 
 @asynccontextmanager
@@ -44,6 +69,10 @@ async def lifespan(app: FastAPI):
     """
     init_db()
     refresh_type_name_cache()
+    # listings read profits as stored; catch up on rows left stale while down
+    latest_prices.install()
+    latest_prices.reprice()
+    start_dispatcher()
     start_heartbeat()
     start_background_jobs()
     try:
@@ -51,9 +80,14 @@ async def lifespan(app: FastAPI):
     finally:
         stop_background_jobs()
         stop_heartbeat()
+        stop_dispatcher()
 
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+# added first so CORS headers are applied to cached responses as well
+app.add_middleware(ResponseCacheMiddleware)
+# outside the cache so cached bodies are stored once and encoded per client
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESS_MIN_BYTES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -63,6 +97,7 @@ app.add_middleware(
 
 app.include_router(status_router)
 app.include_router(ws_router)
+app.include_router(export_router)
 
 
 
@@ -121,9 +156,7 @@ def read_schedulers():
                 meta["next_run_at"] = next_dt.strftime("%Y-%m-%d %H:%M:%S")
             else:
                 meta["next_run_at"] = None
-            meta["running"] = any(
-                j.get("job") == name for j in STATUS.get("inflight", [])
-            )
+            meta["running"] = any(j.get("job") == name for j in inflight_jobs())
             meta["queued"] = sum(1 for j in JOB_QUEUE if j == name)
             meta["concurrency"] = 1
     return cfg
@@ -137,16 +170,19 @@ def write_schedulers(settings: dict):
 
 
 @app.get("/types/map")
-def types_map(ids: str | None = None):
+def types_map(ids: str | None = None, inline: bool = False):
     """Return mapping of type_ids to names.
 
     If ``ids`` query parameter is provided, it should be a comma-separated
     list of type IDs to look up. Otherwise all known types are returned.
-    Unknown IDs are looked up via ESI and cached in the database.
+    Unknown IDs are omitted and resolved in the background; ``inline=true``
+    fetches them from ESI before answering.
     """
     if ids:
         id_list = [int(i) for i in ids.split(",") if i]
-        return ensure_type_names(id_list)
+        if inline:
+            return ensure_type_names(id_list)
+        return resolve_names(id_list)
     with session() as con:
         rows = con.execute("SELECT type_id, name FROM types").fetchall()
     return {tid: name for tid, name in rows}
@@ -156,26 +192,17 @@ def types_map(ids: str | None = None):
 def search_types(q: str, limit: int = 20):
     """Search types by ID or name substring.
 
-    ``q`` may be a type ID or part of a type name. Results include the
-    resolved ``type_name`` for easier display on the client.
+    ``q`` may be a type ID or part of a type name. IDs are resolved from the
+    local ``types`` table only, never ESI; names are ranked exact, prefix,
+    word prefix, substring, then fuzzy. Results include the resolved
+    ``type_name`` for easier display on the client.
     """
     with session() as con:
         if q.isdigit():
             tid = int(q)
-            name = ensure_type_names([tid]).get(tid)
-            results = []
-            if name:
-                results.append({"type_id": tid, "type_name": name})
-            return {"results": results}
-        rows = con.execute(
-            "SELECT type_id, name FROM types WHERE name LIKE ? ORDER BY name LIMIT ?",
-            (f"%{q}%", limit),
-        ).fetchall()
-    return {
-        "results": [
-            {"type_id": tid, "type_name": name} for tid, name in rows
-        ]
-    }
+            name = type_search.lookup(con, tid)
+            return {"results": [{"type_id": tid, "type_name": name}] if name else []}
+        return {"results": type_search.search(con, q, limit)}
 
 
 @app.get("/watchlist")
@@ -185,17 +212,11 @@ def get_watchlist():
         rows = con.execute(
             "SELECT type_id, added_ts, note FROM watchlist ORDER BY added_ts DESC",
         ).fetchall()
-    return {
-        "items": [
-            {
-                "type_id": tid,
-                "type_name": get_type_name(tid),
-                "added_ts": ts,
-                "note": note,
-            }
-            for tid, ts, note in rows
-        ]
-    }
+    items = [
+        {"type_id": tid, "type_name": None, "added_ts": ts, "note": note}
+        for tid, ts, note in rows
+    ]
+    return {"items": hydrate_names(items)}
 
 
 @app.post("/watchlist/{type_id}")
@@ -239,6 +260,66 @@ def list_snipes(
     }
 
 
+# Listing fields -----------------------------------------------------------------------
+# ``fields=`` projections are pushed down to the select list; derived fields
+# pull in the columns they are computed from.
+ITEM_FIELDS = (
+    "type_id",
+    "type_name",
+    "best_bid",
+    "best_ask",
+    "last_updated",
+    "fresh_ms",
+    "profit_pct",
+    "profit_isk",
+    "deal",
+    "mom",
+    "est_daily_vol",
+    "has_both_sides",
+)
+REC_FIELDS = ITEM_FIELDS + ("net_pct", "uplift_mom", "daily_capacity", "details")
+
+_ITEM_COLUMNS = {
+    "type_name": "types.name",
+    "best_bid": "lp.best_bid",
+    "best_ask": "lp.best_ask",
+    "last_updated": "lp.last_updated",
+    "mom": "tr.mom_pct",
+    "est_daily_vol": "tr.vol_30d_avg",
+    "net_pct": "r.net_pct",
+    "uplift_mom": "r.uplift_mom",
+    "daily_capacity": "r.daily_capacity",
+    "rationale_json": "r.rationale_json",
+}
+_DERIVED_FROM = {
+    "fresh_ms": ("last_updated",),
+    "deal": ("profit_pct",),
+    "has_both_sides": ("best_bid", "best_ask"),
+    "details": ("rationale_json",),
+}
+
+
+def parse_fields(fields: str | None, allowed: tuple[str, ...]) -> tuple[str, ...]:
+    """Resolve a comma separated ``fields`` parameter against ``allowed``.
+
+    ``type_id`` is always kept; unknown names are rejected with HTTP 400.
+    """
+    if not fields:
+        return allowed
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted.difference(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(f for f in allowed if f in wanted or f == "type_id")
+
+
+def _details(rationale: str | None) -> dict[str, Any]:
+    try:
+        return json.loads(rationale) if rationale else {}
+    except json.JSONDecodeError:
+        return {}
+
+
 def _list_latest_items(
     *,
     station_id: int,
@@ -257,31 +338,23 @@ def _list_latest_items(
     include_rec: bool = False,
     allow_negative: bool = False,
     default_sort: str = "last_updated",
+    cursor: str | None = None,
+    fields: tuple[str, ...] | None = None,
 ) -> dict[str, Any]:
-    """Shared listing logic for latest price snapshots."""
+    """Shared listing logic for latest price snapshots.
+
+    ``cursor`` continues from a previous page's ``next`` token and takes
+    precedence over ``offset``. ``fields`` limits the returned (and
+    selected) columns; ``details`` is only parsed when asked for.
+    """
     settings = get_settings()
-    fees = fees_from_settings(settings)
     thresholds = settings["DEAL_THRESHOLDS"]
+    # stored profits keep their sign; floor them unless negatives are wanted
+    if allow_negative:
+        pct_col, isk_col = "lp.profit_pct", "lp.profit_isk"
+    else:
+        pct_col, isk_col = "MAX(lp.profit_pct, 0)", "MAX(lp.profit_isk, 0)"
     with session() as con:
-        con.create_function(
-            "profit_pct",
-            2,
-            lambda bid, ask: compute_profit(
-                bid, ask, fees, tick, floor_negative=not allow_negative
-            )[1],
-        )
-        con.create_function(
-            "profit_isk",
-            2,
-            lambda bid, ask: compute_profit(
-                bid, ask, fees, tick, floor_negative=not allow_negative
-            )[0],
-        )
-        con.create_function(
-            "deal_label",
-            1,
-            lambda pct: deal_label(pct, thresholds=thresholds),
-        )
         where = ["lp.station_id = ?"]
         params: list[Any] = [station_id]
         if category is not None:
@@ -291,12 +364,9 @@ def _list_latest_items(
             where.append("COALESCE(types.meta_level,0) >= ?")
             params.append(meta)
         if search:
-            if search.isdigit():
-                where.append("(lp.type_id = ? OR types.name LIKE ?)")
-                params.extend([int(search), f"%{search}%"])
-            else:
-                where.append("types.name LIKE ?")
-                params.append(f"%{search}%")
+            clause, values = type_search.name_filter(con, "lp.type_id", search)
+            where.append(clause)
+            params.extend(values)
         if min_mom is not None:
             where.append("tr.mom_pct IS NOT NULL AND tr.mom_pct >= ?")
             params.append(min_mom)
@@ -304,115 +374,92 @@ def _list_latest_items(
             where.append("tr.vol_30d_avg IS NOT NULL AND tr.vol_30d_avg >= ?")
             params.append(min_vol)
         if min_profit_pct > 0:
-            where.append("profit_pct(lp.best_bid, lp.best_ask) >= ?")
+            where.append("lp.profit_pct >= ?")
             params.append(min_profit_pct)
         if deal_filter:
             placeholders = ",".join("?" for _ in deal_filter)
-            where.append(
-                f"deal_label(profit_pct(lp.best_bid, lp.best_ask)) IN ({placeholders})"
-            )
+            where.append(f"lp.deal IN ({placeholders})")
             params.extend(deal_filter)
         join_rec = ""
-        select_extra = ""
         if include_rec:
             join_rec = "LEFT JOIN recommendations r ON r.type_id = lp.type_id AND r.station_id = ?"
             params.insert(0, station_id)
             if not show_all:
                 where.append("r.type_id IS NOT NULL")
-            select_extra = ", r.net_pct, r.uplift_mom, r.daily_capacity, r.rationale_json"
         where_clause = " AND ".join(where)
         base_query = f"""
-            FROM latest_prices_v lp
+            FROM latest_prices lp
             {join_rec}
             LEFT JOIN types ON lp.type_id = types.type_id
             LEFT JOIN type_trends tr ON tr.type_id = lp.type_id
             WHERE {where_clause}
         """
-        total = con.execute(f"SELECT COUNT(*) {base_query}", params).fetchone()[0]
+        count_sql = f"SELECT COUNT(*) {base_query}"
+        count_params = list(params)
+
+        def count() -> int:
+            with session() as c:
+                return c.execute(count_sql, count_params).fetchone()[0]
+
+        total = cached_total((str(db.DB_PATH), count_sql, tuple(count_params)), count)
         allowed = {
-            "last_updated": "lp.last_updated",
-            "type_name": "types.name",
-            "best_bid": "lp.best_bid",
-            "best_ask": "lp.best_ask",
-            "profit_pct": "profit_pct(lp.best_bid, lp.best_ask)",
+            "last_updated": paging.sort_expr("lp.last_updated"),
+            "type_name": paging.sort_expr("types.name", nullable=True),
+            "best_bid": paging.sort_expr("lp.best_bid", nullable=True, numeric=True),
+            "best_ask": paging.sort_expr("lp.best_ask", nullable=True, numeric=True),
+            "profit_pct": paging.sort_expr("lp.profit_pct", nullable=True, numeric=True),
         }
-        sort_col = allowed.get(sort, allowed.get(default_sort, "lp.last_updated"))
+        if sort not in allowed:
+            sort = default_sort if default_sort in allowed else "last_updated"
+        sort_col = allowed[sort]
+        direction = paging.direction(dir)
+        if cursor:
+            clause, values = paging.after(
+                [sort_col, "lp.type_id"], direction, paging.decode_cursor(cursor, sort, direction)
+            )
+            base_query += f" AND {clause}"
+            params += values
+            offset = 0
+        out = fields or (REC_FIELDS if include_rec else ITEM_FIELDS)
+        columns = {**_ITEM_COLUMNS, "profit_pct": pct_col, "profit_isk": isk_col}
+        selected = list(
+            dict.fromkeys(c for f in out[1:] for c in _DERIVED_FROM.get(f, (f,)))
+        )
+        select_list = ", ".join(
+            ["lp.type_id", *(f"{columns[c]} AS {c}" for c in selected), f"{sort_col} AS sort_key"]
+        )
         rows = con.execute(
             f"""
-            SELECT lp.type_id, types.name, lp.best_bid, lp.best_ask, lp.last_updated,
-                   tr.mom_pct, tr.vol_30d_avg{select_extra},
-                   profit_pct(lp.best_bid, lp.best_ask) AS profit_pct,
-                   profit_isk(lp.best_bid, lp.best_ask) AS profit_isk
+            SELECT {select_list}
             {base_query}
-            ORDER BY {sort_col} {dir.upper()}
+            ORDER BY {sort_col} {direction}, lp.type_id {direction}
             LIMIT ? OFFSET ?
             """,
             params + [limit, offset],
         ).fetchall()
+    next_token = paging.next_cursor(sort, direction, rows, limit, lambda r: (r[-1], r[0]))
     now = utcnow_dt()
     results = []
     for row in rows:
-        if include_rec:
-            (
-                tid,
-                tname,
-                bid,
-                ask,
-                ts,
-                mom,
-                vol,
-                net_pct,
-                uplift_mom,
-                daily_cap,
-                rationale,
-                profit_pct,
-                profit_isk,
-            ) = row
-        else:
-            (
-                tid,
-                tname,
-                bid,
-                ask,
-                ts,
-                mom,
-                vol,
-                profit_pct,
-                profit_isk,
-            ) = row
-        has_both = bid is not None and ask is not None
-        label = deal_label(profit_pct, thresholds=thresholds)
-        last_dt = parse_utc(ts)
-        fresh_ms = int((now - last_dt).total_seconds() * 1000)
-        item = {
-            "type_id": tid,
-            "type_name": tname or get_type_name(tid),
-            "best_bid": bid,
-            "best_ask": ask,
-            "last_updated": ts,
-            "fresh_ms": fresh_ms,
-            "profit_pct": profit_pct,
-            "profit_isk": profit_isk,
-            "deal": label,
-            "mom": mom,
-            "est_daily_vol": vol,
-            "has_both_sides": has_both,
-        }
-        if include_rec:
-            try:
-                details = json.loads(rationale) if rationale else {}
-            except json.JSONDecodeError:
-                details = {}
-            item.update(
-                {
-                    "net_pct": net_pct,
-                    "uplift_mom": uplift_mom,
-                    "daily_capacity": daily_cap,
-                    "details": details,
-                }
-            )
+        values = dict(zip(selected, row[1:-1]))
+        item: dict[str, Any] = {"type_id": row[0]}
+        for f in out[1:]:
+            if f == "fresh_ms":
+                item[f] = int((now - parse_utc(values["last_updated"])).total_seconds() * 1000)
+            elif f == "deal":
+                # rows are briefly unpriced between a snapshot and its event
+                pct = values["profit_pct"]
+                item[f] = None if pct is None else deal_label(pct, thresholds=thresholds)
+            elif f == "has_both_sides":
+                item[f] = values["best_bid"] is not None and values["best_ask"] is not None
+            elif f == "details":
+                item[f] = _details(values["rationale_json"])
+            else:
+                item[f] = values[f]
         results.append(item)
-    return {"rows": results, "total": total}
+    if "type_name" in out:
+        results = hydrate_names(results)
+    return {"rows": results, "total": total, "next": next_token}
 
 
 @app.get("/db/items")
@@ -425,8 +472,14 @@ def list_db_items(
     search: str | None = None,
     deal: list[str] | None = Query(None),
     min_profit_pct: float = 0.0,
+    cursor: str | None = None,
+    fields: str | None = None,
 ):
-    """Return latest known market data for all seen types."""
+    """Return latest known market data for all seen types.
+
+    Pass the response's ``next`` token as ``cursor`` to fetch the next page
+    and a comma separated ``fields`` list to return only those columns.
+    """
     deal_filter = {d.title() for d in (deal or [])}
     return _list_latest_items(
         station_id=station_id,
@@ -439,6 +492,8 @@ def list_db_items(
         deal_filter=deal_filter,
         allow_negative=True,
         default_sort="last_updated",
+        cursor=cursor,
+        fields=parse_fields(fields, ITEM_FIELDS),
     )
 
 
@@ -455,6 +510,7 @@ def legacy_list_recommendations(
     search: str | None,
     show_all: bool,
     station_id: int,
+    fields: tuple[str, ...] = REC_FIELDS,
 ):
     """Return recommendations using legacy gating on freshness, MoM, and volume."""
     settings = get_settings()
@@ -474,12 +530,9 @@ def legacy_list_recommendations(
             where.append("COALESCE(types.meta_level,0) >= ?")
             params.append(meta)
         if search:
-            if search.isdigit():
-                where.append("(lp.type_id = ? OR types.name LIKE ?)")
-                params.extend([int(search), f"%{search}%"])
-            else:
-                where.append("types.name LIKE ?")
-                params.append(f"%{search}%")
+            clause, values = type_search.name_filter(con, "lp.type_id", search)
+            where.append(clause)
+            params.extend(values)
         join_rec = "LEFT JOIN recommendations r ON r.type_id = lp.type_id AND r.station_id = ?"
         params.insert(0, station_id)
         if not show_all:
@@ -490,7 +543,7 @@ def legacy_list_recommendations(
             SELECT lp.type_id, types.name, lp.best_bid, lp.best_ask, lp.last_updated,
                    tr.mom_pct, tr.vol_30d_avg, r.net_pct, r.uplift_mom,
                    r.daily_capacity, r.rationale_json
-            FROM latest_prices_v lp
+            FROM latest_prices lp
             {join_rec}
             LEFT JOIN types ON lp.type_id = types.type_id
             LEFT JOIN type_trends tr ON tr.type_id = lp.type_id
@@ -526,14 +579,11 @@ def legacy_list_recommendations(
         if fresh_ms > REC_FRESH_MS:
             continue
         label = deal_label(profit_pct, thresholds=thresholds)
-        try:
-            details = json.loads(rationale) if rationale else {}
-        except json.JSONDecodeError:
-            details = {}
+        details = _details(rationale) if "details" in fields else None
         results.append(
             {
                 "type_id": tid,
-                "type_name": tname or get_type_name(tid),
+                "type_name": tname,
                 "best_bid": bid,
                 "best_ask": ask,
                 "last_updated": ts,
@@ -562,6 +612,10 @@ def legacy_list_recommendations(
     results.sort(key=lambda r: (r[key] is None, r[key]), reverse=reverse)
     total = len(results)
     sliced = results[offset : offset + limit]
+    if fields != REC_FIELDS:
+        sliced = [{f: r[f] for f in fields} for r in sliced]
+    if "type_name" in fields:
+        sliced = hydrate_names(sliced)
     return {"rows": sliced, "total": total}
 
 
@@ -580,7 +634,15 @@ def list_recommendations(
     show_all: bool = False,
     mode: Literal["profit_only", "legacy"] = "profit_only",
     station_id: int = STATION_ID,
+    cursor: str | None = None,
+    fields: str | None = None,
 ):
+    """Return recommended types; ``fields`` limits the returned columns.
+
+    ``details`` holds the parsed rationale and is the costliest column, so
+    list views should leave it out.
+    """
+    out = parse_fields(fields, REC_FIELDS)
     if mode == "legacy":
         return legacy_list_recommendations(
             limit,
@@ -595,6 +657,7 @@ def list_recommendations(
             search,
             show_all,
             station_id,
+            out,
         )
 
     return _list_latest_items(
@@ -611,11 +674,25 @@ def list_recommendations(
         meta=meta,
         show_all=show_all,
         include_rec=True,
+        cursor=cursor,
         default_sort="profit_pct",
+        fields=out,
     )
 
 
 
+def _order_sort(sort: str, dir: str) -> tuple[str, str, str]:
+    """Resolve an order list sort to ``(name, expression, direction)``."""
+    allowed = {
+        "issued": paging.sort_expr("issued", nullable=True),
+        "price": paging.sort_expr("price", nullable=True, numeric=True),
+        "type_id": paging.sort_expr("char_orders.type_id", nullable=True, numeric=True),
+    }
+    if sort not in allowed:
+        sort = "issued"
+    return sort, allowed[sort], paging.direction(dir)
+
+
 @app.get("/orders/open")
 def list_open_orders(
     limit: int = 100,
@@ -623,32 +700,37 @@ def list_open_orders(
     sort: str = "issued",
     dir: str = "desc",
     search: str | None = None,
+    cursor: str | None = None,
 ):
     """Return open character orders with fill percentage."""
-    allowed = {"issued": "issued", "price": "price", "type_id": "type_id"}
-    col = allowed.get(sort, "issued")
-    direction = "ASC" if dir.lower() == "asc" else "DESC"
+    sort, col, direction = _order_sort(sort, dir)
     join = " JOIN types ON char_orders.type_id = types.type_id"
     where = ["state='open'"]
     params: list[Any] = []
-    if search:
-        if search.isdigit():
-            where.append("(char_orders.type_id = ? OR types.name LIKE ?)")
-            params.extend([int(search), f"%{search}%"])
-        else:
-            where.append("types.name LIKE ?")
-            params.append(f"%{search}%")
     with session() as con:
+        if search:
+            clause, values = type_search.name_filter(con, "char_orders.type_id", search)
+            where.append(clause)
+            params.extend(values)
+        if cursor:
+            clause, values = paging.after(
+                [col, "order_id"], direction, paging.decode_cursor(cursor, sort, direction)
+            )
+            where.append(clause)
+            params.extend(values)
+            offset = 0
         rows = con.execute(
             f"""
-            SELECT order_id, is_buy, char_orders.type_id, types.name, price, volume_total, volume_remain, issued, escrow
+            SELECT order_id, is_buy, char_orders.type_id, types.name, price, volume_total, volume_remain, issued, escrow,
+                   {col} AS sort_key
             FROM char_orders{join}
             WHERE {' AND '.join(where)}
-            ORDER BY {col} {direction}
+            ORDER BY {col} {direction}, order_id {direction}
             LIMIT ? OFFSET ?
             """,
             (*params, limit, offset),
         ).fetchall()
+    next_token = paging.next_cursor(sort, direction, rows, limit, lambda r: (r[-1], r[0]))
     orders = []
     for (
         order_id,
@@ -660,6 +742,7 @@ def list_open_orders(
         vol_remain,
         issued,
         escrow,
+        _,
     ) in rows:
         fill_pct = (vol_total - vol_remain) / vol_total if vol_total else 0.0
         orders.append(
@@ -667,7 +750,7 @@ def list_open_orders(
                 "order_id": order_id,
                 "is_buy": bool(is_buy),
                 "type_id": type_id,
-                "type_name": type_name or get_type_name(type_id),
+                "type_name": type_name,
                 "price": price,
                 "volume_total": vol_total,
                 "volume_remain": vol_remain,
@@ -676,7 +759,25 @@ def list_open_orders(
                 "escrow": escrow,
             }
         )
-    return {"orders": orders}
+    return {"orders": hydrate_names(orders), "next": next_token}
+
+
+def _reprice(best_bid: float, best_ask: float) -> dict[str, float]:
+    """One-tick buy/sell prices and their net margins against the spread."""
+    buy_price = tick(best_bid, "up")
+    sell_price = tick(best_ask, "down")
+    return {
+        "best_bid": best_bid,
+        "best_ask": best_ask,
+        "buy_price": buy_price,
+        "sell_price": sell_price,
+        "buy_net_pct": (
+            margin_after_fees(buy_price, best_ask) / buy_price if buy_price else 0.0
+        ),
+        "sell_net_pct": (
+            margin_after_fees(best_bid, sell_price) / best_bid if best_bid else 0.0
+        ),
+    }
 
 
 @app.get("/orders/reprice")
@@ -684,35 +785,83 @@ def reprice_order(type_id: int):
     """Return one-tick reprice guidance and net margins for a type."""
     with session() as con:
         row = con.execute(
-            """
-            SELECT best_bid, best_ask
-            FROM market_snapshots
-            WHERE type_id=? AND station_id=?
-            ORDER BY ts_utc DESC
-            LIMIT 1
-            """,
+            "SELECT best_bid, best_ask FROM latest_prices WHERE type_id=? AND station_id=?",
             (type_id, STATION_ID),
         ).fetchone()
     if not row or row[0] is None or row[1] is None:
         raise HTTPException(status_code=404, detail="No market data")
-    best_bid, best_ask = row
-    buy_price = tick(best_bid, "up")
-    sell_price = tick(best_ask, "down")
-    buy_net_pct = (
-        margin_after_fees(buy_price, best_ask) / buy_price if buy_price else 0.0
-    )
-    sell_net_pct = (
-        margin_after_fees(best_bid, sell_price) / best_bid if best_bid else 0.0
-    )
     return {
         "type_id": type_id,
-        "type_name": get_type_name(type_id),
-        "best_bid": best_bid,
-        "best_ask": best_ask,
-        "buy_price": buy_price,
-        "sell_price": sell_price,
-        "buy_net_pct": buy_net_pct,
-        "sell_net_pct": sell_net_pct,
+        "type_name": resolve_names([type_id]).get(type_id),
+        **_reprice(*row),
+    }
+
+
+@app.get("/orders/reprice/batch")
+def reprice_orders(type_id: list[int] = Query(default=[]), open_orders: bool = False):
+    """Return reprice guidance for many types from one ``latest_prices`` read.
+
+    ``open_orders=true`` adds every type with an open character order and
+    lists those orders under each item with the price to move to and
+    whether they are currently outbid. Items also carry the stored
+    valuation. Types without a two-sided market are listed in ``missing``.
+    """
+    ids = set(type_id)
+    orders: dict[int, list[dict[str, Any]]] = {}
+    with session() as con:
+        if open_orders:
+            for order_id, is_buy, tid, price, remain in con.execute(
+                """
+                SELECT order_id, is_buy, type_id, price, volume_remain
+                FROM char_orders WHERE state='open'
+                ORDER BY type_id, order_id
+                """
+            ):
+                orders.setdefault(tid, []).append(
+                    {
+                        "order_id": order_id,
+                        "is_buy": bool(is_buy),
+                        "price": price,
+                        "volume_remain": remain,
+                    }
+                )
+            ids.update(orders)
+        if not ids:
+            return {"items": [], "missing": []}
+        placeholders = ",".join("?" for _ in ids)
+        rows = con.execute(
+            f"""
+            SELECT p.type_id, p.best_bid, p.best_ask, v.quicksell_bid, v.mark_ask
+            FROM latest_prices p
+            LEFT JOIN type_valuations v ON v.type_id=p.type_id
+            WHERE p.station_id=? AND p.type_id IN ({placeholders})
+              AND p.best_bid IS NOT NULL AND p.best_ask IS NOT NULL
+            ORDER BY p.type_id
+            """,
+            (STATION_ID, *sorted(ids)),
+        ).fetchall()
+    items = []
+    for tid, best_bid, best_ask, quicksell, mark in rows:
+        item = {
+            "type_id": tid,
+            **_reprice(best_bid, best_ask),
+            "quicksell_bid": quicksell,
+            "mark_ask": mark,
+        }
+        if open_orders:
+            for order in orders.get(tid, []):
+                if order["is_buy"]:
+                    order["target"] = item["buy_price"]
+                    order["outbid"] = order["price"] is not None and order["price"] < best_bid
+                else:
+                    order["target"] = item["sell_price"]
+                    order["outbid"] = order["price"] is not None and order["price"] > best_ask
+            item["orders"] = orders.get(tid, [])
+        items.append(item)
+    found = {item["type_id"] for item in items}
+    return {
+        "items": hydrate_names(items),
+        "missing": sorted(ids - found),
     }
 
 
@@ -723,32 +872,37 @@ def list_order_history(
     sort: str = "issued",
     dir: str = "desc",
     search: str | None = None,
+    cursor: str | None = None,
 ):
     """Return recently closed character orders with fill percentage and state."""
-    allowed = {"issued": "issued", "price": "price", "type_id": "type_id"}
-    col = allowed.get(sort, "issued")
-    direction = "ASC" if dir.lower() == "asc" else "DESC"
+    sort, col, direction = _order_sort(sort, dir)
     join = " JOIN types ON char_orders.type_id = types.type_id"
     where = ["state != 'open'"]
     params: list[Any] = []
-    if search:
-        if search.isdigit():
-            where.append("(char_orders.type_id = ? OR types.name LIKE ?)")
-            params.extend([int(search), f"%{search}%"])
-        else:
-            where.append("types.name LIKE ?")
-            params.append(f"%{search}%")
     with session() as con:
+        if search:
+            clause, values = type_search.name_filter(con, "char_orders.type_id", search)
+            where.append(clause)
+            params.extend(values)
+        if cursor:
+            clause, values = paging.after(
+                [col, "order_id"], direction, paging.decode_cursor(cursor, sort, direction)
+            )
+            where.append(clause)
+            params.extend(values)
+            offset = 0
         rows = con.execute(
             f"""
-            SELECT order_id, is_buy, char_orders.type_id, types.name, price, volume_total, volume_remain, issued, state, escrow
+            SELECT order_id, is_buy, char_orders.type_id, types.name, price, volume_total, volume_remain, issued, state, escrow,
+                   {col} AS sort_key
             FROM char_orders{join}
             WHERE {' AND '.join(where)}
-            ORDER BY {col} {direction}
+            ORDER BY {col} {direction}, order_id {direction}
             LIMIT ? OFFSET ?
             """,
             (*params, limit, offset),
         ).fetchall()
+    next_token = paging.next_cursor(sort, direction, rows, limit, lambda r: (r[-1], r[0]))
     orders = []
     for (
         order_id,
@@ -761,6 +915,7 @@ def list_order_history(
         issued,
         state,
         escrow,
+        _,
     ) in rows:
         fill_pct = (vol_total - vol_remain) / vol_total if vol_total else 0.0
         orders.append(
@@ -768,7 +923,7 @@ def list_order_history(
                 "order_id": order_id,
                 "is_buy": bool(is_buy),
                 "type_id": type_id,
-                "type_name": type_name or get_type_name(type_id),
+                "type_name": type_name,
                 "price": price,
                 "volume_total": vol_total,
                 "volume_remain": vol_remain,
@@ -778,7 +933,7 @@ def list_order_history(
                 "escrow": escrow,
             }
         )
-    return {"orders": orders}
+    return {"orders": hydrate_names(orders), "next": next_token}
 
 
 @app.get("/portfolio/inventory")
@@ -807,8 +962,9 @@ def list_inventory(
                 where = "WHERE a.type_id=?"
                 params.append(tid)
             except ValueError:
-                where = "WHERE t.name LIKE ?"
-                params.append(f"%{search}%")
+                clause, values = type_search.name_filter(con, "a.type_id", search)
+                where = f"WHERE {clause}"
+                params.extend(values)
         rows = con.execute(
             f"""
             SELECT a.type_id, t.name, SUM(a.quantity) AS qty,
@@ -829,13 +985,13 @@ def list_inventory(
         items.append(
             {
                 "type_id": type_id,
-                "type_name": name or get_type_name(type_id),
+                "type_name": name,
                 "quantity": qty,
                 "quicksell": qs_val,
                 "mark": mk_val,
             }
         )
-    return {"items": items}
+    return {"items": hydrate_names(items)}
 
 
 @app.get("/inventory/coverage")
@@ -922,22 +1078,15 @@ def coverage_summary():
 
 @app.get("/portfolio/summary")
 def portfolio_summary(basis: Literal["mark", "quicksell"] = "mark"):
-    """Return aggregate portfolio metrics and recent realized PnL."""
+    """Return aggregate portfolio metrics and recent realized PnL.
+
+    Reads the NAV stored by the sync and valuation jobs; nothing is written.
+    """
     with session() as con:
-        snap = compute_portfolio_snapshot(con)
-        cur = con.cursor()
-        realized_7d = (
-            cur.execute(
-                "SELECT COALESCE(SUM(pnl),0) FROM realized_trades WHERE ts_utc >= datetime('now','-7 days')"
-            ).fetchone()[0]
-            or 0.0
-        )
-        realized_30d = (
-            cur.execute(
-                "SELECT COALESCE(SUM(pnl),0) FROM realized_trades WHERE ts_utc >= datetime('now','-30 days')"
-            ).fetchone()[0]
-            or 0.0
-        )
+        snap = latest_portfolio_snapshot(con)
+        realized = realized_pnl(con)
+    realized_7d = realized["realized_7d"]
+    realized_30d = realized["realized_30d"]
 
     sell_value_quicksell = snap["nav_quicksell"] - snap["wallet_balance"] - snap["buy_escrow"]
     sell_value_mark = snap["nav_mark"] - snap["wallet_balance"] - snap["buy_escrow"]
@@ -957,28 +1106,22 @@ def portfolio_summary(basis: Literal["mark", "quicksell"] = "mark"):
 
 @app.get("/portfolio/nav")
 def portfolio_nav():
-    """Compute and return a portfolio NAV snapshot."""
+    """Return the latest portfolio NAV snapshot."""
     with session() as con:
-        snapshot = compute_portfolio_snapshot(con)
+        snapshot = latest_portfolio_snapshot(con)
     return snapshot
 
 
 @app.post("/valuations/recompute")
-def recompute_valuations():
-    """Refresh type valuations for all known assets and orders."""
-    with session() as con:
-        cur = con.cursor()
-        ids = [
-            tid
-            for (tid,) in cur.execute(
-                "SELECT DISTINCT type_id FROM assets UNION SELECT DISTINCT type_id FROM char_orders"
-            )
-        ]
-        if ids:
-            refresh_type_valuations(con, sorted(ids))
-        count = len(ids)
-    pipeline_profit_updated(count, utcnow())
-    return {"count": count}
+def recompute_valuations(inline: bool = False):
+    """Refresh type valuations for all known assets and orders.
+
+    Queued as a ``refresh_type_valuations`` job; fetch ``count`` from
+    ``/jobs/{runId}/result``. ``inline=true`` runs it within the request.
+    """
+    if inline:
+        return run_job_inline("refresh_type_valuations")
+    return {"status": "queued", "runId": enqueue_job("refresh_type_valuations")}
 
 
 @app.post("/recommendations/build")
@@ -986,12 +1129,17 @@ def recommendations_build(
     dry_run: bool = False,
     verbose: bool = False,
     mode: Literal["profit_only", "legacy"] = "profit_only",
+    inline: bool = False,
 ):
-    """Trigger a recommendations build or return dry-run counts."""
-    res = build_recommendations(verbose=verbose, dry_run=dry_run, mode=mode)
-    if dry_run:
-        return res
-    return {"rows": len(res)}
+    """Queue a recommendations build or dry run.
+
+    The run's result (dry-run counts or ``rows``) is served by
+    ``/jobs/{runId}/result``. ``inline=true`` runs it within the request.
+    """
+    params = {"dry_run": dry_run, "verbose": verbose, "mode": mode}
+    if inline:
+        return run_job_inline("recommendations_build", **params)
+    return {"status": "queued", "runId": enqueue_job("recommendations_build", **params)}
 
 
 @app.post("/jobs/{name}/run")
@@ -999,7 +1147,48 @@ def run_job(name: str):
     """Enqueue a background job for execution."""
 
     try:
-        enqueue_job(name)
+        rid = enqueue_job(name)
     except KeyError:
         raise HTTPException(status_code=404, detail="Job not found")
-    return {"status": "queued"}
+    return {"status": "queued", "runId": rid}
+
+
+@app.get("/jobs/{run_id}/result")
+def get_run_result(run_id: str):
+    """Return a run's state and, once finished, the value it produced."""
+
+    res = job_result(run_id)
+    if res is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return res
+
+
+@app.get("/jobs/{run_id}/logs")
+def get_run_logs(
+    run_id: str,
+    after: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+):
+    """Page through the full on-disk log of a run.
+
+    Pass the returned ``cursor`` as ``after`` to continue; live ``job_log``
+    events carry the same ``seq`` numbers.
+    """
+
+    page = run_logs.read(run_id, after, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Run log not found")
+    return page
+
+
+@app.post("/jobs/{run_id}/cancel")
+def cancel_run(run_id: str):
+    """Cancel a queued job or ask a running one to stop.
+
+    Running jobs stop at their next cancellation check; work committed so far
+    is kept and reported through the ``job_finished`` event.
+    """
+
+    if not cancel_job(run_id):
+        raise HTTPException(status_code=404, detail="Run not found")
+    return {"status": "cancelling", "runId": run_id}
@@ -1,8 +1,15 @@
 from __future__ import annotations
+import copy
 import json
-from typing import Any, Dict
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List
 from .db import connect
-from . import config
+from . import config, db
+from .emit import emit_sync
+
+logger = logging.getLogger(__name__)
 
 # Default settings derived from config.py constants
 DEFAULTS: Dict[str, Any] = {
@@ -86,13 +93,94 @@ def _coerce(key: str, value: str) -> Any:
     return value
 
 
-def get_settings() -> Dict[str, Any]:
-    """Return current settings merged with defaults."""
+# Settings cache -------------------------------------------------------------------
+
+# Settings are read on hot paths (the scheduler loop every second, list
+# endpoints, portfolio snapshots) but change rarely. Reads are served from
+# memory; local writes invalidate immediately and a version counter in ``meta``
+# is rechecked every ``VERSION_RECHECK_SECONDS`` to pick up other processes.
+VERSION_KEY = "settings_version"
+VERSION_RECHECK_SECONDS = 5.0
+
+_cache_lock = threading.Lock()
+_cache_state: Dict[str, Any] = {"db": None, "version": None, "checked": 0.0}
+_cache: Dict[str, Any] = {}
+_listeners: List[Callable[[str], None]] = []
+
+
+def invalidate_settings_cache() -> None:
+    """Drop cached settings so the next read goes to the database."""
+    with _cache_lock:
+        _cache.clear()
+        _cache_state["checked"] = 0.0
+
+
+def subscribe(fn: Callable[[str], None]) -> None:
+    """Call ``fn(scope)`` after settings (``"settings"``) or scheduler
+    configuration (``"scheduler"``) are written in this process."""
+    if fn not in _listeners:
+        _listeners.append(fn)
+
+
+def _read_version(con) -> int:
+    row = con.execute("SELECT value FROM meta WHERE key=?", (VERSION_KEY,)).fetchone()
+    return int(row[0]) if row else 0
+
+
+def _bump_version(con) -> None:
+    con.execute(
+        """
+        INSERT INTO meta(key, value) VALUES (?, '1')
+        ON CONFLICT(key) DO UPDATE SET value=CAST(value AS INTEGER) + 1
+        """,
+        (VERSION_KEY,),
+    )
+
+
+def _cached(scope: str, load: Callable[[Any], Any]) -> Any:
+    """Return a copy of the cached ``scope`` value, loading it if stale."""
+    path = str(db.DB_PATH)
+    now = time.monotonic()
+    with _cache_lock:
+        if _cache_state["db"] != path:
+            # tests and scripts may point the app at another database file
+            _cache.clear()
+            _cache_state.update(db=path, version=None, checked=0.0)
+        if scope in _cache and now - _cache_state["checked"] < VERSION_RECHECK_SECONDS:
+            return copy.deepcopy(_cache[scope])
     con = connect()
     try:
-        rows = con.execute("SELECT key, value FROM app_settings").fetchall()
+        version = _read_version(con)
+        with _cache_lock:
+            if _cache_state["version"] != version:
+                _cache.clear()
+                _cache_state["version"] = version
+            _cache_state["checked"] = now
+            if scope in _cache:
+                return copy.deepcopy(_cache[scope])
+        value = load(con)
     finally:
         con.close()
+    with _cache_lock:
+        if _cache_state["db"] == path and _cache_state["version"] == version:
+            _cache[scope] = value
+    return copy.deepcopy(value)
+
+
+def _notify(scope: str, con) -> None:
+    """Bump the shared version, drop local caches and tell listeners."""
+    version = _read_version(con)
+    invalidate_settings_cache()
+    for fn in list(_listeners):
+        try:
+            fn(scope)
+        except Exception:
+            logger.exception("settings listener failed")
+    emit_sync({"type": "settings.updated", "scope": scope, "version": version})
+
+
+def _load_settings(con) -> Dict[str, Any]:
+    rows = con.execute("SELECT key, value FROM app_settings").fetchall()
     stored = {k: _coerce(k, v) for k, v in rows}
     merged: Dict[str, Any] = {}
     for key, default in DEFAULTS.items():
@@ -100,6 +188,11 @@ def get_settings() -> Dict[str, Any]:
     return merged
 
 
+def get_settings() -> Dict[str, Any]:
+    """Return current settings merged with defaults."""
+    return _cached("settings", _load_settings)
+
+
 def update_settings(updates: Dict[str, Any]) -> None:
     """Persist settings into the database."""
     con = connect()
@@ -115,20 +208,23 @@ def update_settings(updates: Dict[str, Any]) -> None:
                 """,
                 (key, json.dumps(value) if isinstance(value, (dict, list)) else str(value)),
             )
+        _bump_version(con)
         con.commit()
+        _notify("settings", con)
     finally:
         con.close()
 
 
 # Scheduler configuration ----------------------------------------------------------
 
-# Default scheduler configuration for known jobs
+# Default scheduler configuration for known jobs (interval/timeout in minutes,
+# a timeout of 0 disables the limit)
 JOB_DEFAULTS: Dict[str, Dict[str, Any]] = {
-    "sync_character": {"enabled": True, "interval": 60},
-    "refresh_trends": {"enabled": True, "interval": 1440},
-    "snapshot_orders": {"enabled": True, "interval": 60},
-    "refresh_type_valuations": {"enabled": True, "interval": 360},
-    "recommender_scan": {"enabled": True, "interval": 60},
+    "sync_character": {"enabled": True, "interval": 60, "timeout": 30},
+    "refresh_trends": {"enabled": True, "interval": 1440, "timeout": 60},
+    "snapshot_orders": {"enabled": True, "interval": 60, "timeout": 45},
+    "refresh_type_valuations": {"enabled": True, "interval": 360, "timeout": 30},
+    "recommender_scan": {"enabled": True, "interval": 60, "timeout": 30},
 }
 
 SCHED_PREFIX = "SCHED_"
@@ -136,24 +232,27 @@ SCHED_PREFIX = "SCHED_"
 
 def get_scheduler_settings() -> Dict[str, Dict[str, Any]]:
     """Return current scheduler settings merged with defaults."""
-    con = connect()
-    try:
-        rows = con.execute(
-            "SELECT key, value FROM app_settings WHERE key LIKE ?",
-            (f"{SCHED_PREFIX}%",),
-        ).fetchall()
-    finally:
-        con.close()
+    return _cached("scheduler", _load_scheduler_settings)
+
+
+def _load_scheduler_settings(con) -> Dict[str, Dict[str, Any]]:
+    rows = con.execute(
+        "SELECT key, value FROM app_settings WHERE key LIKE ?",
+        (f"{SCHED_PREFIX}%",),
+    ).fetchall()
     stored = {k: v for k, v in rows}
     result: Dict[str, Dict[str, Any]] = {}
     for name, meta in JOB_DEFAULTS.items():
         enabled_key = f"{SCHED_PREFIX}{name}_ENABLED"
         interval_key = f"{SCHED_PREFIX}{name}_INTERVAL"
+        timeout_key = f"{SCHED_PREFIX}{name}_TIMEOUT"
         enabled_val = stored.get(enabled_key, "1" if meta["enabled"] else "0")
         interval_val = stored.get(interval_key, str(meta["interval"]))
+        timeout_val = stored.get(timeout_key, str(meta["timeout"]))
         result[name] = {
             "enabled": enabled_val in {"1", "true", "True"},
             "interval": int(interval_val),
+            "timeout": int(timeout_val),
         }
     return result
 
@@ -167,8 +266,10 @@ def update_scheduler_settings(settings: Dict[str, Dict[str, Any]]) -> None:
                 continue
             enabled_key = f"{SCHED_PREFIX}{name}_ENABLED"
             interval_key = f"{SCHED_PREFIX}{name}_INTERVAL"
+            timeout_key = f"{SCHED_PREFIX}{name}_TIMEOUT"
             enabled = cfg.get("enabled", JOB_DEFAULTS[name]["enabled"])
             interval = cfg.get("interval", JOB_DEFAULTS[name]["interval"])
+            timeout = cfg.get("timeout", JOB_DEFAULTS[name]["timeout"])
             con.execute(
                 """
                 INSERT INTO app_settings(key, value)
@@ -185,6 +286,16 @@ def update_scheduler_settings(settings: Dict[str, Dict[str, Any]]) -> None:
                 """,
                 (interval_key, str(int(interval))),
             )
+            con.execute(
+                """
+                INSERT INTO app_settings(key, value)
+                VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value=excluded.value
+                """,
+                (timeout_key, str(int(timeout))),
+            )
+        _bump_version(con)
         con.commit()
+        _notify("scheduler", con)
     finally:
         con.close()
@@ -12,7 +12,7 @@ from .config import (
     STATION_ID,
 )
 from .market import margin_after_fees
-from .type_cache import get_type_name
+from .type_cache import hydrate_names
 
 
 def find_snipes(
@@ -76,7 +76,7 @@ def find_snipes(
             results.append(
                 {
                     "type_id": type_id,
-                    "type_name": get_type_name(type_id),
+                    "type_name": None,
                     "best_bid": bid,
                     "best_ask": ask,
                     "units": units,
@@ -89,5 +89,5 @@ def find_snipes(
         con.close()
 
     results.sort(key=lambda r: r["net_pct"], reverse=True)
-    return results[:limit]
+    return hydrate_names(results[:limit])
 
@@ -1,3 +1,4 @@
+from collections import deque
 from typing import Any, Dict
 from fastapi import APIRouter
 from .util import utcnow
@@ -5,61 +6,84 @@ from .util import utcnow
 status_router = APIRouter()
 
 # Global snapshot for fallback polling -------------------------------------------------
+# ``inflight`` is indexed by runId and ``last_runs``/``logs`` are bounded
+# rings so event handling stays O(1); plain lists assigned by callers are
+# adopted on the next update. ``status_snapshot`` builds the list view.
+RUNS_MAX = 20
+LOGS_MAX = 50
+
 STATUS: Dict[str, Any] = {
-    "inflight": [],
-    "last_runs": [],
+    "inflight": {},
+    "last_runs": deque(maxlen=RUNS_MAX),
     "esi": {},
     "queue": {},
-    "logs": [],
+    "logs": deque(maxlen=LOGS_MAX),
     "counts": {},
     "pending": [],
+    "bus": {"coalesced": 0},
 }
 
 
+def _inflight() -> Dict[Any, Dict[str, Any]]:
+    table = STATUS.get("inflight")
+    if not isinstance(table, dict):
+        table = {j.get("runId", f"#{i}"): j for i, j in enumerate(table or [])}
+        STATUS["inflight"] = table
+    return table
+
+
+def _ring(key: str, size: int) -> deque:
+    ring = STATUS.get(key)
+    if not isinstance(ring, deque) or ring.maxlen != size:
+        ring = deque(ring or [], maxlen=size)
+        STATUS[key] = ring
+    return ring
+
+
+def inflight_jobs() -> list[Dict[str, Any]]:
+    """Return the currently running jobs, oldest first."""
+    return list(_inflight().values())
+
+
+def add_last_run(rec: Dict[str, Any]) -> None:
+    """Record a finished run at the head of ``last_runs``."""
+    _ring("last_runs", RUNS_MAX).appendleft(rec)
+
+
 def update_status(evt: Dict[str, Any]) -> None:
     """Update in-memory status snapshot based on an event."""
     t = evt.get("type")
     if t == "job_started":
-        STATUS.setdefault("inflight", [])
-        STATUS["inflight"].append(
-            {
-                "job": evt.get("job"),
-                "runId": evt.get("runId"),
-                "progress": 0,
-                "detail": "",
-                "since": utcnow(),
-            }
-        )
-    elif t == "job_progress":
         rid = evt.get("runId")
-        for j in STATUS.get("inflight", []):
-            if j.get("runId") == rid:
-                j["progress"] = evt.get("progress", j.get("progress", 0))
-                j["detail"] = evt.get("detail", "")
+        _inflight()[rid] = {
+            "job": evt.get("job"),
+            "runId": rid,
+            "progress": 0,
+            "detail": "",
+            "since": utcnow(),
+            "cursor": (evt.get("meta") or {}).get("checkpoint"),
+        }
+    elif t == "job_progress":
+        j = _inflight().get(evt.get("runId"))
+        if j is not None:
+            j["progress"] = evt.get("progress", j.get("progress", 0))
+            j["detail"] = evt.get("detail", "")
+    elif t == "job_checkpoint":
+        j = _inflight().get(evt.get("runId"))
+        if j is not None:
+            j["cursor"] = evt.get("cursor")
     elif t == "job_log":
-        STATUS.setdefault("logs", [])
-        STATUS["logs"].append(evt)
-        if len(STATUS["logs"]) > 50:
-            STATUS["logs"] = STATUS["logs"][-50:]
+        _ring("logs", LOGS_MAX).append(evt)
     elif t == "job_finished":
-        rid = evt.get("runId")
-        job_name = None
-        remaining = []
-        for j in STATUS.get("inflight", []):
-            if j.get("runId") == rid:
-                job_name = j.get("job")
-            else:
-                remaining.append(j)
-        STATUS["inflight"] = remaining
+        j = _inflight().pop(evt.get("runId"), None)
         rec: Dict[str, Any] = {
-            "job": job_name,
+            "job": j.get("job") if j else None,
             "ok": evt.get("ok"),
             "ts": utcnow(),
         }
         if evt.get("ms") is not None:
             rec["ms"] = evt.get("ms")
-        STATUS.setdefault("last_runs", [])
-        STATUS["last_runs"] = [rec] + STATUS["last_runs"][-19:]
+        add_last_run(rec)
     elif t == "esi":
         STATUS["esi"] = {"remain": evt.get("remain"), "reset": evt.get("reset")}
     elif t == "queue":
@@ -68,15 +92,148 @@ def update_status(evt: Dict[str, Any]) -> None:
         STATUS["pending"] = evt.get("pending", [])
 
 
+def status_snapshot() -> Dict[str, Any]:
+    """Return a copy of ``STATUS`` as served by ``/status``.
+
+    Built on read; rows are copied so callers cannot mutate live state.
+    """
+    return {
+        "inflight": [dict(j) for j in inflight_jobs()],
+        "last_runs": list(STATUS.get("last_runs", ())),
+        "esi": dict(STATUS.get("esi", {})),
+        "queue": dict(STATUS.get("queue", {})),
+        "pending": list(STATUS.get("pending", ())),
+        "logs": list(STATUS.get("logs", ())),
+        "counts": dict(STATUS.get("counts", {})),
+        "bus": dict(STATUS.get("bus", {})),
+    }
+
+
+def _escape(key: Any) -> str:
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def diff_status(old: Dict[str, Any], new: Dict[str, Any]) -> list[Dict[str, Any]]:
+    """Return JSON-patch operations turning ``old`` into ``new``.
+
+    Objects are diffed one level deep (``/queue/P1``); lists and scalars are
+    replaced whole.
+    """
+    ops: list[Dict[str, Any]] = []
+    for key in old.keys() - new.keys():
+        ops.append({"op": "remove", "path": f"/{_escape(key)}"})
+    for key, value in new.items():
+        path = f"/{_escape(key)}"
+        if key not in old:
+            ops.append({"op": "add", "path": path, "value": value})
+            continue
+        prev = old[key]
+        if prev == value:
+            continue
+        if isinstance(prev, dict) and isinstance(value, dict):
+            for sub in prev.keys() - value.keys():
+                ops.append({"op": "remove", "path": f"{path}/{_escape(sub)}"})
+            for sub, v in value.items():
+                if sub not in prev:
+                    ops.append({"op": "add", "path": f"{path}/{_escape(sub)}", "value": v})
+                elif prev[sub] != v:
+                    ops.append({"op": "replace", "path": f"{path}/{_escape(sub)}", "value": v})
+        else:
+            ops.append({"op": "replace", "path": path, "value": value})
+    return ops
+
+
+# Versioned model -----------------------------------------------------------------------
+# The bus keeps a private copy of the ``/status`` view and, after events,
+# brings it up to date with :func:`sync_model`. Only changed sections are
+# compared and the returned JSON-patch ops are incremental: rings append
+# (``/logs/-``) or prepend (``/last_runs/0``) and trim, inflight jobs are
+# patched per run. Ring entries are never mutated, so they are shared with
+# the model and compared by identity; inflight rows are copied.
+MODEL_DICTS = ("esi", "queue", "counts")
+
+
+def _sync_inflight(model: Dict[str, Any], ops: list[Dict[str, Any]]) -> None:
+    table = _inflight()
+    prev = model["inflight"]
+    gone = [i for i, row in enumerate(prev) if row.get("runId") not in table]
+    for i in reversed(gone):
+        ops.append({"op": "remove", "path": f"/inflight/{i}"})
+        del prev[i]
+    ids = list(table)
+    if [row.get("runId") for row in prev] != ids[: len(prev)]:
+        model["inflight"] = [dict(j) for j in table.values()]
+        ops.append({"op": "replace", "path": "/inflight", "value": model["inflight"]})
+        return
+    for i, row in enumerate(prev):
+        job = table[ids[i]]
+        if row == job:
+            continue
+        for key in row.keys() - job.keys():
+            ops.append({"op": "remove", "path": f"/inflight/{i}/{_escape(key)}"})
+        for key, value in job.items():
+            if key not in row or row[key] != value:
+                op = "replace" if key in row else "add"
+                ops.append({"op": op, "path": f"/inflight/{i}/{_escape(key)}", "value": value})
+        prev[i] = dict(job)
+    for rid in ids[len(prev) :]:
+        row = dict(table[rid])
+        prev.append(row)
+        ops.append({"op": "add", "path": "/inflight/-", "value": row})
+
+
+def _sync_ring(model: Dict[str, Any], key: str, newest_first: bool, ops: list[Dict[str, Any]]) -> None:
+    ring = STATUS.get(key) or ()
+    prev = model[key]
+    edge = 0 if newest_first else -1
+    if len(ring) == len(prev) and (not ring or (ring[0] is prev[0] and ring[-1] is prev[-1])):
+        return
+    cur = list(ring)
+    # entries added since the last sync sit before (or after) the old edge
+    order = range(len(cur)) if newest_first else range(len(cur) - 1, -1, -1)
+    found = next((i for i in order if prev and cur[i] is prev[edge]), None)
+    if not prev:
+        found = len(cur) if newest_first else -1
+    if found is None:
+        ops.append({"op": "replace", "path": f"/{key}", "value": cur})
+    elif newest_first:
+        for entry in reversed(cur[:found]):
+            ops.append({"op": "add", "path": f"/{key}/0", "value": entry})
+        for _ in range(len(prev) + found - len(cur)):
+            ops.append({"op": "remove", "path": f"/{key}/{len(cur)}"})
+    else:
+        added = cur[found + 1 :]
+        for _ in range(len(prev) + len(added) - len(cur)):
+            ops.append({"op": "remove", "path": f"/{key}/0"})
+        for entry in added:
+            ops.append({"op": "add", "path": f"/{key}/-", "value": entry})
+    model[key] = cur
+
+
+def new_model() -> Dict[str, Any]:
+    """Return an empty model; the first :func:`sync_model` fills it."""
+    return {"inflight": [], "last_runs": [], "esi": {}, "queue": {}, "pending": [], "logs": [], "counts": {}}
+
+
+def sync_model(model: Dict[str, Any]) -> list[Dict[str, Any]]:
+    """Update ``model`` in place to match ``STATUS``; return the patch ops."""
+    ops: list[Dict[str, Any]] = []
+    _sync_inflight(model, ops)
+    _sync_ring(model, "last_runs", True, ops)
+    _sync_ring(model, "logs", False, ops)
+    for key in MODEL_DICTS:
+        cur = STATUS.get(key) or {}
+        if model[key] != cur:
+            ops.extend(diff_status({key: model[key]}, {key: cur}))
+            model[key] = dict(cur)
+    pending = STATUS.get("pending") or []
+    if model["pending"] != pending:
+        model["pending"] = list(pending)
+        ops.append({"op": "replace", "path": "/pending", "value": model["pending"]})
+    return ops
+
+
 @status_router.get("/status")
 def get_status() -> Dict[str, Any]:
     """Return the current status snapshot for polling clients."""
-    return {
-        "inflight": STATUS.get("inflight", []),
-        "last_runs": STATUS.get("last_runs", []),
-        "esi": STATUS.get("esi", {}),
-        "queue": STATUS.get("queue", {}),
-        "pending": STATUS.get("pending", []),
-        "logs": STATUS.get("logs", []),
-        "counts": STATUS.get("counts", {}),
-    }
+    return status_snapshot()
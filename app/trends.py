@@ -3,14 +3,19 @@ from .db import connect
 from .config import REGION_ID, DATASOURCE
 from .esi import BASE
 from .util import utcnow
+from .jobs import checkpoint, get_checkpoint
+from .cancel import JobCancelled, check_cancelled, request_timeout
 import requests
 
+# Types refreshed between commits (and persisted checkpoints).
+CHECKPOINT_EVERY = 25
+
 
 def region_history(tid):
     r = requests.get(
         f"{BASE}/markets/{REGION_ID}/history/",
         params={"type_id": tid, "datasource": DATASOURCE},
-        timeout=30,
+        timeout=request_timeout(30),
     )
     r.raise_for_status()
     return r.json()
@@ -29,24 +34,49 @@ def compute_mom(hist):
 
 
 def refresh_trends(limit_types=300):
+    """Refresh month-over-month trends for up to ``limit_types`` region types.
+
+    Types are walked in ``type_id`` order and committed in batches. The last
+    committed ``type_id`` is checkpointed so a resumed job skips the types it
+    already fetched instead of repeating the ESI history calls.
+    """
+    after = get_checkpoint("after_type_id", 0)
+    done = get_checkpoint("done", 0)
     con = connect()
-    rows = con.execute(
-        "SELECT type_id FROM region_types WHERE region_id=? LIMIT ?",
-        (REGION_ID, limit_types),
-    ).fetchall()
-    now = utcnow()
-    for (tid,) in rows:
-        hist = region_history(tid)
-        mom = compute_mom(hist)
-        if mom:
-            mom_pct, vnow, vprev = mom
-            con.execute(
-                """
-                INSERT OR REPLACE INTO type_trends
-                   (type_id, last_history_ts, mom_pct, vol_30d_avg, vol_prev30_avg)
-                VALUES (?,?,?,?,?)
-                """,
-                (tid, now, mom_pct, vnow, vprev),
-            )
-    con.commit()
-    con.close()
+    try:
+        rows = con.execute(
+            "SELECT type_id FROM region_types WHERE region_id=? AND type_id > ? ORDER BY type_id LIMIT ?",
+            (REGION_ID, after, max(0, limit_types - done)),
+        ).fetchall()
+        now = utcnow()
+        last = None
+        processed = 0
+        try:
+            for i, (tid,) in enumerate(rows, start=1):
+                check_cancelled()
+                hist = region_history(tid)
+                mom = compute_mom(hist)
+                if mom:
+                    mom_pct, vnow, vprev = mom
+                    con.execute(
+                        """
+                        INSERT OR REPLACE INTO type_trends
+                           (type_id, last_history_ts, mom_pct, vol_30d_avg, vol_prev30_avg)
+                        VALUES (?,?,?,?,?)
+                        """,
+                        (tid, now, mom_pct, vnow, vprev),
+                    )
+                last, processed = tid, i
+                if i % CHECKPOINT_EVERY == 0:
+                    con.commit()
+                    checkpoint(after_type_id=tid, done=done + i, force=True)
+        except JobCancelled as exc:
+            exc.items = processed
+            raise
+        finally:
+            # keep whatever was fetched, even when stopped or failing midway
+            con.commit()
+            if last is not None:
+                checkpoint(after_type_id=last, done=done + processed, force=True)
+    finally:
+        con.close()
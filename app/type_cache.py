@@ -1,12 +1,18 @@
 from __future__ import annotations
+import logging
+import threading
+import time
 from typing import Dict, Optional, Iterable, Any
 
 import requests
 
+from . import type_search
 from .db import connect
 from .esi import BASE
 from .config import DATASOURCE
 
+logger = logging.getLogger(__name__)
+
 _type_name_cache: Dict[int, str] | None = None
 
 
@@ -20,6 +26,7 @@ def refresh_type_name_cache() -> None:
         )
     finally:
         con.close()
+    type_search.rebuild(_type_name_cache)
 
 def _fetch_details_from_esi(ids: list[int]) -> Dict[int, Dict[str, Any]]:
     """Fetch type details from ESI for the given IDs."""
@@ -86,6 +93,7 @@ def ensure_type_names(ids: Iterable[int]) -> Dict[int, str]:
             ).fetchall()
             for tid, name in rows:
                 known[tid] = name
+                type_search.add(tid, name)
                 if _type_name_cache is not None:
                     _type_name_cache[tid] = name
             still_missing = [tid for tid in missing if tid not in known]
@@ -116,6 +124,7 @@ def ensure_type_names(ids: Iterable[int]) -> Dict[int, str]:
                         name = info.get("name")
                         if name:
                             known[tid] = name
+                            type_search.add(tid, name)
                             if _type_name_cache is not None:
                                 _type_name_cache[tid] = name
         finally:
@@ -128,3 +137,139 @@ def get_type_name(type_id: int) -> Optional[str]:
     if _type_name_cache is None or type_id not in _type_name_cache:
         ensure_type_names([type_id])
     return _type_name_cache.get(type_id) if _type_name_cache else None
+
+
+# Batch name hydration -------------------------------------------------------------
+# Responses resolve every type id they contain at once: memory first, then a
+# single ``types`` query. Ids still unknown get no name in that response and
+# are queued for a background thread that resolves them with bulk ESI
+# ``/universe/names/`` calls, so requests never wait on ESI.
+NAMES_BATCH = 1000  # ESI limit per /universe/names/ call
+BACKFILL_RETRY_SECONDS = 300.0
+
+_backfill: set[int] = set()
+_backfill_tried: Dict[int, float] = {}
+_backfill_lock = threading.Lock()
+_backfill_thread: Optional[threading.Thread] = None
+
+
+def _fetch_names_from_esi(ids: list[int]) -> Dict[int, str]:
+    """Resolve ``ids`` to inventory type names with one ESI call."""
+    resp = requests.post(
+        f"{BASE}/universe/names/",
+        params={"datasource": DATASOURCE},
+        json=ids,
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return {
+        row["id"]: row["name"]
+        for row in resp.json() or []
+        if row.get("category") == "inventory_type"
+    }
+
+
+def _queue_backfill(ids: Iterable[int]) -> None:
+    global _backfill_thread
+    now = time.monotonic()
+    with _backfill_lock:
+        fresh = [
+            tid
+            for tid in ids
+            if now - _backfill_tried.get(tid, -BACKFILL_RETRY_SECONDS) >= BACKFILL_RETRY_SECONDS
+        ]
+        if not fresh:
+            return
+        _backfill.update(fresh)
+        if _backfill_thread is None or not _backfill_thread.is_alive():
+            _backfill_thread = threading.Thread(
+                target=drain_backfill, name="type-names", daemon=True
+            )
+            _backfill_thread.start()
+
+
+def drain_backfill() -> int:
+    """Resolve queued ids from ESI and store them; return names learned."""
+    learned = 0
+    while True:
+        with _backfill_lock:
+            batch = sorted(_backfill)[:NAMES_BATCH]
+            _backfill.difference_update(batch)
+            now = time.monotonic()
+            for tid in batch:
+                _backfill_tried[tid] = now
+        if not batch:
+            return learned
+        try:
+            names = _fetch_names_from_esi(batch)
+        except Exception:
+            logger.exception("type name backfill failed for %s ids", len(batch))
+            continue
+        if not names:
+            continue
+        con = connect()
+        try:
+            con.executemany(
+                """
+                INSERT INTO types(type_id, name) VALUES (?, ?)
+                ON CONFLICT(type_id) DO UPDATE SET name=excluded.name
+                """,
+                list(names.items()),
+            )
+            con.commit()
+        finally:
+            con.close()
+        for tid, name in names.items():
+            if _type_name_cache is not None:
+                _type_name_cache[tid] = name
+            type_search.add(tid, name)
+        learned += len(names)
+
+
+def resolve_names(ids: Iterable[int]) -> Dict[int, str]:
+    """Return the locally known names of ``ids`` without calling ESI.
+
+    Unknown ids are queued for the background backfill.
+    """
+    if _type_name_cache is None:
+        refresh_type_name_cache()
+    cache = _type_name_cache or {}
+    known: Dict[int, str] = {}
+    missing: list[int] = []
+    for tid in {int(i) for i in ids}:
+        name = cache.get(tid)
+        if name:
+            known[tid] = name
+        else:
+            missing.append(tid)
+    if missing:
+        con = connect()
+        try:
+            for i in range(0, len(missing), 500):
+                chunk = missing[i : i + 500]
+                placeholders = ",".join("?" for _ in chunk)
+                rows = con.execute(
+                    f"SELECT type_id, name FROM types WHERE type_id IN ({placeholders}) AND name IS NOT NULL",
+                    chunk,
+                ).fetchall()
+                for tid, name in rows:
+                    known[tid] = name
+                    cache[tid] = name
+        finally:
+            con.close()
+        unresolved = [tid for tid in missing if tid not in known]
+        if unresolved:
+            _queue_backfill(unresolved)
+    return known
+
+
+def hydrate_names(
+    rows: list[Dict[str, Any]], id_key: str = "type_id", name_key: str = "type_name"
+) -> list[Dict[str, Any]]:
+    """Fill ``name_key`` of every row lacking one with a single batch lookup."""
+    todo = [r for r in rows if not r.get(name_key)]
+    if todo:
+        names = resolve_names(r[id_key] for r in todo)
+        for r in todo:
+            r[name_key] = names.get(r[id_key])
+    return rows
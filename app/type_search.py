@@ -0,0 +1,205 @@
+"""Type name search: in-memory autocomplete backed by a trigram index.
+
+Prefix and word-prefix matches are answered from sorted in-memory lists
+loaded once per database, in microseconds and without touching SQLite.
+Queries that need more results fall through to the ``types_fts`` trigram
+index: first for substring matches, then for fuzzy matches that share
+trigrams with the query, ranked by bm25. Without FTS5 the substring step
+uses ``LIKE``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from . import db
+
+# prefix scans stop after this many candidates before ranking
+CANDIDATES_MAX = 200
+# fuzzy hits must share at least this fraction of the query's trigrams
+FUZZY_MIN_SHARED = 0.5
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {"db": None}
+# DB path -> whether it has the trigram index
+_fts: Dict[str, bool] = {}
+# (lower-cased name, type_id) and (lower-cased name suffix at a word start, type_id)
+_names: list[tuple[str, int]] = []
+_words: list[tuple[str, int]] = []
+_display: Dict[int, str] = {}
+
+
+def _suffixes(lower: str) -> list[str]:
+    return [lower[i + 1 :] for i, ch in enumerate(lower) if ch in " -'(" and lower[i + 1 :]]
+
+
+def rebuild(names: Dict[int, str]) -> None:
+    """Replace the in-memory index with ``names`` (type_id -> name)."""
+    entries = [(name.lower(), tid) for tid, name in names.items() if name]
+    words = [(suffix, tid) for lower, tid in entries for suffix in _suffixes(lower)]
+    entries.sort()
+    words.sort()
+    global _names, _words, _display
+    with _lock:
+        _names, _words = entries, words
+        _display = {tid: name for tid, name in names.items() if name}
+        _state["db"] = str(db.DB_PATH)
+
+
+def add(type_id: int, name: Optional[str]) -> None:
+    """Index a newly learned type name."""
+    if not name:
+        return
+    with _lock:
+        if _state["db"] != str(db.DB_PATH) or _display.get(type_id) == name:
+            return
+        old = _display.get(type_id)
+        if old is not None:
+            _names.remove((old.lower(), type_id))
+            for suffix in _suffixes(old.lower()):
+                _words.remove((suffix, type_id))
+        lower = name.lower()
+        bisect.insort(_names, (lower, type_id))
+        for suffix in _suffixes(lower):
+            bisect.insort(_words, (suffix, type_id))
+        _display[type_id] = name
+
+
+def _ensure_loaded() -> None:
+    if _state["db"] == str(db.DB_PATH):
+        return
+    with db.session() as con:
+        rows = con.execute("SELECT type_id, name FROM types").fetchall()
+    rebuild(dict(rows))
+
+
+def has_fts(con: sqlite3.Connection) -> bool:
+    """Whether the ``types_fts`` index exists in this database."""
+    path = str(db.DB_PATH)
+    if path not in _fts:
+        _fts[path] = bool(
+            con.execute("SELECT 1 FROM sqlite_master WHERE name='types_fts'").fetchone()
+        )
+    return _fts[path]
+
+
+def lookup(con: sqlite3.Connection, type_id: int) -> Optional[str]:
+    """Return the stored name of ``type_id`` without asking ESI."""
+    _ensure_loaded()
+    name = _display.get(type_id)
+    if name is None:
+        row = con.execute("SELECT name FROM types WHERE type_id=?", (type_id,)).fetchone()
+        name = row[0] if row else None
+    return name
+
+
+def _phrase(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _prefixed(index: list[tuple[str, int]], q: str) -> Iterable[int]:
+    i = bisect.bisect_left(index, (q,))
+    end = min(len(index), i + CANDIDATES_MAX)
+    while i < end and index[i][0].startswith(q):
+        yield index[i][1]
+        i += 1
+
+
+def _memory_matches(q: str) -> list[tuple[int, int]]:
+    """Return ``(rank, type_id)`` for exact, prefix and word-prefix hits."""
+    found: Dict[int, int] = {}
+    with _lock:
+        for tid in _prefixed(_names, q):
+            found[tid] = 0 if _display[tid].lower() == q else 1
+        for tid in _prefixed(_words, q):
+            found.setdefault(tid, 2)
+    return [(rank, tid) for tid, rank in found.items()]
+
+
+def _fts_matches(con: sqlite3.Connection, q: str, limit: int, exclude: set) -> list[tuple[int, int]]:
+    rows = con.execute(
+        "SELECT rowid FROM types_fts WHERE types_fts MATCH ? ORDER BY bm25(types_fts) LIMIT ?",
+        (_phrase(q), limit + len(exclude)),
+    ).fetchall()
+    hits = [(3, tid) for (tid,) in rows if tid not in exclude]
+    if len(hits) + len(exclude) >= limit or len(q) == 3:
+        return hits
+    seen = exclude | {tid for _, tid in hits}
+    grams = _trigrams(q)
+    rows = con.execute(
+        "SELECT rowid, name FROM types_fts WHERE types_fts MATCH ? ORDER BY bm25(types_fts) LIMIT ?",
+        (" OR ".join(_phrase(g) for g in sorted(grams)), limit + len(seen)),
+    ).fetchall()
+    hits.extend(
+        (4, tid)
+        for tid, name in rows
+        if tid not in seen
+        and len(grams & _trigrams(name.lower())) >= FUZZY_MIN_SHARED * len(grams)
+    )
+    return hits
+
+
+def search(con: sqlite3.Connection, q: str, limit: int = 20) -> list[Dict[str, Any]]:
+    """Return up to ``limit`` ``{"type_id", "type_name"}`` matches for ``q``.
+
+    Ranked exact name, name prefix, word prefix, substring, then fuzzy;
+    shorter names first within a rank.
+    """
+    q = q.strip().lower()
+    if not q or limit <= 0:
+        return []
+    _ensure_loaded()
+    hits = _memory_matches(q)
+    if len(hits) < limit and len(q) >= 3:
+        seen = {tid for _, tid in hits}
+        if has_fts(con):
+            hits.extend(_fts_matches(con, q, limit, seen))
+        else:
+            rows = con.execute(
+                "SELECT type_id FROM types WHERE name LIKE ? LIMIT ?",
+                (f"%{q}%", limit + len(seen)),
+            ).fetchall()
+            hits.extend((3, tid) for (tid,) in rows if tid not in seen)
+    names = _display
+    missing = [tid for _, tid in hits if tid not in names]
+    if missing:
+        placeholders = ",".join("?" for _ in missing)
+        names = {
+            **names,
+            **dict(
+                con.execute(
+                    f"SELECT type_id, name FROM types WHERE type_id IN ({placeholders})",
+                    missing,
+                ).fetchall()
+            ),
+        }
+    ranked = sorted(
+        (rank, len(names.get(tid) or ""), names.get(tid) or "", tid) for rank, tid in hits
+    )
+    return [
+        {"type_id": tid, "type_name": name} for _, _, name, tid in ranked[:limit]
+    ]
+
+
+def name_filter(con: sqlite3.Connection, id_col: str, search: str) -> tuple[str, list[Any]]:
+    """Return a WHERE fragment matching ``id_col`` against a name search.
+
+    Numeric searches also match the id itself. Names use the trigram index
+    when available and the query is long enough, otherwise ``LIKE``.
+    """
+    if len(search) >= 3 and has_fts(con):
+        clause = f"{id_col} IN (SELECT rowid FROM types_fts WHERE types_fts MATCH ?)"
+        params: list[Any] = [_phrase(search)]
+    else:
+        clause = f"{id_col} IN (SELECT type_id FROM types WHERE name LIKE ?)"
+        params = [f"%{search}%"]
+    if search.isdigit():
+        return f"({id_col} = ? OR {clause})", [int(search), *params]
+    return clause, params
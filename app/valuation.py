@@ -18,7 +18,76 @@ def refresh_type_valuations(con, type_ids):
     con.commit()
 
 
+def valuations_from_snapshots(con, type_ids, station_id=STATION_ID):
+    """Update ``type_valuations`` from the latest stored market snapshots.
+
+    Snapshots record the same station best bid/ask that
+    :func:`refresh_type_valuations` fetches from ESI, so types refreshed by a
+    scheduler tick can be revalued without another order book walk. Returns
+    the type ids that had a snapshot.
+    """
+    ids = sorted(set(type_ids))
+    valued = []
+    for i in range(0, len(ids), 500):
+        chunk = ids[i : i + 500]
+        placeholders = ",".join("?" for _ in chunk)
+        rows = con.execute(
+            f"""
+            SELECT s.type_id, s.best_bid, s.best_ask
+            FROM market_snapshots s
+            JOIN (
+              SELECT type_id, MAX(ts_utc) AS ts
+              FROM market_snapshots
+              WHERE station_id=? AND type_id IN ({placeholders})
+              GROUP BY type_id
+            ) m ON m.type_id = s.type_id AND m.ts = s.ts_utc
+            WHERE s.station_id=?
+            """,
+            (station_id, *chunk, station_id),
+        ).fetchall()
+        now = utcnow()
+        con.executemany(
+            """
+            INSERT OR REPLACE INTO type_valuations (type_id, quicksell_bid, mark_ask, updated)
+            VALUES (?,?,?,?)
+            """,
+            [(tid, bid or 0.0, ask or 0.0, now) for tid, bid, ask in rows],
+        )
+        valued.extend(tid for tid, _, _ in rows)
+    con.commit()
+    return valued
+
+
+# Portfolio NAV ---------------------------------------------------------------------
+# Jobs that change the inputs (character sync, valuation refreshes) store
+# today's components in ``portfolio_daily``. Read endpoints only read the
+# latest row and apply the current sell fees, so a GET never writes.
+_NAV_COLUMNS = (
+    "wallet_balance",
+    "buy_escrow",
+    "sell_gross",
+    "inventory_quicksell",
+    "inventory_mark",
+    "nav_quicksell",
+    "nav_mark",
+)
+
+
+def _with_nav(parts, fees):
+    sell_net = parts["sell_gross"] * (1 - fees.sell_total)
+    held = parts["wallet_balance"] + parts["buy_escrow"]
+    return {
+        **parts,
+        "nav_quicksell": held + parts["inventory_quicksell"] + sell_net,
+        "nav_mark": held + parts["inventory_mark"] + sell_net,
+    }
+
+
 def compute_portfolio_snapshot(con):
+    """Compute the current portfolio snapshot from the synced tables.
+
+    Read-only; :func:`refresh_portfolio_snapshot` stores the result.
+    """
     cur = con.cursor()
     bal = cur.execute(
         "SELECT balance FROM wallet_snapshots ORDER BY ts_utc DESC LIMIT 1"
@@ -36,47 +105,69 @@ def compute_portfolio_snapshot(con):
     buy_escrow = row[0] or 0.0
     sell_gross = row[1] or 0.0
 
-    inv = cur.execute(
+    qs_val, mk_val = cur.execute(
         """
-        SELECT a.type_id, SUM(a.quantity)
+        SELECT
+          SUM(a.quantity * COALESCE(v.quicksell_bid, 0)),
+          SUM(a.quantity * COALESCE(NULLIF(v.mark_ask, 0), v.quicksell_bid, 0))
         FROM assets a
-        GROUP BY a.type_id
+        JOIN type_valuations v ON v.type_id = a.type_id
         """
-    ).fetchall()
-    qs_val = mk_val = 0.0
-    for tid, qty in inv:
-        tv = cur.execute(
-            "SELECT quicksell_bid, mark_ask FROM type_valuations WHERE type_id=?",
-            (tid,),
-        ).fetchone()
-        if not tv:
-            continue
-        bid, ask = tv
-        qs_val += (bid or 0.0) * qty
-        mk_val += (ask or bid or 0.0) * qty
-
-    fees = fees_from_settings(get_settings())
-    sell_net = sell_gross * (1 - fees.sell_total)
-
-    nav_quicksell = balance + buy_escrow + qs_val + sell_net
-    nav_mark = balance + buy_escrow + mk_val + sell_net
+    ).fetchone()
 
-    day = utcnow_dt().date().isoformat()
-    con.execute(
-        """
-        INSERT OR REPLACE INTO portfolio_daily
-          (day, wallet_balance, buy_escrow, sell_gross, inventory_quicksell, inventory_mark, nav_quicksell, nav_mark)
-        VALUES (?,?,?,?,?,?,?,?)
-        """,
-        (day, balance, buy_escrow, sell_gross, qs_val, mk_val, nav_quicksell, nav_mark),
-    )
-    con.commit()
-    return {
+    parts = {
         "wallet_balance": balance,
         "buy_escrow": buy_escrow,
         "sell_gross": sell_gross,
-        "inventory_quicksell": qs_val,
-        "inventory_mark": mk_val,
-        "nav_quicksell": nav_quicksell,
-        "nav_mark": nav_mark,
+        "inventory_quicksell": float(qs_val or 0.0),
+        "inventory_mark": float(mk_val or 0.0),
     }
+    return _with_nav(parts, fees_from_settings(get_settings()))
+
+
+def refresh_portfolio_snapshot(con):
+    """Recompute today's ``portfolio_daily`` row, writing only on change."""
+    snap = compute_portfolio_snapshot(con)
+    day = utcnow_dt().date().isoformat()
+    values = tuple(snap[c] for c in _NAV_COLUMNS)
+    stored = con.execute(
+        f"SELECT {', '.join(_NAV_COLUMNS)} FROM portfolio_daily WHERE day=?", (day,)
+    ).fetchone()
+    if stored is None or tuple(stored) != values:
+        con.execute(
+            f"""
+            INSERT OR REPLACE INTO portfolio_daily (day, {', '.join(_NAV_COLUMNS)})
+            VALUES (?,?,?,?,?,?,?,?)
+            """,
+            (day, *values),
+        )
+        con.commit()
+    return snap
+
+
+def latest_portfolio_snapshot(con):
+    """Return the most recently stored snapshot with NAV at current fees.
+
+    Computed on the fly, without storing it, until a job has written one.
+    """
+    row = con.execute(
+        f"SELECT {', '.join(_NAV_COLUMNS[:5])} FROM portfolio_daily ORDER BY day DESC LIMIT 1"
+    ).fetchone()
+    if row is None:
+        return compute_portfolio_snapshot(con)
+    parts = {c: v or 0.0 for c, v in zip(_NAV_COLUMNS, row)}
+    return _with_nav(parts, fees_from_settings(get_settings()))
+
+
+def realized_pnl(con):
+    """Return realized PnL over the last 7 and 30 days."""
+    d7, d30 = con.execute(
+        """
+        SELECT
+          SUM(CASE WHEN ts_utc >= datetime('now','-7 days') THEN pnl ELSE 0 END),
+          SUM(pnl)
+        FROM realized_trades
+        WHERE ts_utc >= datetime('now','-30 days')
+        """
+    ).fetchone()
+    return {"realized_7d": d7 or 0.0, "realized_30d": d30 or 0.0}
@@ -1,70 +1,539 @@
-from fastapi import APIRouter, WebSocket
+from fastapi import APIRouter, Query, Request, WebSocket
+from fastapi.responses import Response, StreamingResponse
 from starlette.websockets import WebSocketDisconnect
 import asyncio
+from collections import deque
 import json
 import logging
-from contextlib import suppress
+from contextlib import asynccontextmanager, suppress
+from fnmatch import fnmatchcase
 import inspect
+import time
 from typing import Any, Dict
+from uuid import uuid4
+from .config import BUS_COALESCE_MS
+from .serialize import dumps
 from .util import utcnow
-from .status import update_status
+from .status import STATUS, new_model, sync_model, update_status
 
 router = APIRouter()
 _clients: set[WebSocket] = set()
-_history: list[Dict[str, Any]] = []
 HISTORY_MAX = 200
+# (topics, serialized frame) so late joiners are hydrated without re-encoding
+_history: deque[tuple[list[str], str]] = deque(maxlen=HISTORY_MAX)
+
+
+# Progress coalescing -----------------------------------------------------------------
+
+# Progress-style events (``job_progress``, ``job_checkpoint`` and ``phase:
+# progress`` job events) are rate limited per runId: the first one in a
+# window is sent straight away, later ones replace each other and the last
+# value is sent when the window closes with a ``coalesced`` count of the
+# events it replaced. Any other event for the run (start, finish, logs)
+# flushes the pending progress first so clients never see them reordered.
+# ``_last_sent`` entries older than the window no longer delay anything and
+# are pruned, so runs that never finish do not leak keys.
+COALESCE_SECONDS = BUS_COALESCE_MS / 1000
+
+_pending: Dict[tuple, Dict[str, Any]] = {}
+_last_sent: Dict[tuple, float] = {}
+_pruned_at = 0.0
+
+
+def _progress_key(evt: Dict[str, Any]) -> tuple | None:
+    rid = evt.get("runId")
+    if rid is None:
+        return None
+    t = evt.get("type")
+    if t in ("job_progress", "job_checkpoint"):
+        return (t, rid)
+    if evt.get("phase") == "progress":
+        return (evt.get("job"), rid)
+    return None
+
+
+def _is_final(evt: Dict[str, Any]) -> bool:
+    return evt.get("type") == "job_finished" or evt.get("phase") == "finish"
+
+
+async def _flush(key: tuple) -> None:
+    entry = _pending.pop(key, None)
+    if entry is None:
+        return
+    handle = entry.get("handle")
+    if handle is not None:
+        handle.cancel()
+    evt = entry["evt"]
+    if entry["count"]:
+        evt = {**evt, "coalesced": entry["count"]}
+    _last_sent[key] = time.monotonic()
+    await _deliver(evt)
+
+
+async def _flush_due() -> None:
+    now = time.monotonic()
+    for key in [k for k, e in _pending.items() if e["due"] <= now]:
+        await _flush(key)
+
+
+async def _flush_run(rid: Any, final: bool) -> None:
+    for key in [k for k in _pending if k[1] == rid]:
+        await _flush(key)
+    if final:
+        for key in [k for k in _last_sent if k[1] == rid]:
+            del _last_sent[key]
+
+
+def _prune_last_sent(now: float) -> None:
+    global _pruned_at
+    if now - _pruned_at < max(COALESCE_SECONDS, 1.0):
+        return
+    _pruned_at = now
+    cutoff = now - COALESCE_SECONDS
+    for key in [k for k, ts in _last_sent.items() if ts <= cutoff]:
+        del _last_sent[key]
+
+
+def _arm_flush(key: tuple, delay: float) -> asyncio.TimerHandle | None:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return loop.call_later(delay, lambda: loop.create_task(_flush(key)))
 
 
 async def broadcast(evt: Dict[str, Any]) -> None:
-    """Send an event to all WebSocket clients and update status/history."""
+    """Update status and send an event to clients, coalescing progress."""
     update_status(evt)
-    _history.append(evt)
-    if len(_history) > HISTORY_MAX:
-        _history.pop(0)
+    if _pending:
+        await _flush_due()
+    key = _progress_key(evt)
+    if key is None:
+        rid = evt.get("runId")
+        if rid is not None:
+            await _flush_run(rid, _is_final(evt))
+        await _deliver(evt)
+        return
+    if COALESCE_SECONDS <= 0:
+        await _deliver(evt)
+        return
 
+    now = time.monotonic()
+    _prune_last_sent(now)
+    entry = _pending.get(key)
+    if entry is not None:
+        entry["evt"] = evt
+        entry["count"] += 1
+        stats = STATUS.setdefault("bus", {"coalesced": 0})
+        stats["coalesced"] = stats.get("coalesced", 0) + 1
+        return
+    due = _last_sent.get(key, 0.0) + COALESCE_SECONDS
+    if due <= now:
+        _last_sent[key] = now
+        await _deliver(evt)
+        return
+    _pending[key] = {
+        "evt": evt,
+        "count": 0,
+        "due": due,
+        "handle": _arm_flush(key, due - now),
+    }
+
+
+async def _deliver(evt: Dict[str, Any]) -> None:
+    """Record ``evt`` in history, fan it out and publish the status delta."""
     # ``evt`` may occasionally contain objects like ``datetime`` which are not
-    # JSON serialisable by default. ``default=str`` provides a best-effort
-    # coercion to string ensuring that the broadcast never raises because of
-    # such values. This keeps the websocket pipeline resilient to unexpected
-    # payloads while still logging them for debugging.
-    msg = json.dumps(evt, default=str)
+    # JSON serialisable by default. ``dumps`` coerces them with ``str``
+    # ensuring that the broadcast never raises because of such values. The
+    # frame is encoded once and reused for every client and for history.
+    msg = dumps(evt)
+    topics = event_topics(evt)
+    _history.append((topics, msg))
+    await _fanout(evt, msg, topics)
+    await _publish_delta()
+
+
+async def _fanout(
+    evt: Dict[str, Any], msg: str, topics: list[str], seq: int | None = None
+) -> None:
+    """Hand the encoded ``evt`` to every client subscribed to it."""
+    slot = _progress_key(evt)
+    if slot is None and evt.get("type") == "heartbeat":
+        slot = ("heartbeat", None)
+    # status frames only go to clients that asked for them
+    opt_in = evt.get("type", "").startswith("status.")
+    routed: Dict[frozenset[str] | None, bool] = {}
     dead: list[WebSocket] = []
+    fill = 0
     for ws in list(_clients):
-        try:
-            await ws.send_text(msg)
-        except WebSocketDisconnect:
-            client = getattr(ws, "client", ws)
-            logging.info("WebSocket disconnected during send: %s", client)
-            dead.append(ws)
-        except Exception as exc:
-            client = getattr(ws, "client", ws)
-            logging.warning("WebSocket send failed for %s: %s", client, exc)
-            close = getattr(ws, "close", None)
-            if close:
-                with suppress(Exception):
-                    res = close()
-                    if inspect.isawaitable(res):
-                        await res
-            dead.append(ws)
+        box = _outboxes.get(ws)
+        if box is not None:
+            # clients sharing a subscription set share one match result
+            wanted = routed.get(box.topics)
+            if wanted is None:
+                wanted = routed[box.topics] = (
+                    box.topics is not None or not opt_in
+                ) and _matches(box.topics, topics)
+            if not (wanted or (opt_in and box.versioned)):
+                continue
+        elif opt_in:
+            continue
+        if box is None:
+            # sockets registered without a writer are sent inline
+            if not await _send_one(ws, msg):
+                dead.append(ws)
+            continue
+        if not box.put(slot, msg, seq):
+            _evict(ws, "send queue full")
+            continue
+        fill = max(fill, len(box.items))
 
     for ws in dead:
         _clients.discard(ws)
         logging.info("WebSocket pruned: %s", getattr(ws, "client", ws))
+    _bus_stats()["queue_fill"] = fill
+
+
+# Status deltas -----------------------------------------------------------------------
+
+# The ``/status`` model is versioned: whenever a delivered event changes it,
+# a ``status.delta`` frame with the next ``seq`` and JSON-patch ops follows.
+# Clients that connect with ``?since=<epoch>:<seq>`` get the retained deltas
+# after ``seq`` (or a ``status.snapshot`` when they fell too far behind)
+# instead of the raw event history; ``since=0`` asks for a fresh snapshot.
+# ``seq`` only counts within one process, so every frame also carries that
+# process's ``epoch``: a cursor from another worker or an earlier run (or a
+# bare number) always gets a snapshot. Bus metrics change on every send and
+# are left out of the versioned model.
+#
+# Deltas are opt-in: only ``since=`` clients, ``status`` subscribers and
+# pending long-polls receive them. While nobody listens the model is just
+# marked dirty and caught up in one delta when the next listener arrives.
+# Within a :func:`batched` block (the emit drain) one delta covers the batch.
+DELTA_HISTORY = 500
+
+EPOCH = uuid4().hex[:8]
+_seq = 0
+_state: Dict[str, Any] = new_model()
+_deltas: deque[tuple[int, str]] = deque(maxlen=DELTA_HISTORY)
+_dirty = False
+_batch_depth = 0
+
+
+def _status_listeners() -> bool:
+    return bool(_waiters) or any(
+        box.versioned or (box.topics is not None and _matches(box.topics, ["status"]))
+        for box in _outboxes.values()
+    )
+
+
+def _advance() -> tuple[int, str] | None:
+    """Sync the model and record a delta frame if anything changed."""
+    global _seq, _dirty
+    _dirty = False
+    ops = sync_model(_state)
+    if not ops:
+        return None
+    _seq += 1
+    msg = dumps({"type": "status.delta", "epoch": EPOCH, "seq": _seq, "ops": ops})
+    _deltas.append((_seq, msg))
+    return _seq, msg
+
+
+async def _publish_delta() -> None:
+    global _dirty
+    if _batch_depth:
+        _dirty = True
+        return
+    if not _status_listeners():
+        _dirty = True
+        return
+    frame = _advance()
+    if frame is None:
+        return
+    seq, msg = frame
+    await _fanout({"type": "status.delta"}, msg, ["status"], seq=seq)
+    for fut in _waiters:
+        fut.get_loop().call_soon_threadsafe(_wake, fut)
+    _waiters.clear()
+
+
+@asynccontextmanager
+async def batched():
+    """Publish one status delta for all events broadcast inside the block."""
+    global _batch_depth
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        if not _batch_depth and _dirty:
+            await _publish_delta()
+
+
+def _wake(fut: asyncio.Future) -> None:
+    if not fut.done():
+        fut.set_result(None)
+
+
+_snapshot: tuple[int, str] | None = None
+_waiters: list[asyncio.Future] = []
+
+
+def _resume_frames(since: int | None) -> list[tuple[int, str]]:
+    """Return ``(seq, frame)`` pairs bringing a client at ``since`` up to date."""
+    global _snapshot
+    if _dirty and not _batch_depth:
+        _advance()
+    if since is not None and 0 < since <= _seq:
+        if since == _seq:
+            return []
+        if _deltas and _deltas[0][0] <= since + 1:
+            return [(seq, msg) for seq, msg in _deltas if seq > since]
+    if _snapshot is None or _snapshot[0] != _seq:
+        # shared by every client that needs a snapshot at this seq
+        _snapshot = (
+            _seq,
+            dumps({"type": "status.snapshot", "epoch": EPOCH, "seq": _seq, "state": _state}),
+        )
+    return [_snapshot]
+
+
+def _cursor(raw: Any) -> int | None:
+    """Return the seq of an ``<epoch>:<seq>`` cursor issued by this process.
+
+    ``None`` (a snapshot) for foreign epochs, bare numbers and garbage.
+    """
+    epoch, _, seq = str(raw).rpartition(":")
+    if epoch != EPOCH:
+        return None
+    try:
+        return int(seq)
+    except ValueError:
+        return None
+
+
+# Topics ------------------------------------------------------------------------------
+
+# Clients receive every event until they subscribe, either with ``?topics=``
+# on connect or by sending ``{"op": "subscribe", "topics": [...]}``. Topics
+# are matched with shell-style patterns, e.g. ``jobs``, ``pipeline.*`` or
+# ``run:<runId>``. Status frames are the exception: they need an explicit
+# ``status`` subscription or ``?since=``.
+def event_topics(evt: Dict[str, Any]) -> list[str]:
+    """Return the topics an event is published under."""
+    t = evt.get("type")
+    if (t or "").startswith("status."):
+        topics = ["status"]
+    elif t == "job_log":
+        topics = ["logs"]
+    elif (t or "").startswith("job_") or (t is None and "job" in evt):
+        topics = ["jobs"]
+    elif (t or "").startswith("build_"):
+        topics = ["builds"]
+    else:
+        topics = [t or "misc"]
+    if evt.get("runId") is not None:
+        topics.append(f"run:{evt['runId']}")
+    if evt.get("buildId") is not None:
+        topics.append(f"build:{evt['buildId']}")
+    return topics
+
+
+def _matches(patterns: frozenset[str] | None, topics: list[str]) -> bool:
+    if patterns is None:
+        return True
+    return any(fnmatchcase(t, p) for p in patterns for t in topics)
+
+
+def _parse_topics(raw: Any) -> frozenset[str]:
+    if isinstance(raw, str):
+        raw = raw.split(",")
+    if not isinstance(raw, (list, tuple)):
+        return frozenset()
+    return frozenset(str(t).strip() for t in raw if str(t).strip())
+
+
+def _handle_message(box: "_Outbox", text: str) -> None:
+    try:
+        msg = json.loads(text)
+    except ValueError:
+        return  # plain keepalive
+    if not isinstance(msg, dict):
+        return
+    op = msg.get("op")
+    topics = _parse_topics(msg.get("topics"))
+    if op == "subscribe":
+        box.topics = topics if box.topics is None else box.topics | topics
+    elif op == "unsubscribe" and box.topics is not None:
+        box.topics = box.topics - topics
+    elif op == "subscribe_all":
+        box.topics = None
+
+
+# Per-client outboxes -----------------------------------------------------------------
+
+# Each connected socket gets a bounded outbox drained by its own writer task,
+# so a slow tab only delays itself. Progress and heartbeat messages occupy a
+# slot per key and are overwritten in place while queued; when the outbox is
+# full the oldest droppable message goes first. A client whose outbox holds
+# only undroppable messages, or whose send stalls past SEND_TIMEOUT_SECONDS,
+# is evicted.
+SEND_QUEUE_MAX = 256
+SEND_TIMEOUT_SECONDS = 10.0
+
+
+class _Outbox:
+    def __init__(self, ws: WebSocket, topics: frozenset[str] | None = None) -> None:
+        self.ws = ws
+        self.topics = topics
+        # resumed with ``since=``: receives status frames whatever its topics
+        self.versioned = False
+        self.items: deque[list] = deque()
+        self.slots: Dict[tuple, list] = {}
+        self.ready = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+    def put(self, slot: tuple | None, msg: str, seq: int | None = None) -> bool:
+        """Queue ``msg``; return ``False`` if the client must be evicted."""
+        stats = _bus_stats()
+        if slot is not None and slot in self.slots:
+            self.slots[slot][1] = msg
+            stats["dropped"] = stats.get("dropped", 0) + 1
+            return True
+        if len(self.items) >= SEND_QUEUE_MAX:
+            stale = next((e for e in self.items if e[0] is not None), None)
+            if stale is None:
+                return False
+            self.items.remove(stale)
+            del self.slots[stale[0]]
+            stats["dropped"] = stats.get("dropped", 0) + 1
+        entry = [slot, msg, seq]
+        self.items.append(entry)
+        if slot is not None:
+            self.slots[slot] = entry
+        self.ready.set()
+        return True
+
+    def take(self) -> tuple[str, int | None]:
+        slot, msg, seq = self.items.popleft()
+        if slot is not None:
+            self.slots.pop(slot, None)
+        return msg, seq
+
+
+_outboxes: Dict[WebSocket, _Outbox] = {}
+
+
+def _bus_stats() -> Dict[str, Any]:
+    return STATUS.setdefault("bus", {"coalesced": 0})
+
+
+async def _send_one(ws: WebSocket, msg: str, seq: int | None = None) -> bool:
+    """Send ``msg`` to ``ws``; log, close and return ``False`` on failure."""
+    try:
+        if seq is not None and isinstance(ws, _StreamSink):
+            await ws.send_frame(msg, seq)
+        else:
+            await ws.send_text(msg)
+    except WebSocketDisconnect:
+        client = getattr(ws, "client", ws)
+        logging.info("WebSocket disconnected during send: %s", client)
+        return False
+    except Exception as exc:
+        client = getattr(ws, "client", ws)
+        logging.warning("WebSocket send failed for %s: %s", client, exc)
+        close = getattr(ws, "close", None)
+        if close:
+            with suppress(Exception):
+                res = close()
+                if inspect.isawaitable(res):
+                    await res
+        return False
+    return True
+
+
+async def _writer(box: _Outbox) -> None:
+    stats = _bus_stats()
+    while True:
+        if not box.items:
+            box.ready.clear()
+            await box.ready.wait()
+            continue
+        msg, seq = box.take()
+        t0 = time.monotonic()
+        try:
+            ok = await asyncio.wait_for(_send_one(box.ws, msg, seq), SEND_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            _evict(box.ws, "send timed out")
+            return
+        ms = (time.monotonic() - t0) * 1000
+        # exponentially weighted so the metric tracks current conditions
+        stats["send_ms"] = round(0.9 * stats.get("send_ms", ms) + 0.1 * ms, 3)
+        if not ok:
+            _detach(box.ws)
+            logging.info("WebSocket pruned: %s", getattr(box.ws, "client", box.ws))
+            return
+
+
+def _attach(ws: WebSocket, topics: frozenset[str] | None = None) -> _Outbox:
+    box = _Outbox(ws, topics)
+    _outboxes[ws] = box
+    _clients.add(ws)
+    _bus_stats()["clients"] = len(_clients)
+    return box
+
+
+def _detach(ws: WebSocket) -> None:
+    _clients.discard(ws)
+    box = _outboxes.pop(ws, None)
+    if box is not None and box.task is not None:
+        box.task.cancel()
+    _bus_stats()["clients"] = len(_clients)
+
+
+def _evict(ws: WebSocket, reason: str) -> None:
+    logging.warning("WebSocket evicted (%s): %s", reason, getattr(ws, "client", ws))
+    stats = _bus_stats()
+    stats["evicted"] = stats.get("evicted", 0) + 1
+    _detach(ws)
+    close = getattr(ws, "close", None)
+    if close:
+        with suppress(Exception):
+            res = close()
+            if inspect.isawaitable(res):
+                asyncio.get_running_loop().create_task(res)
 
 
 @router.websocket("/ws")
 async def ws(ws: WebSocket) -> None:
     """WebSocket endpoint broadcasting structured events."""
     await ws.accept()
-    _clients.add(ws)
+    query = getattr(ws, "query_params", {})
+    raw = query.get("topics")
+    # live events buffer in the outbox while history is being replayed
+    box = _attach(ws, _parse_topics(raw) if raw else None)
+    box.versioned = query.get("since") is not None
     logging.info("WebSocket connected: %s", ws.client)
-    # hydrate late joiners with recent history
-    for evt in _history[-40:]:
-        await ws.send_text(json.dumps(evt, default=str))
+    if box.versioned:
+        # versioned clients resume from their last seq instead of history
+        replay = [msg for _, msg in _resume_frames(_cursor(query["since"]))]
+    else:
+        # hydrate late joiners with recent history
+        replay = []
+        for topics, msg in reversed(_history):
+            if _matches(box.topics, topics):
+                replay.append(msg)
+                if len(replay) == 40:
+                    break
+        replay.reverse()
+    for msg in replay:
+        await ws.send_text(msg)
+    box.task = asyncio.get_running_loop().create_task(_writer(box))
     try:
         while True:
-            # keepalive (we ignore any received data)
-            await ws.receive_text()
+            # subscription changes; anything else is a keepalive
+            _handle_message(box, await ws.receive_text())
     except (WebSocketDisconnect, asyncio.CancelledError):
         logging.info("WebSocket disconnected: %s", ws.client)
     except Exception:
@@ -72,7 +541,109 @@ async def ws(ws: WebSocket) -> None:
         with suppress(Exception):
             await ws.close()
     finally:
-        _clients.discard(ws)
+        _detach(ws)
+
+
+# HTTP streaming ----------------------------------------------------------------------
+
+# ``/events`` (Server-Sent Events) and ``/status/poll`` (long-poll) are fed by
+# the same outboxes and encoded frames as ``/ws``. Both default to the
+# versioned status stream: SSE frames carry ``<epoch>:<seq>`` as their id so
+# ``Last-Event-ID`` resumes exactly on the same worker, and a poll returns as
+# soon as a delta newer than ``since`` exists.
+SSE_KEEPALIVE_SECONDS = 15.0
+LONG_POLL_SECONDS = 25.0
+# frames handed to a response but not yet written; a full sink blocks the
+# client's writer so a stalled reader backs up into its outbox and is evicted
+SINK_FRAMES_MAX = 32
+
+
+class _StreamSink:
+    """Outbox target that queues SSE-formatted frames for a response."""
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+        self.frames: asyncio.Queue[str | None] = asyncio.Queue(maxsize=SINK_FRAMES_MAX)
+
+    async def send_frame(self, msg: str, seq: int) -> None:
+        await self.frames.put(f"id: {EPOCH}:{seq}\ndata: {msg}\n\n")
+
+    async def send_text(self, msg: str) -> None:
+        await self.frames.put(f"data: {msg}\n\n")
+
+    async def close(self) -> None:
+        # never wait on a reader that may be gone; unsent frames are moot
+        while True:
+            try:
+                self.frames.put_nowait(None)
+                return
+            except asyncio.QueueFull:
+                self.frames.get_nowait()
+
+
+@router.get("/events")
+async def events(request: Request, topics: str | None = None, since: str | None = None):
+    """Stream bus events as Server-Sent Events."""
+    last = request.headers.get("last-event-id")
+    sink = _StreamSink(request.client)
+    box = _attach(sink, _parse_topics(topics) if topics else frozenset({"status"}))
+    # the backlog may exceed the sink, so it is written before live frames
+    replay = [
+        f"id: {EPOCH}:{seq}\ndata: {msg}\n\n"
+        for seq, msg in _resume_frames(_cursor(last if last is not None else since))
+    ]
+    box.task = asyncio.get_running_loop().create_task(_writer(box))
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            for chunk in replay:
+                yield chunk
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(sink.frames.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            _detach(sink)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/status/poll")
+async def poll_status(
+    since: str = "0",
+    timeout: float = Query(LONG_POLL_SECONDS, ge=0, le=60),
+) -> Response:
+    """Return status frames newer than the ``since`` cursor, waiting up to ``timeout``."""
+    seq = _cursor(since)
+    frames = _resume_frames(seq)
+    if not frames and timeout:
+        fut = asyncio.get_running_loop().create_future()
+        _waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with suppress(ValueError):
+                _waiters.remove(fut)
+        frames = _resume_frames(seq)
+    # frames are already encoded; splice them instead of re-serializing
+    body = '{"epoch":"%s","seq":%d,"frames":[%s]}' % (
+        EPOCH,
+        _seq,
+        ",".join(msg for _, msg in frames),
+    )
+    return Response(body, media_type="application/json")
 
 
 _heartbeat_task: asyncio.Task | None = None
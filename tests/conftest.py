@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _run_log_dir(tmp_path, monkeypatch):
+    # keep per-run job logs out of the working tree
+    monkeypatch.setenv("RUN_LOG_DIR", str(tmp_path / "run_logs"))
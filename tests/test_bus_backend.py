@@ -0,0 +1,56 @@
+import asyncio
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import bus_backend, db, emit
+
+
+def test_sqlite_backend_relays_events_between_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr(bus_backend.SQLiteBackend, "POLL_SECONDS", 0.01)
+    db.init_db()
+    job_proc = bus_backend.SQLiteBackend()
+    job_proc.origin = "job"
+    api_proc = bus_backend.SQLiteBackend()
+    api_proc.origin = "api"
+    local_job, local_api, relayed = [], [], []
+
+    async def deliver(evt):
+        relayed.append(evt)
+
+    async def main():
+        job_proc.publish({"type": "old"}, local_job.append)
+        job_proc.flush()
+        relay = asyncio.create_task(api_proc.run(deliver))
+        await asyncio.sleep(0.05)
+        job_proc.publish({"type": "job_progress", "runId": "r1", "progress": 5}, local_job.append)
+        api_proc.publish({"type": "heartbeat"}, local_api.append)
+        job_proc.flush()
+        api_proc.flush()
+        for _ in range(100):
+            if relayed:
+                break
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        relay.cancel()
+
+    asyncio.run(main())
+
+    assert [e["type"] for e in local_job] == ["old", "job_progress"]
+    assert local_api == [{"type": "heartbeat"}]
+    # events written before the subscriber started and its own are skipped
+    assert relayed == [{"type": "job_progress", "runId": "r1", "progress": 5}]
+
+
+def test_emit_sync_uses_configured_backend(monkeypatch):
+    seen = []
+
+    class Recorder(bus_backend.LocalBackend):
+        def publish(self, evt, deliver):
+            seen.append(evt)
+
+    monkeypatch.setattr(bus_backend, "_backend", Recorder())
+    emit.emit_sync({"type": "x"})
+    assert seen == [{"type": "x"}]
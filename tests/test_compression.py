@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware
+from app.response_cache import ResponseCacheMiddleware
+
+
+def _client(path):
+    # same order as the service: the cache sits inside compression
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, routes={path: ((), None)})
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    app.get(path)(lambda: [{"type_id": i, "deal": "Good"} for i in range(200)])
+    return TestClient(app)
+
+
+def test_etag_differs_per_content_coding():
+    client = _client("/rows-etag")
+    plain = client.get("/rows-etag", headers={"Accept-Encoding": "identity"})
+    packed = client.get("/rows-etag", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in plain.headers
+    assert packed.headers["content-encoding"] == "gzip"
+    assert packed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert packed.json() == plain.json()
+
+    # each representation revalidates with its own tag
+    for resp, coding in ((packed, "gzip"), (plain, "identity")):
+        again = client.get(
+            "/rows-etag",
+            headers={"Accept-Encoding": coding, "If-None-Match": resp.headers["etag"]},
+        )
+        assert again.status_code == 304
+        assert again.headers["etag"] == resp.headers["etag"]
+    stale = client.get(
+        "/rows-etag", headers={"Accept-Encoding": "gzip", "If-None-Match": '"other-gzip"'}
+    )
+    assert stale.status_code == 200
+
+
+def test_brotli_preferred_and_offloaded(monkeypatch):
+    brotli = pytest.importorskip("brotli")
+    monkeypatch.setattr(compression, "brotli", brotli)
+    monkeypatch.setattr(compression, "THREAD_MIN_BYTES", 1000)
+    threaded = []
+    real = compression.anyio.to_thread.run_sync
+
+    async def run_sync(func, *args, **kwargs):
+        if getattr(func, "__name__", "") == "_compress_body":
+            threaded.append(len(args[0]))
+        return await real(func, *args, **kwargs)
+
+    monkeypatch.setattr(compression.anyio.to_thread, "run_sync", run_sync)
+    client = _client("/rows-br")
+    resp = client.get("/rows-br", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["content-encoding"] == "br"
+    assert resp.headers["etag"].endswith('-br"')
+    assert len(resp.json()) == 200
+    assert threaded and threaded[0] >= 1000
@@ -0,0 +1,79 @@
+import asyncio
+import pathlib
+import sys
+import threading
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import emit
+
+
+def test_emit_sync_from_threads_delivers_in_order_on_loop(monkeypatch):
+    seen = []
+
+    async def fake_broadcast(evt):
+        seen.append((evt["n"], threading.get_ident()))
+
+    monkeypatch.setattr(emit, "broadcast", fake_broadcast)
+
+    async def main():
+        emit.start_dispatcher()
+        loop_thread = threading.get_ident()
+        try:
+            t = threading.Thread(
+                target=lambda: [emit.emit_sync({"n": i}) for i in range(200)]
+            )
+            t.start()
+            await asyncio.to_thread(t.join)
+            for _ in range(50):
+                if len(seen) == 200:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            emit.stop_dispatcher()
+        return loop_thread
+
+    loop_thread = asyncio.run(main())
+    assert [n for n, _ in seen] == list(range(200))
+    assert {tid for _, tid in seen} == {loop_thread}
+
+
+def test_emit_sync_without_loop_reuses_fallback_loop(monkeypatch):
+    loops = []
+
+    async def fake_broadcast(evt):
+        loops.append(asyncio.get_running_loop())
+
+    monkeypatch.setattr(emit, "broadcast", fake_broadcast)
+    emit.emit_sync({"n": 1})
+    emit.emit_sync({"n": 2})
+    assert len(loops) == 2 and loops[0] is loops[1]
+
+
+def test_backlog_sheds_progress_only_and_survives_closed_loop(monkeypatch):
+    seen = []
+
+    async def fake_broadcast(evt):
+        seen.append(evt["type"])
+
+    monkeypatch.setattr(emit, "broadcast", fake_broadcast)
+    monkeypatch.setattr(emit, "DISPATCH_MAX", 2)
+    monkeypatch.setattr(emit, "dropped", 0)
+    loop = asyncio.new_event_loop()
+    loop.close()
+    monkeypatch.setattr(emit, "_server_loop", loop)
+    # a drain is "already scheduled", so events just queue up
+    monkeypatch.setattr(emit, "_drain_scheduled", True)
+    try:
+        for t in ("job_started", "job_progress", "job_progress", "job_finished"):
+            emit._dispatch({"type": t, "runId": "r"})
+        assert [e["type"] for e in emit._pending] == ["job_started", "job_progress", "job_finished"]
+        assert emit.dropped == 1
+
+        # scheduling on the closed loop fails: the backlog is sent, not lost
+        emit._drain_scheduled = False
+        emit._dispatch({"type": "build_finished", "buildId": "b"})
+        assert seen == ["job_started", "job_progress", "job_finished", "build_finished"]
+        assert not emit._pending
+    finally:
+        emit._pending.clear()
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app import db, exports, service
+import app.config as config
+
+
+def _seed(con):
+    con.executemany(
+        "INSERT INTO market_snapshots(ts_utc, type_id, station_id, best_bid, best_ask) VALUES (?,?,?,?,?)",
+        [
+            (f"2024-01-0{day} 00:00:00", tid, config.STATION_ID, 90 + day, 100 + day)
+            for day in range(1, 6)
+            for tid in (1, 2)
+        ],
+    )
+    con.execute(
+        "INSERT INTO portfolio_daily(day, wallet_balance, nav_mark) VALUES ('2024-01-01', 10, 20)"
+    )
+    con.commit()
+
+
+def test_ndjson_and_csv_stream_filtered_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr(exports, "CHUNK_ROWS", 2)
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed(con)
+    finally:
+        con.close()
+    client = TestClient(service.app)
+
+    params = {"since": "2024-01-02", "until": "2024-01-05", "type_id": 2}
+    res = client.get("/export/market_snapshots", params=params)
+    assert res.status_code == 200
+    assert res.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [(r["ts_utc"][:10], r["type_id"], r["best_ask"]) for r in rows] == [
+        ("2024-01-02", 2, 102),
+        ("2024-01-03", 2, 103),
+        ("2024-01-04", 2, 104),
+    ]
+
+    res = client.get("/export/market_snapshots", params={"format": "csv", "type_id": [1, 2]})
+    table = list(csv.DictReader(io.StringIO(res.text)))
+    assert len(table) == 10
+    assert table[0]["ts_utc"] <= table[-1]["ts_utc"]
+
+    empty = client.get("/export/realized_trades", params={"format": "csv"})
+    assert empty.text.splitlines() == [
+        "trade_id,ts_utc,type_id,qty,sell_unit_price,cost_total,tax,broker_fee,pnl"
+    ]
+
+    nav = client.get("/export/portfolio_daily").text.splitlines()
+    assert json.loads(nav[0])["nav_mark"] == 20
+
+
+def test_export_rejects_bad_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    client = TestClient(service.app)
+
+    assert client.get("/export/types").status_code == 404
+    assert client.get("/export/portfolio_daily", params={"type_id": 1}).status_code == 400
+    if exports.pa is None:
+        assert client.get("/export/wallet_transactions", params={"format": "arrow"}).status_code == 406
+
+
+def test_iso_bounds_are_normalised(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed(con)
+    finally:
+        con.close()
+    client = TestClient(service.app)
+
+    params = {"since": "2024-01-02T00:00:00Z", "until": "2024-01-04T02:00:00+02:00", "type_id": 1}
+    rows = [json.loads(line) for line in client.get("/export/market_snapshots", params=params).text.splitlines()]
+    # 'T' sorts after ' ', so a raw text bound would have skipped 01-02
+    assert [r["ts_utc"][:10] for r in rows] == ["2024-01-02", "2024-01-03"]
+
+    nav = client.get("/export/portfolio_daily", params={"since": "2024-01-01T00:00:00Z"})
+    assert len(nav.text.splitlines()) == 1
+    assert client.get("/export/market_snapshots", params={"since": "yesterday"}).status_code == 400
@@ -0,0 +1,168 @@
+import sys
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+# Ensure 'app' package importable
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import db, jobs, scheduler, service
+from app.cancel import check_cancelled
+
+
+def test_cancel_queued_job_via_api(tmp_path, monkeypatch):
+    monkeypatch.setenv("DISABLE_BACKGROUND_JOBS", "1")
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+    client = TestClient(service.app)
+
+    rid = client.post("/jobs/refresh_trends/run").json()["runId"]
+    assert jobs.JOB_QUEUE == ["refresh_trends"]
+
+    resp = client.post(f"/jobs/{rid}/cancel")
+    assert resp.status_code == 200
+    assert jobs.JOB_QUEUE == []
+    assert "refresh_trends" not in jobs.pending_job_names()
+    assert client.post(f"/jobs/{rid}/cancel").status_code == 404
+
+
+def test_running_job_stops_and_reports_partial_results(monkeypatch):
+    jobs.clear_queue()
+    events = []
+
+    async def fake_broadcast(evt):
+        events.append(evt)
+
+    monkeypatch.setattr("app.emit.broadcast", fake_broadcast)
+    done = []
+
+    def work():
+        for i in range(10):
+            check_cancelled()
+            done.append(i)
+            if i == 2:
+                jobs.cancel_job(job.run_id)
+
+    job = jobs.enqueue("long", work)
+    assert jobs.run_next_job() is True
+    assert done == [0, 1, 2]
+    finished = next(e for e in events if e.get("type") == "job_finished")
+    assert finished["ok"] is False
+    assert finished["error"] == "cancelled"
+
+
+def test_job_timeout(monkeypatch):
+    jobs.clear_queue()
+    seen = []
+
+    def work():
+        seen.append(jobs.current_job().token.deadline is not None)
+        check_cancelled()
+
+    job = jobs.submit(jobs.Job("slow", work, timeout=1e-9))
+    jobs.run_next_job()
+    assert seen == [True]
+    assert job.token.reason == "timeout"
+
+
+def _fake_refresh_one(con, tid):
+    con.execute(
+        "UPDATE type_status SET last_orders_refresh=datetime('now'), next_refresh=datetime('now','+1 hour') WHERE type_id=?",
+        (tid,),
+    )
+
+
+def test_run_tick_commits_partial_work_on_cancel(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        con.executemany(
+            "INSERT INTO type_status(type_id, tier, update_interval_min) VALUES (?, 'C', 60)",
+            [(tid,) for tid in range(1, 6)],
+        )
+        con.commit()
+    finally:
+        con.close()
+    jobs.clear_queue()
+    events = []
+
+    async def fake_broadcast(evt):
+        events.append(evt)
+
+    monkeypatch.setattr("app.emit.broadcast", fake_broadcast)
+
+    def refresh_then_cancel(con, tid):
+        _fake_refresh_one(con, tid)
+        if tid == 2:
+            jobs.cancel_job(job.run_id)
+
+    monkeypatch.setattr(scheduler, "refresh_one", refresh_then_cancel)
+    job = jobs.enqueue("snapshot_orders", scheduler.run_tick, "P2", 10, 1)
+    jobs.run_next_job()
+
+    con = db.connect()
+    try:
+        refreshed = con.execute(
+            "SELECT COUNT(*) FROM type_status WHERE last_orders_refresh IS NOT NULL"
+        ).fetchone()[0]
+    finally:
+        con.close()
+    assert refreshed == 2
+    finish = [e for e in events if e.get("type") == "job_finished"]
+    assert [(e["ok"], e["itemsWritten"], e["error"]) for e in finish] == [
+        (False, 2, "cancelled"),
+        (False, 2, "cancelled"),
+    ]
+
+
+def test_cancel_reaches_job_owned_by_another_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("DISABLE_BACKGROUND_JOBS", "1")
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+    client = TestClient(service.app)
+
+    rid = client.post("/jobs/refresh_trends/run").json()["runId"]
+    owner_queue = list(jobs._queue)
+    # the request lands on a worker that only sees the shared database
+    jobs._queue.clear()
+    assert client.post(f"/jobs/{rid}/cancel").status_code == 200
+    assert client.post("/jobs/not-a-run/cancel").status_code == 404
+
+    jobs._queue.extend(owner_queue)
+    assert jobs.poll_cancels() == 1
+    assert jobs._queue == []
+    assert "refresh_trends" not in jobs.pending_job_names()
+    assert jobs.poll_cancels() == 0
+
+
+def test_poll_cancels_only_reads_when_idle(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+    con = db.connect()
+    try:
+        con.execute(
+            "INSERT INTO job_cancels(run_id, reason, requested) VALUES ('gone', 'cancelled', '2024-01-01')"
+        )
+        con.commit()
+    finally:
+        con.close()
+
+    statements = []
+    real_connect = db.connect
+
+    def traced(*args, **kwargs):
+        c = real_connect(*args, **kwargs)
+        c.set_trace_callback(statements.append)
+        return c
+
+    monkeypatch.setattr(db, "connect", traced)
+    # the stale request is dropped once, then polling is read-only
+    assert jobs.poll_cancels() == 0
+    assert any(s.startswith("DELETE") for s in statements)
+    statements.clear()
+    assert jobs.poll_cancels() == 0
+    assert not [s for s in statements if not s.lstrip().startswith("SELECT")]
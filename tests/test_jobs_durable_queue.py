@@ -0,0 +1,167 @@
+import sys
+from pathlib import Path
+
+# Ensure 'app' package importable
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import db, jobs, job_runner
+from app.status import STATUS, inflight_jobs
+
+
+def _rows():
+    con = db.connect()
+    try:
+        return con.execute(
+            "SELECT run_id, name, state, attempts, checkpoint_json FROM job_queue"
+        ).fetchall()
+    finally:
+        con.close()
+
+
+def _expire_leases():
+    con = db.connect()
+    try:
+        con.execute("UPDATE job_queue SET lease_until='1970-01-01 00:00:00', owner='dead'")
+        con.commit()
+    finally:
+        con.close()
+
+
+def test_durable_job_survives_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+    calls = []
+    monkeypatch.setitem(job_runner.JOB_FUNCS, "refresh_trends", lambda: calls.append("run"))
+
+    rid = job_runner.enqueue_job("refresh_trends")
+    assert _rows() == [(rid, "refresh_trends", "queued", 0, None)]
+    assert "refresh_trends" in jobs.pending_job_names()
+
+    # simulate a restart: memory is lost and the previous owner's lease lapses
+    jobs.clear_queue()
+    assert job_runner.resume_jobs() == 0
+    _expire_leases()
+    assert job_runner.resume_jobs() == 1
+    assert jobs.JOB_QUEUE == ["refresh_trends"]
+
+    jobs.run_next_job()
+    assert calls == ["run"]
+    assert _rows() == []
+
+
+def test_checkpoint_is_restored_after_crash(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+    seen = []
+
+    def interrupted():
+        jobs.checkpoint(offset=40, force=True)
+        raise RuntimeError("deploy")
+
+    def resumed():
+        seen.append(jobs.get_checkpoint("offset"))
+
+    jobs.submit(jobs.Job("refresh_trends", interrupted, durable=True))
+    # a process dying mid-run never gets to release or requeue its row
+    monkeypatch.setattr(jobs, "_release", lambda rid: None)
+    monkeypatch.setattr(jobs, "_retry_later", lambda job: None)
+    try:
+        jobs.run_next_job()
+    except RuntimeError:
+        pass
+    (_, _, state, attempts, cp), = _rows()
+    assert (state, attempts, cp) == ("leased", 1, '{"offset": 40}')
+
+    jobs.clear_queue()
+    _expire_leases()
+    assert [j.name for j in jobs.reclaim_expired({"refresh_trends": resumed})] == ["refresh_trends"]
+    jobs.run_next_job()
+    assert seen == [40]
+
+
+def test_failed_checkpointed_run_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+
+    def flaky():
+        jobs.checkpoint(after_type_id=7)
+        raise RuntimeError("esi 502")
+
+    jobs.submit(jobs.Job("refresh_trends", flaky, durable=True))
+    try:
+        jobs.run_next_job()
+    except RuntimeError:
+        pass
+    (_, _, state, attempts, cp), = _rows()
+    assert (state, attempts, cp) == ("queued", 1, '{"after_type_id": 7}')
+    # backing off: not reclaimable until the retry delay passes
+    assert jobs.reclaim_expired({"refresh_trends": flaky}) == []
+    _expire_leases()
+    (job,) = jobs.reclaim_expired({"refresh_trends": flaky})
+    assert job.checkpoint == {"after_type_id": 7}
+
+
+def test_checkpoint_cursor_visible_in_status(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+    STATUS["inflight"] = []
+    cursors = []
+
+    def work():
+        jobs.checkpoint(done=3, total=10)
+        cursors.append(dict(inflight_jobs()[0]["cursor"]))
+
+    jobs.submit(jobs.Job("snapshot_orders", work, durable=True))
+    jobs.run_next_job()
+    assert cursors == [{"done": 3, "total": 10}]
+    assert inflight_jobs() == []
+
+
+def test_job_abandoned_after_max_attempts(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    jobs.clear_queue()
+    jobs.submit(
+        jobs.Job("refresh_trends", lambda: None, durable=True, attempts=jobs.MAX_ATTEMPTS)
+    )
+    jobs.clear_queue()
+    _expire_leases()
+
+    assert jobs.reclaim_expired({"refresh_trends": lambda: None}) == []
+    assert _rows() == []
+    con = db.connect()
+    try:
+        ok = con.execute("SELECT ok FROM jobs_history WHERE name='refresh_trends'").fetchone()
+    finally:
+        con.close()
+    assert ok == (0,)
+
+
+def test_scheduler_role_has_a_single_holder(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    monkeypatch.setattr(jobs, "WORKER_ID", "a")
+    assert jobs.hold_role("scheduler") is True
+    assert jobs.hold_role("scheduler") is True
+    monkeypatch.setattr(jobs, "WORKER_ID", "b")
+    assert jobs.hold_role("scheduler") is False
+
+    # the holder died: its lease lapses and the role moves on
+    con = db.connect()
+    try:
+        con.execute("UPDATE worker_roles SET lease_until='1970-01-01 00:00:00'")
+        con.commit()
+    finally:
+        con.close()
+    assert jobs.hold_role("scheduler") is True
+    monkeypatch.setattr(jobs, "WORKER_ID", "a")
+    assert jobs.hold_role("scheduler") is False
+
+    monkeypatch.setattr(jobs, "WORKER_ID", "b")
+    jobs.release_role("scheduler")
+    monkeypatch.setattr(jobs, "WORKER_ID", "a")
+    assert jobs.hold_role("scheduler") is True
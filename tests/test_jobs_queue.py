@@ -63,3 +63,36 @@ def test_worker_continues_after_job_error(monkeypatch):
 
     assert calls == ["ok"]
 
+
+
+def test_cancel_races_with_worker_pops(monkeypatch):
+    import threading
+
+    async def _noop(evt):
+        return None
+
+    monkeypatch.setattr("app.emit.broadcast", _noop)
+    jobs.clear_queue()
+    ran, cancelled = [], []
+    queued = [jobs.enqueue(f"j{i}", lambda i=i: ran.append(i), priority="P2") for i in range(300)]
+
+    def pop_all():
+        while jobs.run_next_job():
+            pass
+
+    def cancel_odd():
+        for job in queued[1::2]:
+            if jobs.cancel_job(job.run_id):
+                cancelled.append(job.run_id)
+
+    threads = [threading.Thread(target=pop_all), threading.Thread(target=cancel_odd)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+
+    # no job ran twice or went missing, and only the targeted ones were removed
+    assert len(ran) == len(set(ran))
+    assert all(i in ran for i in range(0, 300, 2))
+    assert all(i in ran or queued[i].run_id in cancelled for i in range(1, 300, 2))
+    assert jobs._queue == []
@@ -0,0 +1,111 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app import db, emit, latest_prices, service
+from app.settings_service import update_settings
+import app.config as config
+
+
+def _snapshot(con, ts, tid, bid, ask):
+    con.execute(
+        "INSERT INTO market_snapshots(ts_utc, type_id, station_id, best_bid, best_ask) VALUES (?,?,?,?,?)",
+        (ts, tid, config.STATION_ID, bid, ask),
+    )
+    con.commit()
+
+
+async def _noop(evt):
+    return None
+
+
+def test_profit_columns_follow_snapshots_and_fees(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr("app.emit.broadcast", _noop)
+    db.init_db()
+    latest_prices.install()
+    client = TestClient(service.app)
+    con = db.connect()
+    try:
+        con.execute("INSERT INTO types(type_id, name) VALUES (1, 'Foo'), (2, 'Bar')")
+        _snapshot(con, "2024-01-01 00:00:00", 1, 120, 100)
+        _snapshot(con, "2024-01-01 00:00:00", 2, 100, 200)
+        emit.pipeline_price_updated(2, "2024-01-01 00:00:00", [1, 2])
+        first = {r["type_id"]: r for r in client.get("/db/items").json()["rows"]}
+        assert first[1]["profit_pct"] > 0 > first[2]["profit_pct"]
+
+        # an older snapshot does not replace the latest one
+        _snapshot(con, "2023-12-31 00:00:00", 1, 500, 100)
+        # a newer one marks the row stale until the price event reprices it
+        _snapshot(con, "2024-01-02 00:00:00", 2, 300, 200)
+        stale = con.execute(
+            "SELECT type_id FROM latest_prices WHERE priced_key IS NULL"
+        ).fetchall()
+        assert stale == [(2,)]
+        # listings only read: no write happens on GET
+        unpriced = client.get("/db/items", params={"limit": 10}).json()["rows"]
+        assert {r["type_id"]: r["profit_pct"] for r in unpriced}[2] == first[2]["profit_pct"]
+        assert con.execute(
+            "SELECT COUNT(*) FROM latest_prices WHERE priced_key IS NULL"
+        ).fetchone()[0] == 1
+        emit.pipeline_price_updated(1, "2024-01-02 00:00:00", [2])
+
+        rows = client.get("/db/items", params={"sort": "profit_pct"}).json()["rows"]
+        assert [r["type_id"] for r in rows] == [2, 1]
+        assert rows[1]["profit_pct"] == first[1]["profit_pct"]
+
+        # writing settings reprices every row through the listener
+        update_settings({"SALES_TAX": 0.5})
+        assert latest_prices.refresh_profits(con) == 0
+        after = {r["type_id"]: r for r in client.get("/db/items").json()["rows"]}
+        assert after[1]["profit_pct"] < 0
+        assert {r["deal"] for r in after.values()} == {"Bad"}
+
+        plan = " ".join(
+            str(r)
+            for r in con.execute(
+                "EXPLAIN QUERY PLAN SELECT type_id FROM latest_prices "
+                "WHERE station_id = ? AND profit_pct >= ? ORDER BY profit_pct DESC",
+                (config.STATION_ID, 0.01),
+            )
+        )
+        assert "idx_latest_prices_profit" in plan and "TEMP B-TREE" not in plan
+    finally:
+        con.close()
+
+
+def test_backfill_runs_only_for_an_empty_table(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db().close()
+    con = db.connect()
+    try:
+        _snapshot(con, "2024-01-01 00:00:00", 1, 90, 100)
+        # a database from before latest_prices existed
+        con.execute("DROP TRIGGER market_snapshots_latest")
+        con.execute("DROP TABLE latest_prices")
+        _snapshot(con, "2024-01-02 00:00:00", 2, 80, 95)
+        con.commit()
+    finally:
+        con.close()
+
+    db.init_db().close()
+    con = db.connect()
+    try:
+        assert con.execute("SELECT type_id FROM latest_prices ORDER BY type_id").fetchall() == [(1,), (2,)]
+    finally:
+        con.close()
+
+    statements = []
+    real_connect = db.connect
+
+    def traced(*args, **kwargs):
+        c = real_connect(*args, **kwargs)
+        c.set_trace_callback(statements.append)
+        return c
+
+    monkeypatch.setattr(db, "connect", traced)
+    db.init_db().close()
+    assert not [s for s in statements if "FROM latest_prices_v" in s]
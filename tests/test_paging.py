@@ -0,0 +1,131 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app import db, paging, service
+import app.config as config
+
+
+def _seed(con):
+    con.executemany(
+        "INSERT INTO types(type_id, name) VALUES (?, ?)",
+        [(tid, f"Type {tid}") for tid in range(1, 8)],
+    )
+    # several equal asks so the type_id tie-breaker matters
+    con.executemany(
+        "INSERT INTO market_snapshots(ts_utc, type_id, station_id, best_bid, best_ask) VALUES (?,?,?,?,?)",
+        [("2024-01-01 00:00:00", tid, config.STATION_ID, 200, 100 + (tid % 3)) for tid in range(1, 8)],
+    )
+    con.execute(
+        """
+        INSERT INTO char_orders(
+          order_id, is_buy, region_id, location_id, type_id, price,
+          volume_total, volume_remain, issued, duration, range,
+          min_volume, escrow, last_seen, state)
+        VALUES
+          (1,0,10000002,60003760,1,10,5,5,'2024-01-01',30,'region',1,0,'2024-01-01','closed'),
+          (2,0,10000002,60003760,2,NULL,5,5,'2024-01-02',30,'region',1,0,'2024-01-02','closed'),
+          (3,0,10000002,60003760,3,10,5,5,'2024-01-03',30,'region',1,0,'2024-01-03','closed'),
+          (4,0,10000002,60003760,4,30,5,5,'2024-01-04',30,'region',1,0,'2024-01-04','closed')
+        """
+    )
+    con.commit()
+
+
+def _walk(client, path, key, params):
+    seen, cursor = [], None
+    while True:
+        page = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert page.status_code == 200
+        body = page.json()
+        seen.extend(body[key])
+        cursor = body["next"]
+        if cursor is None:
+            return seen, body
+
+
+def test_cursor_pages_match_offset_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed(con)
+    finally:
+        con.close()
+    client = TestClient(service.app)
+
+    params = {"sort": "best_ask", "dir": "asc", "limit": 3}
+    full = client.get("/db/items", params={**params, "limit": 100}).json()
+    walked, last = _walk(client, "/db/items", "rows", params)
+    assert [r["type_id"] for r in walked] == [r["type_id"] for r in full["rows"]]
+    assert last["total"] == full["total"] == 7
+
+    orders = client.get("/orders/history", params={"sort": "price", "limit": 100}).json()
+    assert orders["next"] is None
+    walked, _ = _walk(client, "/orders/history", "orders", {"sort": "price", "limit": 1})
+    assert [o["order_id"] for o in walked] == [o["order_id"] for o in orders["orders"]]
+    assert walked[-1]["price"] is None
+
+
+def test_cursor_rejects_other_sort_and_caches_total(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed(con)
+    finally:
+        con.close()
+    client = TestClient(service.app)
+
+    first = client.get("/db/items", params={"sort": "best_ask", "limit": 2}).json()
+    bad = client.get("/db/items", params={"sort": "best_bid", "cursor": first["next"]})
+    assert bad.status_code == 400
+    assert client.get("/db/items", params={"cursor": "!!"}).status_code == 400
+
+    calls = []
+    monkeypatch.setattr(paging, "TOTAL_TTL_SECONDS", 3600)
+    total = paging.cached_total("k", lambda: calls.append(1) or 5)
+    assert paging.cached_total("k", lambda: calls.append(1) or 9) == total == 5
+    assert len(calls) == 1
+
+    # stale totals are still served at once and recounted in the background
+    monkeypatch.setattr(paging, "TOTAL_TTL_SECONDS", -1)
+    release = threading.Event()
+
+    def slow_count():
+        release.wait(5)
+        return 9
+
+    assert paging.cached_total("k", slow_count) == 5
+    release.set()
+    deadline = time.monotonic() + 5
+    while paging._totals["k"][0] != 9 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert paging._totals["k"][0] == 9
+
+
+def test_cursor_pages_through_unpriced_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed(con)
+        # types 2, 4 and 6 have not been repriced yet
+        con.executemany(
+            "UPDATE latest_prices SET profit_pct=? WHERE type_id=?",
+            [(0.1 * (tid % 3), tid) for tid in (1, 3, 5, 7)],
+        )
+        con.commit()
+    finally:
+        con.close()
+    client = TestClient(service.app)
+
+    for direction in ("asc", "desc"):
+        params = {"sort": "profit_pct", "dir": direction, "limit": 2}
+        walked, _ = _walk(client, "/db/items", "rows", params)
+        assert sorted(r["type_id"] for r in walked) == list(range(1, 8))
@@ -0,0 +1,103 @@
+import sys
+from pathlib import Path
+
+# Ensure 'app' package importable
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import db, emit, pipeline, scheduler
+from app.config import STATION_ID
+from app.util import utcnow
+
+
+def _fake_refresh_one(con, tid):
+    ts = utcnow()
+    con.execute(
+        """
+        INSERT OR REPLACE INTO market_snapshots
+        (ts_utc, type_id, station_id, best_bid, best_ask, bid_count, ask_count, jita_bid_units, jita_ask_units)
+        VALUES (?,?,?,?,?,?,?,?,?)
+        """,
+        (ts, tid, STATION_ID, tid * 10.0, tid * 11.0, 1, 1, 1, 1),
+    )
+    con.execute(
+        "UPDATE type_status SET last_orders_refresh=?, next_refresh=datetime('now', '+60 minutes') WHERE type_id=?",
+        (ts, tid),
+    )
+
+
+def test_snapshot_tick_drives_downstream_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        for tid in (1, 2, 3):
+            con.execute(
+                "INSERT INTO type_status(type_id, tier, update_interval_min) VALUES (?, 'A', 0)",
+                (tid,),
+            )
+        con.execute(
+            """
+            INSERT INTO assets(item_id, type_id, quantity, is_singleton, location_id, location_type, location_flag, updated)
+            VALUES (1, 2, 5, 0, 60003760, 'station', 'hangar', '2024-01-01')
+            """
+        )
+        con.commit()
+    finally:
+        con.close()
+
+    events = []
+
+    async def fake_broadcast(evt):
+        events.append(evt)
+
+    monkeypatch.setattr("app.emit.broadcast", fake_broadcast)
+    monkeypatch.setattr(emit, "_pipeline_listeners", {})
+    monkeypatch.setattr(pipeline, "_enqueue", None)
+    monkeypatch.setattr(scheduler, "refresh_one", _fake_refresh_one)
+    enqueued = []
+    pipeline.install(enqueued.append)
+
+    scheduler.run_tick(max_calls=10, workers=1)
+    assert enqueued == ["pipeline_valuations", "pipeline_recommendations"]
+    assert pipeline.take_dirty("pipeline_valuations")[0] == [1, 2, 3]
+
+    # only the held type is revalued, straight from its snapshot
+    pipeline.run_valuations()
+    con = db.connect()
+    try:
+        rows = con.execute(
+            "SELECT type_id, quicksell_bid, mark_ask FROM type_valuations"
+        ).fetchall()
+    finally:
+        con.close()
+    assert rows == [(2, 20.0, 22.0)]
+    assert pipeline.take_dirty("pipeline_valuations")[0] == []
+    profit = [e for e in events if e.get("type") == "pipeline.profit.updated"]
+    assert profit[-1]["count"] == 1
+    assert "type_ids" not in profit[-1]
+
+    seen = []
+    monkeypatch.setattr(
+        pipeline,
+        "build_recommendations",
+        lambda mode, type_ids: seen.append(type_ids) or [],
+    )
+    pipeline.run_recommendations()
+    assert seen == [[1, 2, 3]]
+    assert pipeline.take_dirty("pipeline_recommendations")[0] == []
+
+
+def test_ids_marked_during_a_run_trigger_a_follow_up(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    enqueued = []
+    monkeypatch.setattr(pipeline, "_enqueue", enqueued.append)
+
+    pipeline.mark_dirty("pipeline_recommendations", [1, 2])
+    ids, cursor = pipeline.take_dirty("pipeline_recommendations")
+    pipeline.mark_dirty("pipeline_recommendations", [2, 3])
+    pipeline.clear_dirty("pipeline_recommendations", cursor)
+
+    assert ids == [1, 2]
+    assert pipeline.take_dirty("pipeline_recommendations")[0] == [2, 3]
+    assert enqueued == ["pipeline_recommendations"]
@@ -53,7 +53,7 @@ def test_recommendations_build_dry_run(tmp_path, monkeypatch):
     monkeypatch.setattr(recommender, "evaluate_type", fake_eval)
 
     client = TestClient(service.app)
-    resp = client.post("/recommendations/build?dry_run=true")
+    resp = client.post("/recommendations/build?dry_run=true&inline=true")
     assert resp.status_code == 200
     data = resp.json()
     assert data["candidates"] == 3
@@ -64,7 +64,7 @@ def test_recommendations_build_dry_run(tmp_path, monkeypatch):
     assert data["would_write"] == 3
 
     # legacy mode should gate by freshness and MoM
-    resp = client.post("/recommendations/build", params={"dry_run": True, "mode": "legacy"})
+    resp = client.post("/recommendations/build", params={"dry_run": True, "mode": "legacy", "inline": True})
     assert resp.status_code == 200
     legacy = resp.json()
     assert legacy["candidates"] == 3
@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app import db, emit, service
+import app.config as config
+
+
+async def _noop(evt):
+    return None
+
+
+def _snapshot(con, ts, bid, ask):
+    con.execute(
+        "INSERT INTO market_snapshots(ts_utc, type_id, station_id, best_bid, best_ask) VALUES (?,?,?,?,?)",
+        (ts, 1, config.STATION_ID, bid, ask),
+    )
+    con.commit()
+
+
+def test_items_cached_until_pipeline_event(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr("app.emit.broadcast", _noop)
+    db.init_db()
+    client = TestClient(service.app)
+    con = db.connect()
+    try:
+        con.execute("INSERT INTO types(type_id, name) VALUES (1, 'Foo')")
+        _snapshot(con, "2024-01-01 00:00:00", 120, 100)
+
+        first = client.get("/db/items", params={"sort": "best_ask", "limit": 5})
+        etag = first.headers["etag"]
+        assert first.json()["rows"][0]["best_ask"] == 100
+
+        # same query with parameters in another order revalidates to a 304
+        again = client.get(
+            "/db/items?limit=5&sort=best_ask", headers={"If-None-Match": etag}
+        )
+        assert again.status_code == 304 and again.headers["etag"] == etag
+
+        # writes without a pipeline event are not seen yet
+        _snapshot(con, "2024-01-02 00:00:00", 130, 110)
+        cached = client.get("/db/items", params={"sort": "best_ask", "limit": 5})
+        assert cached.headers["etag"] == etag
+        assert cached.json()["rows"][0]["best_ask"] == 100
+
+        emit.pipeline_price_updated(1, "2024-01-02 00:00:00", [1])
+        fresh = client.get(
+            "/db/items", params={"sort": "best_ask", "limit": 5}, headers={"If-None-Match": etag}
+        )
+        assert fresh.status_code == 200
+        assert fresh.headers["etag"] != etag
+        assert fresh.json()["rows"][0]["best_ask"] == 110
+    finally:
+        con.close()
+
+
+def test_errors_and_other_routes_are_not_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    client = TestClient(service.app)
+
+    assert client.get("/db/items", params={"cursor": "!!"}).status_code == 400
+    assert "etag" not in client.get("/orders/open").headers
@@ -0,0 +1,130 @@
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import db, emit, run_logs, service
+
+
+def test_run_log_sampling_and_paging(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr(run_logs, "BURST", 3)
+    monkeypatch.setattr(run_logs, "RATE_PER_SECOND", 0.0)
+    events = []
+
+    async def fake_broadcast(evt):
+        events.append(evt)
+
+    monkeypatch.setattr("app.emit.broadcast", fake_broadcast)
+
+    for i in range(10):
+        emit.job_log("run-a", "info", f"step {i}")
+    emit.job_log("run-a", "error", "boom")
+    emit.job_log("run-b", "info", "other run has its own bucket")
+    emit.job_finished("run-a", ok=False)
+
+    logs = [e for e in events if e["type"] == "job_log"]
+    assert [e["message"] for e in logs if e["runId"] == "run-a"] == [
+        "step 0",
+        "step 1",
+        "step 2",
+        "7 messages suppressed",
+        "boom",
+    ]
+    assert logs[3]["suppressed"] == 7
+    assert logs[4]["seq"] == 11
+    assert any(e["runId"] == "run-b" for e in logs)
+
+    client = TestClient(service.app)
+    page = client.get("/jobs/run-a/logs", params={"limit": 4}).json()
+    assert [r["seq"] for r in page["items"]] == [1, 2, 3, 4]
+    assert page["hasMore"] is True
+    rest = client.get("/jobs/run-a/logs", params={"after": page["cursor"]}).json()
+    assert rest["items"][-1] == {**rest["items"][-1], "seq": 11, "level": "error"}
+    assert rest["hasMore"] is False
+    assert client.get("/jobs/nope/logs").status_code == 404
+    assert client.get("/jobs/..%2Fx/logs").status_code == 404
+
+
+def test_run_log_rotation_keeps_sequence(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr(run_logs, "MAX_BYTES", 200)
+    monkeypatch.setattr(run_logs, "BACKUPS", 2)
+    sink = []
+    for i in range(30):
+        run_logs.log("run-r", "debug", f"line {i:02d}", sink.append)
+    run_logs.close("run-r", sink.append)
+
+    files = sorted(p.name for p in run_logs.log_dir().iterdir())
+    assert files == ["run-r.1.jsonl", "run-r.2.jsonl", "run-r.jsonl"]
+    page = run_logs.read("run-r", limit=1000)
+    seqs = [r["seq"] for r in page["items"]]
+    assert seqs == list(range(seqs[0], 31))
+    assert seqs[0] > 1  # oldest generation rotated away
+
+    # a resumed run continues its numbering
+    run_logs.log("run-r", "info", "resumed", sink.append)
+    run_logs.close("run-r", sink.append)
+    assert run_logs.read("run-r", after=30)["items"][0]["seq"] == 31
+
+
+def test_read_skips_old_generations_and_partial_lines(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr(run_logs, "MAX_BYTES", 200)
+    sink = []
+    for i in range(20):
+        run_logs.log("run-p", "debug", f"line {i:02d}", sink.append)
+    run_logs.close("run-p", sink.append)
+
+    scanned = []
+    real_open = Path.open
+
+    def tracking_open(path, mode="r", *args, **kwargs):
+        if mode == "r":
+            scanned.append(path.name)
+        return real_open(path, mode, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "open", tracking_open)
+    page = run_logs.read("run-p", after=19)
+    assert [r["seq"] for r in page["items"]] == [20]
+    # only generations holding records past ``after`` are parsed
+    assert scanned and all(
+        run_logs._last_seq_in(run_logs.log_dir() / name) > 19 or name == "run-p.jsonl"
+        for name in scanned
+    )
+    assert len(scanned) < len(list(run_logs.log_dir().iterdir()))
+
+    current = run_logs.log_dir() / "run-p.jsonl"
+    with real_open(current, "a", encoding="utf-8") as fh:
+        fh.write('{"seq": 21, "lev')
+    assert [r["seq"] for r in run_logs.read("run-p", after=19)["items"]] == [20]
+
+
+def test_old_runs_are_pruned_on_close(tmp_path, monkeypatch):
+    import os
+    import time
+
+    monkeypatch.setattr(run_logs, "KEEP_RUNS", 3)
+    sink = []
+    base = run_logs.log_dir()
+    base.mkdir(parents=True)
+    now = time.time()
+    # five finished runs with a rotated generation each, one past the age limit
+    for i, run_id in enumerate(["old", "r1", "r2", "r3", "r4"]):
+        for name in (f"{run_id}.jsonl", f"{run_id}.1.jsonl"):
+            path = base / name
+            path.write_text('{"seq": 1}\n')
+            age = 30 * 86400 if run_id == "old" else 100 - i
+            os.utime(path, (now - age, now - age))
+
+    run_logs.log("live", "info", "still running", sink.append)
+    run_logs.log("done", "info", "finished", sink.append)
+    run_logs.close("done", sink.append)
+
+    left = sorted({p.name.split(".")[0] for p in base.iterdir()})
+    # "live" is open and counts towards the limit; "done" is the newest
+    assert left == ["done", "live", "r4"]
+    run_logs.close("live", sink.append)
+    # a kept run keeps all of its generations
+    assert {p.name for p in base.iterdir() if p.name.startswith("r4.")} == {"r4.jsonl", "r4.1.jsonl"}
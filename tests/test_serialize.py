@@ -0,0 +1,57 @@
+import asyncio
+import json
+import pathlib
+import sys
+from datetime import datetime, timezone
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import serialize, ws_bus
+from starlette.websockets import WebSocketDisconnect
+
+
+class HistoryWS:
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+        self.client = "hist"
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, txt: str) -> None:
+        self.sent.append(txt)
+
+    async def receive_text(self) -> str:
+        raise WebSocketDisconnect()
+
+
+def test_dumps_matches_stdlib_with_and_without_orjson(monkeypatch):
+    when = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    payload = {"when": when, 5: "five", "big": 2**70, "name": "Æther"}
+    expected = {"when": str(when), "5": "five", "big": 2**70, "name": "Æther"}
+    assert json.loads(serialize.dumps(payload)) == expected
+    monkeypatch.setattr(serialize, "orjson", None)
+    assert json.loads(serialize.dumps(payload)) == expected
+
+
+def test_history_frames_are_encoded_once(monkeypatch):
+    calls = []
+    real = ws_bus.dumps
+
+    def counting(obj):
+        calls.append(obj)
+        return real(obj)
+
+    monkeypatch.setattr(ws_bus, "dumps", counting)
+    ws_bus._clients.clear()
+    ws_bus._history.clear()
+    asyncio.run(ws_bus.broadcast({"type": "test", "n": 1}))
+    encoded = [c for c in calls if c.get("type") == "test"]
+
+    first, second = HistoryWS(), HistoryWS()
+    asyncio.run(ws_bus.ws(first))
+    asyncio.run(ws_bus.ws(second))
+
+    assert len(encoded) == 1
+    assert first.sent == second.sent == [serialize.dumps({"type": "test", "n": 1})]
+    ws_bus._history.clear()
@@ -7,6 +7,7 @@ sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app import service, db
 from app.pricing import default_fees
+from app.valuation import latest_portfolio_snapshot, refresh_portfolio_snapshot
 
 
 def _seed_portfolio(con):
@@ -72,3 +73,31 @@ def test_portfolio_nav_snapshot(tmp_path, monkeypatch):
     assert data["inventory_mark"] == 24.0
     assert data["nav_quicksell"] == 100.0 + 5.0 + 16.0 + sell_net
     assert data["nav_mark"] == 100.0 + 5.0 + 24.0 + sell_net
+
+
+def test_nav_read_from_stored_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed_portfolio(con)
+        client = TestClient(service.app)
+
+        # GETs compute on the fly but never store
+        assert client.get("/portfolio/nav").json()["inventory_mark"] == 24.0
+        assert client.get("/portfolio/summary").status_code == 200
+        assert con.execute("SELECT COUNT(*) FROM portfolio_daily").fetchone()[0] == 0
+
+        refresh_portfolio_snapshot(con)
+        before = con.total_changes
+        refresh_portfolio_snapshot(con)
+        assert con.total_changes == before
+
+        # later changes show up once a job refreshes the snapshot
+        con.execute("UPDATE assets SET quantity = 3")
+        con.commit()
+        assert latest_portfolio_snapshot(con)["inventory_mark"] == 24.0
+        refresh_portfolio_snapshot(con)
+        assert latest_portfolio_snapshot(con)["inventory_mark"] == 36.0
+    finally:
+        con.close()
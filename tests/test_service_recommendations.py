@@ -4,8 +4,10 @@ from pathlib import Path
 # Ensure 'app' package is importable
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
-from app import service, db, type_cache
+from app import service, db, latest_prices, type_cache
+from app.compression import CompressionMiddleware
 import app.config as config
 from datetime import timedelta
 from app.util import utcnow_dt
@@ -41,6 +43,8 @@ def seed_basic(con):
         (config.STATION_ID,),
     )
     con.commit()
+    # as the price pipeline does after writing snapshots
+    latest_prices.refresh_profits(con)
 
 
 def test_db_items(tmp_path, monkeypatch):
@@ -140,3 +144,37 @@ def test_recommendations_legacy_mode(tmp_path, monkeypatch):
     assert data["total"] == 1
     assert data["rows"][0]["type_id"] == 1
     assert data["rows"][0]["has_both_sides"] is True
+
+
+def test_fields_projection_and_compression(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        seed_basic(con)
+        con.execute("UPDATE recommendations SET rationale_json='{\"why\": 1}'")
+        con.commit()
+        type_cache.refresh_type_name_cache()
+    finally:
+        con.close()
+    client = TestClient(service.app)
+
+    full = client.get("/recommendations").json()["rows"][0]
+    assert full["details"] == {"why": 1}
+    slim = client.get("/recommendations", params={"fields": "deal,type_name"}).json()["rows"][0]
+    assert slim == {"type_id": 1, "type_name": "Foo", "deal": full["deal"]}
+    legacy = client.get(
+        "/recommendations", params={"fields": "fresh_ms", "mode": "legacy", "show_all": True}
+    ).json()["rows"]
+    assert all(set(r) == {"type_id", "fresh_ms"} for r in legacy)
+    assert client.get("/db/items", params={"fields": "details"}).status_code == 400
+
+    small = client.get("/db/items", params={"fields": "best_ask"}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+    app.get("/rows")(lambda: [{"type_id": i, "deal": "Good"} for i in range(100)])
+    packed = TestClient(app).get("/rows", headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["content-encoding"] == "gzip"
+    assert int(packed.headers["content-length"]) < len(packed.content) / 4
@@ -5,7 +5,7 @@ from pathlib import Path
 # Ensure 'app' package importable
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from app import service, db, valuation
+from app import service, db, valuation, jobs
 
 
 def _seed_data(con):
@@ -53,7 +53,7 @@ def test_recompute_valuations(tmp_path, monkeypatch):
     monkeypatch.setattr("app.emit.broadcast", fake_broadcast)
 
     client = TestClient(service.app)
-    resp = client.post("/valuations/recompute")
+    resp = client.post("/valuations/recompute", params={"inline": True})
     assert resp.status_code == 200
     assert resp.json()["count"] == 2
 
@@ -69,3 +69,32 @@ def test_recompute_valuations(tmp_path, monkeypatch):
     profit_evt = next(e for e in events if e.get("type") == "pipeline.profit.updated")
     assert profit_evt["count"] == 2
     assert "as_of" in profit_evt
+
+
+def test_recompute_valuations_queued(tmp_path, monkeypatch):
+    monkeypatch.setenv("DISABLE_BACKGROUND_JOBS", "1")
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed_data(con)
+    finally:
+        con.close()
+    monkeypatch.setattr(
+        valuation,
+        "best_bid_ask_station",
+        lambda tid, station, region: (tid * 10.0, tid * 20.0),
+    )
+    jobs.clear_queue()
+
+    client = TestClient(service.app)
+    resp = client.post("/valuations/recompute")
+    assert resp.status_code == 200
+    rid = resp.json()["runId"]
+    assert client.get(f"/jobs/{rid}/result").json()["state"] == "queued"
+
+    assert jobs.run_next_job()
+    result = client.get(f"/jobs/{rid}/result").json()
+    assert result["state"] == "done"
+    assert result["result"] == {"count": 2}
+    assert client.get("/jobs/run-unknown/result").status_code == 404
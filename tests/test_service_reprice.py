@@ -51,3 +51,44 @@ def test_reprice_endpoint(tmp_path, monkeypatch):
     expected_sell = margin_after_fees(10, 11.99) / 10
     assert data["buy_net_pct"] == pytest.approx(expected_buy)
     assert data["sell_net_pct"] == pytest.approx(expected_sell)
+
+
+def test_reprice_batch_open_orders(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed(con)
+        con.execute("INSERT INTO types(type_id, name) VALUES (2, 'Bar')")
+        con.execute(
+            "INSERT INTO type_valuations(type_id, quicksell_bid, mark_ask) VALUES (1, 9, 13)"
+        )
+        con.execute(
+            """
+            INSERT INTO char_orders(
+              order_id, is_buy, region_id, location_id, type_id, price,
+              volume_total, volume_remain, issued, duration, range,
+              min_volume, escrow, last_seen, state)
+            VALUES
+              (7,1,10000002,60003760,1,9.5,5,5,'2024-01-01',30,'region',1,0,'2024-01-01','open'),
+              (8,0,10000002,60003760,1,12,5,3,'2024-01-01',30,'region',1,0,'2024-01-01','open'),
+              (9,0,10000002,60003760,2,50,5,5,'2024-01-01',30,'region',1,0,'2024-01-01','open')
+            """
+        )
+        con.commit()
+        type_cache.refresh_type_name_cache()
+    finally:
+        con.close()
+
+    client = TestClient(service.app)
+    data = client.get("/orders/reprice/batch", params={"open_orders": True, "type_id": 3}).json()
+    assert data["missing"] == [2, 3]
+    (item,) = data["items"]
+    single = client.get("/orders/reprice", params={"type_id": 1}).json()
+    assert {k: item[k] for k in single} == single
+    assert (item["quicksell_bid"], item["mark_ask"]) == (9, 13)
+    buy, sell = item["orders"]
+    assert buy["order_id"] == 7 and buy["outbid"] and buy["target"] == pytest.approx(10.01)
+    assert sell["order_id"] == 8 and not sell["outbid"] and sell["target"] == pytest.approx(11.99)
+
+    assert client.get("/orders/reprice/batch").json() == {"items": [], "missing": []}
@@ -58,7 +58,10 @@ def test_types_map_fetches_unknown_ids(tmp_path, monkeypatch):
     monkeypatch.setattr(type_cache, "_fetch_details_from_esi", fake_fetch)
 
     client = TestClient(service.app)
-    resp = client.get("/types/map", params={"ids": "545"})
+    monkeypatch.setattr(type_cache, "_queue_backfill", lambda ids: None)
+    # unknown ids are left out unless an inline lookup is requested
+    assert client.get("/types/map", params={"ids": "545"}).json() == {}
+    resp = client.get("/types/map", params={"ids": "545", "inline": True})
     assert resp.status_code == 200
     data = resp.json()
     assert data["545"] == "Widget"
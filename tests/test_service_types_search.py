@@ -6,7 +6,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from app import service, db
-from app import type_cache
+from app import type_cache, type_search
 
 
 def _seed_types(con):
@@ -35,29 +35,89 @@ def test_types_search_by_name(tmp_path, monkeypatch):
     assert data["results"] == [{"type_id": 1, "type_name": "Foo"}]
 
 
-def test_types_search_by_id_fetches_unknown(tmp_path, monkeypatch):
+def test_types_search_by_id_stays_local(tmp_path, monkeypatch):
     monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
     db.init_db()
-    type_cache._type_name_cache = None
-
-    def fake_fetch(ids):
-        if 545 in ids:
-            return {
-                545: {
-                    "name": "Widget",
-                    "group_id": 10,
-                    "category_id": 1,
-                    "volume": 1.0,
-                    "meta_level": None,
-                    "market_group_id": None,
-                }
-            }
-        return {}
-
-    monkeypatch.setattr(type_cache, "_fetch_details_from_esi", fake_fetch)
+    con = db.connect()
+    try:
+        _seed_types(con)
+    finally:
+        con.close()
+
+    def fail_fetch(ids):
+        raise AssertionError("search must not call ESI")
+
+    monkeypatch.setattr(type_cache, "_fetch_details_from_esi", fail_fetch)
 
     client = TestClient(service.app)
-    resp = client.get("/types/search", params={"q": "545"})
-    assert resp.status_code == 200
-    data = resp.json()
-    assert data["results"] == [{"type_id": 545, "type_name": "Widget"}]
+    assert client.get("/types/search", params={"q": "2"}).json()["results"] == [
+        {"type_id": 2, "type_name": "Bar"}
+    ]
+    assert client.get("/types/search", params={"q": "545"}).json()["results"] == []
+
+
+def _names(client, q, **params):
+    resp = client.get("/types/search", params={"q": q, **params})
+    return [r["type_name"] for r in resp.json()["results"]]
+
+
+def test_types_search_ranking_and_index_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        con.executemany(
+            "INSERT INTO types(type_id, name) VALUES (?, ?)",
+            [
+                (1, "Tritanium"),
+                (2, "Compressed Tritanium"),
+                (3, "Tritanium Bar Blueprint"),
+                (4, "Sentritanium"),
+                (5, "Pyerite"),
+            ],
+        )
+        con.commit()
+        client = TestClient(service.app)
+
+        # exact, prefix, word prefix, then substring
+        assert _names(client, "tritanium") == [
+            "Tritanium",
+            "Tritanium Bar Blueprint",
+            "Compressed Tritanium",
+            "Sentritanium",
+        ]
+        # a typo still finds the name through shared trigrams
+        assert _names(client, "pyeritx") == ["Pyerite"]
+
+        # the trigram index follows writes to ``types``
+        con.execute("INSERT OR REPLACE INTO types(type_id, name) VALUES (5, 'Mexallon')")
+        con.execute("UPDATE types SET name='Isogen' WHERE type_id=4")
+        con.execute("DELETE FROM types WHERE type_id=3")
+        con.commit()
+        fts = dict(con.execute("SELECT rowid, name FROM types_fts").fetchall())
+        assert fts == dict(con.execute("SELECT type_id, name FROM types").fetchall())
+    finally:
+        con.close()
+
+
+def test_list_search_uses_name_filter(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        _seed_types(con)
+        clause, params = type_search.name_filter(con, "t.type_id", "Foo")
+        assert "types_fts" in clause and params == ['"Foo"']
+        clause, params = type_search.name_filter(con, "t.type_id", "1")
+        assert "LIKE" in clause and params == [1, "%1%"]
+        rows = con.execute(f"SELECT name FROM types t WHERE {clause}", params).fetchall()
+        assert rows == [("Foo",)]
+
+        # without the trigram index names are matched with LIKE
+        monkeypatch.setitem(type_search._fts, str(db.DB_PATH), False)
+        clause, params = type_search.name_filter(con, "t.type_id", "Bar")
+        assert "LIKE" in clause
+        rows = con.execute(f"SELECT name FROM types t WHERE {clause}", params).fetchall()
+        assert rows == [("Bar",)]
+    finally:
+        con.close()
@@ -0,0 +1,66 @@
+import sys
+from pathlib import Path
+
+# Ensure 'app' package importable
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import db, settings_service
+
+
+def _count_connects(monkeypatch):
+    calls = {"n": 0}
+    real = settings_service.connect
+
+    def counting():
+        calls["n"] += 1
+        return real()
+
+    monkeypatch.setattr(settings_service, "connect", counting)
+    return calls
+
+
+def test_settings_served_from_memory_until_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    settings_service.invalidate_settings_cache()
+    calls = _count_connects(monkeypatch)
+    changes = []
+    monkeypatch.setattr(settings_service, "_listeners", [])
+    settings_service.subscribe(changes.append)
+
+    first = settings_service.get_settings()
+    for _ in range(5):
+        settings_service.get_settings()
+        settings_service.get_scheduler_settings()
+    # one read per scope, no further queries
+    assert calls["n"] == 2
+
+    # callers may mutate the returned dict without corrupting the cache
+    first["DEAL_THRESHOLDS"]["great_pct"] = 99
+    assert settings_service.get_settings()["DEAL_THRESHOLDS"]["great_pct"] == 0.08
+
+    settings_service.update_settings({"SALES_TAX": 0.02})
+    assert settings_service.get_settings()["SALES_TAX"] == 0.02
+    settings_service.update_scheduler_settings({"refresh_trends": {"interval": 5}})
+    assert settings_service.get_scheduler_settings()["refresh_trends"]["interval"] == 5
+    assert changes == ["settings", "scheduler"]
+
+
+def test_cache_picks_up_writes_from_other_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    settings_service.invalidate_settings_cache()
+    assert settings_service.get_settings()["SALES_TAX"] != 0.5
+
+    # another process writes the value and bumps the shared version
+    con = db.connect()
+    try:
+        con.execute("INSERT INTO app_settings(key, value) VALUES ('SALES_TAX', '0.5')")
+        settings_service._bump_version(con)
+        con.commit()
+    finally:
+        con.close()
+
+    assert settings_service.get_settings()["SALES_TAX"] != 0.5
+    monkeypatch.setattr(settings_service, "VERSION_RECHECK_SECONDS", 0.0)
+    assert settings_service.get_settings()["SALES_TAX"] == 0.5
@@ -0,0 +1,37 @@
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import status
+from app.status import STATUS, status_snapshot, update_status
+
+
+def test_inflight_indexed_and_rings_bounded():
+    STATUS["inflight"] = {}
+    STATUS["last_runs"] = []
+    STATUS["logs"] = []
+
+    for i in range(5):
+        update_status({"type": "job_started", "job": f"j{i}", "runId": f"r{i}"})
+    update_status({"type": "job_progress", "runId": "r3", "progress": 70, "detail": "x"})
+    update_status({"type": "job_progress", "runId": "gone", "progress": 5})
+    update_status({"type": "job_finished", "runId": "r1", "ok": True})
+    for i in range(status.LOGS_MAX + 5):
+        update_status({"type": "job_log", "runId": "r0", "message": str(i)})
+    for i in range(status.RUNS_MAX + 5):
+        update_status({"type": "job_finished", "runId": f"x{i}", "ok": False})
+
+    snap = status_snapshot()
+    assert [j["runId"] for j in snap["inflight"]] == ["r0", "r2", "r3", "r4"]
+    assert snap["inflight"][2]["progress"] == 70
+    assert len(snap["logs"]) == status.LOGS_MAX
+    assert snap["logs"][-1]["message"] == str(status.LOGS_MAX + 4)
+    assert len(snap["last_runs"]) == status.RUNS_MAX
+    # newest first; the r1 record has been pushed out
+    assert snap["last_runs"][0]["ok"] is False
+    assert all(r["job"] is None for r in snap["last_runs"])
+
+    # snapshots are copies
+    snap["inflight"][0]["progress"] = 99
+    assert status_snapshot()["inflight"][0]["progress"] == 0
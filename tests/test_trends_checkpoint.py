@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+# Ensure 'app' package importable
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app import db, jobs, trends
+from app.config import REGION_ID
+
+
+def _history():
+    return [{"average": 10.0, "volume": 100} for _ in range(60)]
+
+
+def test_refresh_trends_resumes_after_checkpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    monkeypatch.setattr(trends, "CHECKPOINT_EVERY", 2)
+    db.init_db()
+    con = db.connect()
+    try:
+        con.executemany(
+            "INSERT INTO region_types(region_id, type_id, first_seen, last_seen) VALUES (?,?,'x','x')",
+            [(REGION_ID, tid) for tid in range(1, 7)],
+        )
+        con.commit()
+    finally:
+        con.close()
+    jobs.clear_queue()
+
+    fetched = []
+
+    def crash_on_five(tid):
+        if tid == 5:
+            raise RuntimeError("esi down")
+        fetched.append(tid)
+        return _history()
+
+    monkeypatch.setattr(trends, "region_history", crash_on_five)
+    jobs.submit(jobs.Job("refresh_trends", trends.refresh_trends, durable=True))
+    try:
+        jobs.run_next_job()
+    except RuntimeError:
+        pass
+
+    jobs.clear_queue()
+    con = db.connect()
+    try:
+        con.execute("UPDATE job_queue SET lease_until='1970-01-01 00:00:00'")
+        con.commit()
+    finally:
+        con.close()
+
+    def ok(tid):
+        fetched.append(tid)
+        return _history()
+
+    monkeypatch.setattr(trends, "region_history", ok)
+    jobs.reclaim_expired({"refresh_trends": trends.refresh_trends})
+    jobs.run_next_job()
+
+    # types 1-4 were committed before the failure and are not fetched again
+    assert fetched == [1, 2, 3, 4, 5, 6]
+    con = db.connect()
+    try:
+        n = con.execute("SELECT COUNT(*) FROM type_trends").fetchone()[0]
+    finally:
+        con.close()
+    assert n == 6
@@ -0,0 +1,53 @@
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+
+from app import db, service, type_cache
+
+
+def test_unknown_names_backfilled_in_background(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "test.sqlite3")
+    db.init_db()
+    con = db.connect()
+    try:
+        con.execute("INSERT INTO types(type_id, name) VALUES (1, 'Foo')")
+        con.executemany(
+            "INSERT INTO watchlist(type_id, added_ts, note) VALUES (?, ?, NULL)",
+            [(1, "2024-01-01"), (2, "2024-01-02"), (3, "2024-01-03")],
+        )
+        con.commit()
+    finally:
+        con.close()
+    type_cache.refresh_type_name_cache()
+
+    release = threading.Event()
+    calls = []
+
+    def fake_names(ids):
+        calls.append(list(ids))
+        release.wait(5)
+        return {2: "Bar", 3: "Baz"}
+
+    monkeypatch.setattr(type_cache, "_fetch_names_from_esi", fake_names)
+    monkeypatch.setattr(type_cache, "_backfill_tried", {})
+
+    client = TestClient(service.app)
+    # answered while the ESI lookup is still blocked
+    first = {i["type_id"]: i["type_name"] for i in client.get("/watchlist").json()["items"]}
+    assert first == {1: "Foo", 2: None, 3: None}
+
+    release.set()
+    type_cache._backfill_thread.join(5)
+    assert calls == [[2, 3]]
+
+    again = {i["type_id"]: i["type_name"] for i in client.get("/watchlist").json()["items"]}
+    assert again == {1: "Foo", 2: "Bar", 3: "Baz"}
+    con = db.connect()
+    try:
+        assert con.execute("SELECT name FROM types WHERE type_id=3").fetchone() == ("Baz",)
+    finally:
+        con.close()
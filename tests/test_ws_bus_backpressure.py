@@ -0,0 +1,87 @@
+import asyncio
+import json
+import logging
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import ws_bus
+
+
+class SlowWS:
+    def __init__(self, client: str, gate: asyncio.Event | None = None):
+        self.client = client
+        self.gate = gate
+        self.sent: list[dict] = []
+        self.closed = False
+
+    async def send_text(self, txt: str) -> None:
+        if self.gate is not None:
+            await self.gate.wait()
+        evt = json.loads(txt)
+        if not evt.get("type", "").startswith("status."):
+            self.sent.append(evt)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def _attach(ws):
+    box = ws_bus._attach(ws)
+    box.task = asyncio.get_running_loop().create_task(ws_bus._writer(box))
+    return box
+
+
+def _reset():
+    for ws in list(ws_bus._outboxes):
+        ws_bus._detach(ws)
+    ws_bus._clients.clear()
+    ws_bus._history.clear()
+    ws_bus._last_sent.clear()
+
+
+def test_slow_client_does_not_block_others(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+
+    async def main():
+        gate = asyncio.Event()
+        slow, fast = SlowWS("slow", gate), SlowWS("fast")
+        _attach(slow)
+        _attach(fast)
+        await ws_bus.broadcast({"type": "job_started", "runId": "r1"})
+        for p in range(5):
+            await ws_bus.broadcast({"type": "job_progress", "runId": "r1", "progress": p})
+        await ws_bus.broadcast({"type": "job_finished", "runId": "r1", "ok": True})
+        await asyncio.sleep(0.01)
+        assert [e["type"] for e in fast.sent][-1] == "job_finished"
+        assert slow.sent == []
+        gate.set()
+        await asyncio.sleep(0.01)
+        _reset()
+        return slow
+
+    slow = asyncio.run(main())
+    # stale progress collapsed into one slot; start and finish kept
+    kinds = [(e["type"], e.get("progress")) for e in slow.sent]
+    assert kinds == [("job_started", None), ("job_progress", 4), ("job_finished", None)]
+
+
+def test_full_outbox_evicts_client(monkeypatch, caplog):
+    caplog.set_level(logging.WARNING)
+    monkeypatch.setattr(ws_bus, "SEND_QUEUE_MAX", 3)
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+
+    async def main():
+        stuck = SlowWS("stuck", asyncio.Event())
+        _attach(stuck)
+        for i in range(5):
+            await ws_bus.broadcast({"type": "job_finished", "runId": f"r{i}"})
+        await asyncio.sleep(0)
+        _reset()
+        return stuck
+
+    stuck = asyncio.run(main())
+    assert stuck.closed
+    assert stuck not in ws_bus._clients
+    assert any("WebSocket evicted (send queue full): stuck" in r.message for r in caplog.records)
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import ws_bus
+from app.status import STATUS, inflight_jobs
+
+
+class GoodWS:
+    def __init__(self):
+        self.sent = []
+        self.client = "good"
+
+    async def send_text(self, txt: str) -> None:
+        evt = json.loads(txt)
+        if not evt.get("type", "").startswith("status."):
+            self.sent.append(evt)
+
+
+def test_progress_is_coalesced_per_run(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 60)
+    good = GoodWS()
+    ws_bus._clients.clear()
+    ws_bus._clients.add(good)
+    ws_bus._history.clear()
+    STATUS["inflight"] = []
+    STATUS["bus"] = {"coalesced": 0}
+
+    async def main():
+        await ws_bus.broadcast({"type": "job_started", "runId": "r1", "job": "tick"})
+        for p in range(1, 11):
+            await ws_bus.broadcast({"type": "job_progress", "runId": "r1", "progress": p})
+        await ws_bus.broadcast({"type": "job_progress", "runId": "r2", "progress": 5})
+        # status tracks every update even though clients only get the first
+        assert inflight_jobs()[0]["progress"] == 10
+        await ws_bus.broadcast({"type": "job_finished", "runId": "r1", "ok": True})
+
+    asyncio.run(main())
+
+    sent = [(e["type"], e.get("runId"), e.get("progress"), e.get("coalesced")) for e in good.sent]
+    assert sent == [
+        ("job_started", "r1", None, None),
+        ("job_progress", "r1", 1, None),
+        ("job_progress", "r2", 5, None),
+        ("job_progress", "r1", 10, 8),
+        ("job_finished", "r1", None, None),
+    ]
+    assert STATUS["bus"]["coalesced"] == 8
+    assert len(ws_bus._history) == 5
+    assert not ws_bus._pending
+    ws_bus._clients.clear()
+    ws_bus._history.clear()
+    ws_bus._last_sent.clear()
+
+
+def test_pending_progress_flushes_after_window(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0.05)
+    good = GoodWS()
+    ws_bus._clients.clear()
+    ws_bus._clients.add(good)
+
+    async def main():
+        for p in (1, 2, 3):
+            await ws_bus.broadcast(
+                {"job": "scheduler_tick", "runId": "r3", "phase": "progress", "done": p}
+            )
+        await asyncio.sleep(0.2)
+
+    asyncio.run(main())
+
+    assert [e["done"] for e in good.sent] == [1, 3]
+    assert good.sent[-1]["coalesced"] == 1
+    ws_bus._clients.clear()
+    ws_bus._history.clear()
+    ws_bus._last_sent.clear()
+
+
+def test_last_sent_pruned_for_unfinished_runs(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0.01)
+    monkeypatch.setattr(ws_bus, "_pruned_at", 0.0)
+    ws_bus._clients.clear()
+    ws_bus._last_sent.clear()
+    clock = [1000.0]
+    monkeypatch.setattr(ws_bus.time, "monotonic", lambda: clock[0])
+
+    async def main():
+        for i in range(50):
+            # abandoned runs: progress but never a finish event
+            await ws_bus.broadcast({"type": "job_progress", "runId": f"gone-{i}", "progress": 1})
+        assert len(ws_bus._last_sent) == 50
+        clock[0] += 5
+        await ws_bus.broadcast({"type": "job_progress", "runId": "live", "progress": 1})
+
+    asyncio.run(main())
+    assert list(ws_bus._last_sent) == [("job_progress", "live")]
+    ws_bus._history.clear()
+    ws_bus._last_sent.clear()
@@ -53,7 +53,7 @@ def test_broadcast_prunes_dead_clients(caplog):
     asyncio.run(ws_bus.broadcast({"type": "test"}))
     assert good in ws_bus._clients
     assert bad not in ws_bus._clients
-    assert good.sent[0] == json.dumps({"type": "test"})
+    assert json.loads(good.sent[0]) == {"type": "test"}
     assert any("WebSocket send failed for bad" in r.message for r in caplog.records)
     assert any("WebSocket pruned" in r.message for r in caplog.records)
     ws_bus._clients.clear()
@@ -0,0 +1,186 @@
+import asyncio
+import copy
+import json
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import status, ws_bus
+from app.status import STATUS, diff_status
+from starlette.websockets import WebSocketDisconnect
+
+
+def _apply(state, ops):
+    state = copy.deepcopy(state)
+    for op in ops:
+        parts = [p.replace("~1", "/").replace("~0", "~") for p in op["path"].split("/")[1:]]
+        target = state
+        for p in parts[:-1]:
+            target = target[int(p)] if isinstance(target, list) else target[p]
+        key = parts[-1]
+        if isinstance(target, list):
+            if op["op"] == "add":
+                target.insert(len(target) if key == "-" else int(key), op["value"])
+                continue
+            key = int(key)
+        if op["op"] == "remove":
+            del target[key]
+        else:
+            target[key] = op["value"]
+    return state
+
+
+class ResumeWS:
+    def __init__(self, since):
+        self.client = "resume"
+        self.query_params = {"since": str(since)}
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, txt: str) -> None:
+        self.sent.append(json.loads(txt))
+
+    async def receive_text(self) -> str:
+        raise WebSocketDisconnect()
+
+
+def test_diff_status_patches_nested_objects():
+    old = {"queue": {"P1": 1, "P2": 0}, "logs": [1], "esi": {}}
+    new = {"queue": {"P1": 2, "P3": 1}, "logs": [1, 2], "counts": {}}
+    ops = diff_status(old, new)
+    assert {"op": "replace", "path": "/queue/P1", "value": 2} in ops
+    assert {"op": "remove", "path": "/queue/P2"} in ops
+    assert {"op": "remove", "path": "/esi"} in ops
+    assert _apply(old, ops) == new
+
+
+def test_deltas_resume_from_sequence(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+    ws_bus._clients.clear()
+    STATUS["inflight"] = []
+
+    async def main():
+        await ws_bus.broadcast({"type": "queue", "depth": {"P0": 0, "P1": 1}})
+        first = ResumeWS(0)
+        await ws_bus.ws(first)
+        seq = first.sent[0]["seq"]
+        await ws_bus.broadcast({"type": "job_started", "job": "tick", "runId": "r1"})
+        await ws_bus.broadcast({"type": "job_progress", "runId": "r1", "progress": 40})
+        await ws_bus.broadcast({"type": "heartbeat"})
+        again = ResumeWS(f"{first.sent[0]['epoch']}:{seq}")
+        await ws_bus.ws(again)
+        # a cursor handed out by another worker (or a bare seq) cannot be
+        # compared with this process's seq
+        foreign = [ResumeWS(f"0f0f0f0f:{seq}"), ResumeWS(seq)]
+        for ws in foreign:
+            await ws_bus.ws(ws)
+        return first, again, foreign
+
+    first, again, foreign = asyncio.run(main())
+
+    snap = first.sent[0]
+    assert snap["type"] == "status.snapshot"
+    assert snap["state"]["queue"] == {"P0": 0, "P1": 1}
+    # nobody listened in between, so both changes arrive as one catch-up
+    # delta; the heartbeat does not touch status at all
+    assert [f["type"] for f in again.sent] == ["status.delta"]
+    assert [f["seq"] for f in again.sent] == [snap["seq"] + 1]
+    state = snap["state"]
+    for frame in again.sent:
+        state = _apply(state, frame["ops"])
+    assert state["inflight"][0]["progress"] == 40
+    assert state == ws_bus._state
+    for ws in foreign:
+        assert [f["type"] for f in ws.sent] == ["status.snapshot"]
+        assert ws.sent[0]["epoch"] == ws_bus.EPOCH
+
+
+def test_stale_sequence_gets_snapshot(monkeypatch):
+    monkeypatch.setattr(ws_bus, "_deltas", ws_bus.deque(maxlen=1))
+
+    async def main():
+        await ws_bus.broadcast({"type": "esi", "remain": 10, "reset": 1})
+        await ws_bus.broadcast({"type": "esi", "remain": 9, "reset": 1})
+        stale = ResumeWS(f"{ws_bus.EPOCH}:{ws_bus._seq - 2}")
+        await ws_bus.ws(stale)
+        return stale
+
+    stale = asyncio.run(main())
+    assert stale.sent[0]["type"] == "status.snapshot"
+    assert stale.sent[0]["state"]["esi"]["remain"] == 9
+
+
+def test_deltas_patch_rings_and_runs_incrementally(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+    monkeypatch.setattr(status, "LOGS_MAX", 3)
+    monkeypatch.setattr(status, "RUNS_MAX", 2)
+    ws_bus._clients.clear()
+    STATUS["inflight"] = {}
+    STATUS["logs"] = []
+    STATUS["last_runs"] = []
+    plain = ResumeWS(0)
+    plain.query_params = {}
+    watcher = ResumeWS(0)
+
+    async def main():
+        for ws in (plain, watcher):
+            box = ws_bus._attach(ws, None)
+            box.versioned = ws is watcher
+            box.task = asyncio.get_running_loop().create_task(ws_bus._writer(box))
+        snap = ws_bus._resume_frames(0)[0][1]
+        frames = []
+        for evt in (
+            {"type": "job_started", "job": "a", "runId": "r1"},
+            {"type": "job_started", "job": "b", "runId": "r2"},
+            {"type": "job_progress", "runId": "r2", "progress": 50},
+            *({"type": "job_log", "runId": "r1", "message": "m" * 160, "n": i} for i in range(4)),
+            {"type": "job_finished", "runId": "r1", "ok": True},
+        ):
+            await ws_bus.broadcast(evt)
+            frames.append(json.loads(ws_bus._deltas[-1][1]))
+        await asyncio.sleep(0.01)
+        for ws in (plain, watcher):
+            ws_bus._detach(ws)
+        return json.loads(snap), frames
+
+    snap, frames = asyncio.run(main())
+    assert frames[2]["ops"] == [{"op": "replace", "path": "/inflight/1/progress", "value": 50}]
+    # a log line is appended, never the whole ring resent
+    assert [o["path"] for o in frames[3]["ops"]] == ["/logs/-"]
+    assert [o["path"] for o in frames[6]["ops"]] == ["/logs/0", "/logs/-"]
+    assert len(json.dumps(frames[6])) < 600
+    assert [o["path"] for o in frames[7]["ops"]] == ["/inflight/0", "/last_runs/0"]
+    state = snap["state"]
+    for frame in frames:
+        state = _apply(state, frame["ops"])
+    assert state == ws_bus._state
+    assert [f["n"] for f in state["logs"]] == [1, 2, 3]
+    # only the opted-in client got the deltas
+    assert not [f for f in plain.sent if f["type"].startswith("status.")]
+    deltas = [f["seq"] for f in watcher.sent if f["type"] == "status.delta"]
+    assert deltas == [f["seq"] for f in frames]
+
+
+def test_batched_events_share_one_delta(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+    ws_bus._clients.clear()
+    watcher = ResumeWS(0)
+
+    async def main():
+        ws_bus._attach(watcher, frozenset({"status"}))
+        ws_bus._resume_frames(0)
+        before = ws_bus._seq
+        async with ws_bus.batched():
+            for remain in (7, 6, 5):
+                await ws_bus.broadcast({"type": "esi", "remain": remain, "reset": 1})
+            assert ws_bus._seq == before
+        ws_bus._detach(watcher)
+        return before
+
+    before = asyncio.run(main())
+    assert ws_bus._seq == before + 1
+    ops = json.loads(ws_bus._deltas[-1][1])["ops"]
+    assert [o["value"] for o in ops if o["path"] == "/esi/remain"] == [5]
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from starlette.requests import Request
+
+from app import ws_bus
+
+
+def _request(headers=None):
+    raw = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+    return Request({"type": "http", "method": "GET", "path": "/events", "headers": raw, "client": ("test", 1)})
+
+
+def test_long_poll_waits_for_next_delta(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+    ws_bus._clients.clear()
+
+    async def main():
+        await ws_bus.broadcast({"type": "esi", "remain": 50, "reset": 3})
+        # nobody listened yet: the first poll catches the model up
+        first = json.loads((await ws_bus.poll_status(since="0", timeout=0)).body)
+        seq = first["seq"]
+        poll = asyncio.create_task(ws_bus.poll_status(since=f"{first['epoch']}:{seq}", timeout=5))
+        await asyncio.sleep(0.01)
+        assert not poll.done()
+        await ws_bus.broadcast({"type": "esi", "remain": 49, "reset": 3})
+        resp = await asyncio.wait_for(poll, 1)
+        idle = await ws_bus.poll_status(since=f"{ws_bus.EPOCH}:{ws_bus._seq}", timeout=0)
+        return seq, json.loads(resp.body), json.loads(idle.body)
+
+    seq, body, idle = asyncio.run(main())
+    assert body["seq"] == seq + 1
+    assert body["frames"] == [
+        {"type": "status.delta", "epoch": ws_bus.EPOCH, "seq": seq + 1, "ops": [{"op": "replace", "path": "/esi/remain", "value": 49}]}
+    ]
+    assert idle["frames"] == []
+    assert not ws_bus._waiters
+
+
+def test_sse_resumes_from_last_event_id(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+    ws_bus._clients.clear()
+
+    async def main():
+        await ws_bus.broadcast({"type": "esi", "remain": 30, "reset": 1})
+        seq = ws_bus._seq
+        await ws_bus.broadcast({"type": "esi", "remain": 29, "reset": 1})
+        resp = await ws_bus.events(_request({"Last-Event-ID": f"{ws_bus.EPOCH}:{seq}"}), topics=None, since=None)
+        body = resp.body_iterator
+        chunks = [await body.__anext__(), await body.__anext__()]
+        await ws_bus.broadcast({"type": "heartbeat"})  # not a status topic
+        await ws_bus.broadcast({"type": "esi", "remain": 28, "reset": 1})
+        chunks.append(await asyncio.wait_for(body.__anext__(), 1))
+        assert len(ws_bus._clients) == 1
+        await body.aclose()
+        return seq, chunks
+
+    seq, chunks = asyncio.run(main())
+    assert chunks[0].startswith("retry:")
+    assert chunks[1].startswith(f"id: {ws_bus.EPOCH}:{seq + 1}\ndata: ")
+    assert chunks[2].startswith(f"id: {ws_bus.EPOCH}:{seq + 2}\ndata: ")
+    assert json.loads(chunks[2].split("data: ", 1)[1])["ops"][0]["value"] == 28
+    assert not ws_bus._clients
+
+
+def test_stalled_sse_reader_is_evicted(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+    monkeypatch.setattr(ws_bus, "SINK_FRAMES_MAX", 2)
+    monkeypatch.setattr(ws_bus, "SEND_TIMEOUT_SECONDS", 0.05)
+    ws_bus._clients.clear()
+
+    async def main():
+        resp = await ws_bus.events(_request(), topics="esi", since=None)
+        (sink,) = ws_bus._clients
+        # the response body is never read
+        for remain in range(10):
+            await ws_bus.broadcast({"type": "esi", "remain": remain, "reset": 1})
+        await asyncio.sleep(0.2)
+        assert sink.frames.qsize() <= 2
+        await resp.body_iterator.aclose()
+        return sink
+
+    evicted = ws_bus._bus_stats().get("evicted", 0)
+    sink = asyncio.run(main())
+    assert sink not in ws_bus._clients
+    assert ws_bus._bus_stats()["evicted"] == evicted + 1
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import pathlib
+import sys
+
+sys.path.append(str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import ws_bus
+from starlette.websockets import WebSocketDisconnect
+
+
+class ScriptedWS:
+    """WebSocket stub that plays ``incoming`` then waits for ``done``."""
+
+    def __init__(self, client, incoming, query=None):
+        self.client = client
+        self.incoming = list(incoming)
+        self.query_params = query or {}
+        self.sent: list[dict] = []
+        self.done = asyncio.Event()
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_text(self, txt: str) -> None:
+        self.sent.append(json.loads(txt))
+
+    async def receive_text(self) -> str:
+        if self.incoming:
+            return self.incoming.pop(0)
+        await self.done.wait()
+        raise WebSocketDisconnect()
+
+
+def test_event_topics():
+    assert ws_bus.event_topics({"type": "job_progress", "runId": "r1"}) == ["jobs", "run:r1"]
+    assert ws_bus.event_topics({"job": "scheduler_tick", "phase": "start"}) == ["jobs"]
+    assert ws_bus.event_topics({"type": "job_log", "runId": "r1"}) == ["logs", "run:r1"]
+    assert ws_bus.event_topics({"type": "pipeline.price.updated"}) == ["pipeline.price.updated"]
+
+
+def test_clients_only_receive_subscribed_topics(monkeypatch):
+    monkeypatch.setattr(ws_bus, "COALESCE_SECONDS", 0)
+    ws_bus._clients.clear()
+    ws_bus._history.clear()
+
+    async def main():
+        await ws_bus.broadcast({"type": "esi", "remain": 90})
+        await ws_bus.broadcast({"type": "heartbeat"})
+        esi = ScriptedWS("esi", [], {"topics": "esi"})
+        pipe = ScriptedWS("pipe", ["ping", json.dumps({"op": "subscribe", "topics": ["pipeline.*", "run:r2"]})])
+        everyone = ScriptedWS("all", [])
+        tasks = [asyncio.create_task(ws_bus.ws(w)) for w in (esi, pipe, everyone)]
+        await asyncio.sleep(0.01)
+        await ws_bus.broadcast({"type": "esi", "remain": 80})
+        await ws_bus.broadcast({"type": "pipeline.price.updated", "count": 3})
+        await ws_bus.broadcast({"type": "job_started", "runId": "r1"})
+        await ws_bus.broadcast({"type": "job_started", "runId": "r2"})
+        await asyncio.sleep(0.01)
+        for w in (esi, pipe, everyone):
+            w.done.set()
+        await asyncio.gather(*tasks)
+        return esi, pipe, everyone
+
+    esi, pipe, everyone = asyncio.run(main())
+
+    assert [e.get("remain") for e in esi.sent] == [90, 80]
+    # history replay happens before the subscribe message arrives
+    assert [e["type"] for e in pipe.sent[2:]] == ["pipeline.price.updated", "job_started"]
+    assert pipe.sent[-1]["runId"] == "r2"
+    assert len([e for e in everyone.sent if e["type"] != "status.delta"]) == 6
+    assert not ws_bus._clients
+    ws_bus._history.clear()